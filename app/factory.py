@@ -55,6 +55,10 @@ def create_app(config_name=None):
         seed_channel_templates()
         logger.info('频道模板表初始化完成')
         
+        # 预热频道匹配引擎，避免首个请求时才加载模板库
+        from app.services.channel_matcher import get_channel_matcher
+        get_channel_matcher().reload()
+        
         from app.services import LogService
         LogService.log('system', 'app_start', '应用启动完成', level='info')
     except Exception as e:
@@ -66,13 +70,13 @@ def create_app(config_name=None):
         init_scheduler()
         logger.info('定时任务调度器初始化成功')
         
-        # 从数据库同步任务到调度器
-        ScheduleService.sync_tasks_to_scheduler()
-        
-        # 注册任务执行回调
+        # 注册任务执行回调（先于同步任务，启动时补跑的任务会立即到期）
         _register_task_callbacks()
         logger.info('任务回调已注册')
         
+        # 从数据库同步任务到调度器（恢复持久化的调度状态并补跑错过的执行）
+        ScheduleService.sync_tasks_to_scheduler()
+        
         # 初始化日志清理任务（每天凌晨2点执行）
         _init_log_cleanup_task()
         logger.info('日志清理任务已初始化')
@@ -128,22 +132,45 @@ def _register_task_callbacks():
     logger = get_logger('task_executor')
     
     def fetch_channels_callback(task):
-        """获取直播源回调"""
-        try:
-            LogService.log_task(task.task_id, task.account_id, task.task_type, 'running', '任务开始执行')
-            result = IPTVService.fetch_and_save_channels(
-                account_id=task.account_id,
-                filter_sd=task.filter_sd,
-                channel_filters=task.channel_filters
-            )
-            logger.info(f'任务 {task.task_id} 执行结果: {result}')
-            ScheduleService.record_execution(task.task_id, result.get('success', False), result.get('message'))
-            status = 'success' if result.get('success') else 'failed'
-            LogService.log_task(task.task_id, task.account_id, task.task_type, status, result.get('message', ''))
-        except Exception as e:
-            logger.error(f'任务 {task.task_id} 执行失败: {e}')
-            ScheduleService.record_execution(task.task_id, False, str(e))
-            LogService.log_task(task.task_id, task.account_id, task.task_type, 'failed', str(e))
+        """获取直播源回调（提交获取作业后立即返回，多个账户并发执行；账户已有参数相同的作业时合并）"""
+        from app.services.fetch_jobs import get_fetch_job_manager
+        
+        job, created = get_fetch_job_manager().submit(
+            account_id=task.account_id,
+            filter_sd=task.filter_sd,
+            channel_filters=task.channel_filters,
+            task_id=task.task_id,
+            source='schedule'
+        )
+        if not created:
+            message = f'账户已有参数相同的获取作业 {job.job_id}，等待其结果'
+        elif job.queued_after:
+            message = f'账户已有参数不同的获取作业 {job.queued_after}，排在其后执行'
+        else:
+            message = '任务开始执行'
+        LogService.log_task(task.task_id, task.account_id, task.task_type, 'running', message)
+        future = job.future
+        
+        def on_done(future):
+            try:
+                result = future.result()
+                logger.info(f'任务 {task.task_id} 执行结果: {result}')
+                ScheduleService.record_execution(task.task_id, result.get('success', False), result.get('message'))
+                status = 'success' if result.get('success') else 'failed'
+                timings = result.get('timings', {})
+                message = (
+                    f"{result.get('message', '')}"
+                    f"（排队 {timings.get('queue_wait_ms', 0)}ms，运行 {timings.get('run_ms', 0)}ms）"
+                )
+                LogService.log_task(task.task_id, task.account_id, task.task_type, status, message)
+            except Exception as e:
+                logger.error(f'任务 {task.task_id} 执行失败: {e}')
+                ScheduleService.record_execution(task.task_id, False, str(e))
+                LogService.log_task(task.task_id, task.account_id, task.task_type, 'failed', str(e))
+        
+        future.add_done_callback(on_done)
+        # 返回 Future：执行器据此判断任务是否仍在执行（重叠策略）
+        return future
     
     # 注册回调
     scheduler.register_callback('fetch_channels', fetch_channels_callback)
@@ -152,44 +179,31 @@ def _register_task_callbacks():
 def _init_log_cleanup_task():
     """初始化日志清理定时任务（每天凌晨2点执行，清理超过15天的日志）"""
     from app.services import LogService
-    import threading
-    from datetime import datetime, timedelta
+    from app.services.iptv_service import IPTVService
+    from app.utils.scheduler import Task
     
     logger = get_logger('log_cleaner')
+    scheduler = get_scheduler()
     
-    def cleanup_logs():
+    def cleanup_logs(task):
         """清理日志的回调函数"""
         try:
             LogService.cleanup_old_logs(days=15)
+            IPTVService.cleanup_channel_changes(days=15)
             logger.info('日志清理任务执行成功')
         except Exception as e:
             logger.error(f'日志清理任务执行失败: {e}')
     
-    def run_cleanup_scheduler():
-        """后台线程：每天凌晨2点执行日志清理"""
-        while True:
-            now = datetime.now()
-            # 计算下次执行时间（凌晨2点）
-            tomorrow_2am = now.replace(hour=2, minute=0, second=0, microsecond=0)
-            if now >= tomorrow_2am:
-                # 如果已过凌晨2点，则安排明天凌晨2点
-                tomorrow_2am += timedelta(days=1)
-            
-            # 计算睡眠时间
-            sleep_seconds = (tomorrow_2am - now).total_seconds()
-            logger.info(f'日志清理任务将在 {sleep_seconds / 3600:.1f} 小时后执行（{tomorrow_2am.strftime("%Y-%m-%d %H:%M:%S")}）')
-            
-            # 等待直到凌晨2点
-            import time
-            time.sleep(max(1, sleep_seconds))
-            
-            # 执行清理
-            cleanup_logs()
-    
-    # 启动后台线程进行日志清理
-    cleanup_thread = threading.Thread(target=run_cleanup_scheduler, daemon=True)
-    cleanup_thread.name = 'LogCleanupThread'
-    cleanup_thread.start()
-    logger.info('日志清理后台线程已启动（每天凌晨2点执行）')
+    # 日志清理与获取任务互不影响，单独一个执行线程即可
+    scheduler.register_callback('cleanup_logs', cleanup_logs, max_workers=1, overlap='skip')
+    task = Task(
+        task_id='cleanup_logs',
+        task_type='cleanup_logs',
+        account_id=None,
+        schedule_time='02:00',
+        repeat_type='daily'
+    )
+    scheduler.add_task(task)
+    logger.info(f'日志清理任务已加入调度器（每天凌晨2点执行，下次 {task.next_execution.strftime("%Y-%m-%d %H:%M:%S")}）')
 
 
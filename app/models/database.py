@@ -99,6 +99,76 @@ def init_database():
             ON channels(source_id)
         ''')
         
+        # 数据库迁移：为频道批量 upsert 建立 (source_id, channel_id) 唯一索引
+        # 建索引前先清理历史遗留的重复行（保留最新一条）
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='index' AND name='idx_channels_source_channel'"
+        )
+        if cursor.fetchone() is None:
+            cursor.execute('''
+                DELETE FROM channels
+                WHERE id NOT IN (
+                    SELECT MAX(id) FROM channels GROUP BY source_id, channel_id
+                )
+            ''')
+            cursor.execute('''
+                CREATE UNIQUE INDEX idx_channels_source_channel
+                ON channels(source_id, channel_id)
+            ''')
+
+        # 频道列表游标分页 / 过滤用的组合索引（id 为 rowid，隐含在每个索引末尾）
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_channels_created
+            ON channels(created_at)
+        ''')
+
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_channels_category_created
+            ON channels(category, created_at)
+        ''')
+
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_channels_status_created
+            ON channels(status, created_at)
+        ''')
+
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_channels_source_created
+            ON channels(source_id, created_at)
+        ''')
+
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_channels_name
+            ON channels(channel_name)
+        ''')
+
+        # 数据库迁移：为channels表添加content_hash字段（如果不存在）
+        try:
+            cursor.execute("SELECT content_hash FROM channels LIMIT 1")
+        except Exception:
+            cursor.execute("ALTER TABLE channels ADD COLUMN content_hash TEXT")
+
+        # 创建频道变更记录表（差异同步时写入）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS channel_changes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source_id INTEGER NOT NULL,
+                channel_id TEXT NOT NULL,
+                change_type TEXT NOT NULL,
+                channel_name TEXT,
+                old_hash TEXT,
+                new_hash TEXT,
+                details TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (source_id) REFERENCES sources(id) ON DELETE CASCADE
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_channel_changes_source
+            ON channel_changes(source_id, id)
+        ''')
+
         # 创建定时任务表
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS schedule_tasks (
@@ -171,6 +241,21 @@ def init_database():
             cursor.execute("ALTER TABLE accounts ADD COLUMN remark TEXT")
             db.commit()
 
+        # 数据库迁移：为accounts表添加channel_page_digest字段（如果不存在）
+        try:
+            cursor.execute("SELECT channel_page_digest FROM accounts LIMIT 1")
+        except Exception:
+            cursor.execute("ALTER TABLE accounts ADD COLUMN channel_page_digest TEXT")
+            db.commit()
+
+        # 数据库迁移：为schedule_tasks表添加cron_expr和jitter_minutes字段（如果不存在）
+        try:
+            cursor.execute("SELECT cron_expr, jitter_minutes FROM schedule_tasks LIMIT 1")
+        except Exception:
+            cursor.execute("ALTER TABLE schedule_tasks ADD COLUMN cron_expr TEXT")
+            cursor.execute("ALTER TABLE schedule_tasks ADD COLUMN jitter_minutes INTEGER DEFAULT 0")
+            db.commit()
+
         # 数据库迁移：将status字段统一为数字（0 启用, 1 停用）
         try:
             cursor.execute("UPDATE accounts SET status = 0 WHERE status IN ('active', '启用', '0', 0) OR status IS NULL")
@@ -3,15 +3,34 @@
 提供 /api/accounts 端点作为快捷访问方式
 """
 
+import base64
+import hashlib
+import json
 from flask import Blueprint, request, jsonify
 from app.utils.auth import token_required
-from app.utils import execute_query, execute_update, get_logger
+from app.utils import execute_query, iter_query, execute_update, get_logger
+from app.utils.streaming import get_stream_mode, stream_rows
 from app.services import LogService
+from app.services.playlist_service import PlaylistService
 
 logger = get_logger('account_routes')
 
 account_bp = Blueprint('account', __name__, url_prefix='/api')
 
+# 频道列表分页参数
+CHANNEL_PAGE_DEFAULT = 100
+CHANNEL_PAGE_MAX = 1000
+
+# 排序参数 -> (排序列, 是否倒序)；每种排序都以 id 作为第二排序键，保证游标唯一
+CHANNEL_SORTS = {
+    '-created_at': ('c.created_at', True),
+    'created_at': ('c.created_at', False),
+    '-channel_name': ('c.channel_name', True),
+    'channel_name': ('c.channel_name', False),
+    '-id': ('c.id', True),
+    'id': ('c.id', False),
+}
+
 
 @account_bp.route('/accounts', methods=['GET'])
 @token_required
@@ -320,7 +339,7 @@ def fetch_source():
     获取直播源（调用IPTV服务）
     """
     try:
-        from app.services.iptv_service import IPTVService
+        from app.services.fetch_orchestrator import get_fetch_orchestrator
         
         data = request.json
         account_id = data.get('account_id')
@@ -329,7 +348,7 @@ def fetch_source():
             return jsonify({'error': '账户ID不能为空'}), 400
         
         # 调用IPTV服务获取频道
-        result = IPTVService.fetch_channels(account_id)
+        result = get_fetch_orchestrator().run(account_id)
         
         if result.get('success'):
             return jsonify({
@@ -365,6 +384,7 @@ def delete_source(source_id):
         # 删除源
         delete_source_sql = "DELETE FROM sources WHERE id = ?"
         execute_update(delete_source_sql, (source_id,))
+        PlaylistService.invalidate(source_id)
         
         return jsonify({'message': '直播源删除成功'}), 200
         
@@ -373,58 +393,211 @@ def delete_source(source_id):
         return jsonify({'error': f'系统异常: {str(e)}'}), 500
 
 
+def _cursor_scope(sort, filters):
+    """排序方式与筛选条件的摘要，游标只能在生成它的同一查询中使用"""
+    raw = json.dumps([sort, filters], ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()[:12]
+
+
+def _encode_cursor(scope, sort_value, row_id):
+    """把查询摘要和最后一行的 (排序值, id) 编码为不透明的分页游标"""
+    raw = json.dumps([scope, sort_value, row_id], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor, scope):
+    """
+    解码分页游标
+
+    Args:
+        cursor (str): 上一页返回的 next_cursor
+        scope (str): 当前查询的摘要（见 _cursor_scope）
+
+    Returns:
+        tuple: (排序值, id)，游标无效或与当前排序 / 筛选条件不匹配时抛出 ValueError
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_scope, sort_value, row_id = json.loads(raw.decode('utf-8'))
+    except Exception:
+        raise ValueError('无效的分页游标')
+    if not isinstance(row_id, int):
+        raise ValueError('无效的分页游标')
+    if cursor_scope != scope:
+        raise ValueError('分页游标与当前的排序或筛选条件不匹配')
+    return sort_value, row_id
+
+
+def _build_channels_query(args):
+    """
+    根据查询参数构建频道列表 SQL
+
+    过滤条件都命中 init_database 中的组合索引（分类 / 状态 / 源 + created_at），
+    名称前缀使用范围查询以便走 channel_name 索引。
+
+    Returns:
+        tuple: (sql, params, 排序列, 查询摘要)
+    """
+    sort = args.get('sort', '-created_at')
+    if sort not in CHANNEL_SORTS:
+        raise ValueError(f'不支持的排序方式: {sort}')
+    sort_column, descending = CHANNEL_SORTS[sort]
+
+    where = []
+    params = []
+    filters = {}
+
+    account_id = args.get('account_id')
+    if account_id:
+        where.append('s.account_id = ?')
+        params.append(account_id)
+        filters['account_id'] = account_id
+
+    source_id = args.get('source_id', type=int)
+    if source_id is not None:
+        where.append('c.source_id = ?')
+        params.append(source_id)
+        filters['source_id'] = source_id
+
+    category = args.get('category')
+    if category:
+        where.append('c.category = ?')
+        params.append(category)
+        filters['category'] = category
+
+    status = args.get('status', type=int)
+    if status is not None:
+        where.append('c.status = ?')
+        params.append(status)
+        filters['status'] = status
+
+    name_prefix = args.get('name')
+    if name_prefix:
+        where.append('c.channel_name >= ? AND c.channel_name < ?')
+        params.extend([name_prefix, name_prefix + '\U0010ffff'])
+        filters['name'] = name_prefix
+
+    scope = _cursor_scope(sort, filters)
+    after = args.get('after')
+    if after:
+        sort_value, row_id = _decode_cursor(after, scope)
+        op = '<' if descending else '>'
+        where.append(f'({sort_column}, c.id) {op} (?, ?)')
+        params.extend([sort_value, row_id])
+
+    sql = """
+        SELECT 
+            c.id,
+            c.channel_id,
+            c.channel_name,
+            c.category,
+            c.status,
+            c.source_id,
+            c.created_at,
+            a.username as account_name
+        FROM channels c
+        LEFT JOIN sources s ON c.source_id = s.id
+        LEFT JOIN accounts a ON s.account_id = a.id
+    """
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    direction = 'DESC' if descending else 'ASC'
+    sql += f' ORDER BY {sort_column} {direction}, c.id {direction}'
+
+    return sql, params, sort_column, scope
+
+
 @account_bp.route('/channels', methods=['GET'])
 @token_required
 def get_channels():
     """
     获取频道列表
     
+    Query Params:
+    - account_id: 账户ID（可选）
+    - source_id: 源ID（可选）
+    - category: 分类（可选）
+    - status: 状态（可选，0 启用, 1 停用）
+    - name: 频道名称前缀（可选）
+    - sort: 排序（可选，-created_at / created_at / -channel_name / channel_name / -id / id，默认 -created_at）
+    - limit: 每页数量（可选，传入后按游标分页，最大 1000）
+    - after: 上一页返回的 next_cursor（可选，须与上一页使用相同的 sort 和筛选条件，否则返回 400）
+    - stream: 流式输出（可选，json: 分块输出 JSON，ndjson: 每行一个频道）
+    
+    Response:
+    分页时返回 {"data": [...], "next_cursor": "...", "has_more": true}，
+    未传 limit / after 时返回全部匹配的频道 {"data": [...]}
+    """
+    try:
+        try:
+            sql, params, sort_column, scope = _build_channels_query(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        limit = request.args.get('limit', type=int)
+        if limit is None and not request.args.get('after'):
+            stream_mode = get_stream_mode()
+            if stream_mode:
+                return stream_rows(iter_query(sql, tuple(params)), stream_mode)
+            
+            channels = execute_query(sql, tuple(params))
+            
+            return jsonify({
+                'data': channels
+            }), 200
+        
+        limit = min(max(limit or CHANNEL_PAGE_DEFAULT, 1), CHANNEL_PAGE_MAX)
+        # 多取一行用于判断是否还有下一页
+        channels = execute_query(sql + ' LIMIT ?', tuple(params) + (limit + 1,))
+        has_more = len(channels) > limit
+        channels = channels[:limit]
+        
+        next_cursor = None
+        if has_more:
+            last = channels[-1]
+            next_cursor = _encode_cursor(scope, last[sort_column.split('.')[1]], last['id'])
+        
+        return jsonify({
+            'data': channels,
+            'next_cursor': next_cursor,
+            'has_more': has_more
+        }), 200
+        
+    except Exception as e:
+        logger.error(f'获取频道列表异常: {e}')
+        return jsonify({'error': f'系统异常: {str(e)}'}), 500
+
+
+@account_bp.route('/channels/categories', methods=['GET'])
+@token_required
+def get_channel_categories():
+    """
+    获取频道分类列表（去重，供筛选下拉框使用）
+    
     Query Params:
     - account_id: 账户ID（可选）
     """
     try:
         account_id = request.args.get('account_id')
         
+        sql = """
+            SELECT c.category, COUNT(*) as count
+            FROM channels c
+        """
+        params = ()
         if account_id:
-            sql = """
-                SELECT 
-                    c.id,
-                    c.channel_id,
-                    c.channel_name,
-                    c.category,
-                    c.status,
-                    c.created_at,
-                    a.username as account_name
-                FROM channels c
-                LEFT JOIN sources s ON c.source_id = s.id
-                LEFT JOIN accounts a ON s.account_id = a.id
-                WHERE s.account_id = ?
-                ORDER BY c.created_at DESC
-            """
-            channels = execute_query(sql, (account_id,))
+            sql += " JOIN sources s ON c.source_id = s.id WHERE s.account_id = ? AND c.category IS NOT NULL"
+            params = (account_id,)
         else:
-            sql = """
-                SELECT 
-                    c.id,
-                    c.channel_id,
-                    c.channel_name,
-                    c.category,
-                    c.status,
-                    c.created_at,
-                    a.username as account_name
-                FROM channels c
-                LEFT JOIN sources s ON c.source_id = s.id
-                LEFT JOIN accounts a ON s.account_id = a.id
-                ORDER BY c.created_at DESC
-            """
-            channels = execute_query(sql, ())
+            sql += " WHERE c.category IS NOT NULL"
+        sql += " GROUP BY c.category ORDER BY c.category"
         
         return jsonify({
-            'data': channels
+            'data': execute_query(sql, params)
         }), 200
         
     except Exception as e:
-        logger.error(f'获取频道列表异常: {e}')
+        logger.error(f'获取频道分类异常: {e}')
         return jsonify({'error': f'系统异常: {str(e)}'}), 500
 
 
@@ -455,7 +628,7 @@ def manage_channel(channel_id):
     if request.method == 'PUT':
         try:
             data = request.json or {}
-            check_sql = "SELECT id FROM channels WHERE id = ?"
+            check_sql = "SELECT id, source_id FROM channels WHERE id = ?"
             existing = execute_query(check_sql, (channel_id,))
             if not existing:
                 return jsonify({'error': '频道不存在'}), 404
@@ -478,10 +651,13 @@ def manage_channel(channel_id):
                 params.append(int(status_raw))
             if not update_fields:
                 return jsonify({'error': '没有要更新的字段'}), 400
+            # 名称和分类参与内容摘要，清空后下次获取按已保存的字段重新计算
+            update_fields.append('content_hash = NULL')
             update_fields.append('updated_at = datetime("now")')
             params.append(channel_id)
             sql = f"UPDATE channels SET {', '.join(update_fields)} WHERE id = ?"
             execute_update(sql, tuple(params))
+            PlaylistService.invalidate(existing[0]['source_id'])
             return jsonify({'message': '频道更新成功'}), 200
         except Exception as e:
             logger.error(f'更新频道异常: {e}')
@@ -489,12 +665,13 @@ def manage_channel(channel_id):
     
     # DELETE
     try:
-        check_sql = "SELECT id FROM channels WHERE id = ?"
+        check_sql = "SELECT id, source_id FROM channels WHERE id = ?"
         existing = execute_query(check_sql, (channel_id,))
         if not existing:
             return jsonify({'error': '频道不存在'}), 404
         sql = "DELETE FROM channels WHERE id = ?"
         execute_update(sql, (channel_id,))
+        PlaylistService.invalidate(existing[0]['source_id'])
         return jsonify({'message': '频道删除成功'}), 200
     except Exception as e:
         logger.error(f'删除频道异常: {e}')
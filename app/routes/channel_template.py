@@ -6,6 +6,8 @@
 from flask import Blueprint, request, jsonify
 from app.utils.auth import token_required
 from app.services.channel_template_service import ChannelTemplateService
+from app.services.channel_matcher import get_channel_matcher
+from app.services.playlist_service import PlaylistService
 from app.utils import get_logger
 from app.services import LogService
 
@@ -70,6 +72,62 @@ def get_statistics():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@channel_template_bp.route('/matcher/statistics', methods=['GET'])
+@token_required
+def get_matcher_statistics():
+    """获取匹配引擎统计信息（命中率、加载耗时等）"""
+    try:
+        stats = get_channel_matcher().get_statistics()
+        return jsonify({'success': True, 'data': stats}), 200
+    except Exception as e:
+        logger.error(f'获取匹配引擎统计异常: {e}')
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@channel_template_bp.route('/matcher/reload', methods=['POST'])
+@token_required
+def reload_matcher():
+    """从模板库热加载匹配引擎"""
+    try:
+        count = get_channel_matcher().reload()
+        PlaylistService.invalidate()
+        
+        actor = getattr(request, 'user', {})
+        LogService.log_operation(
+            action='template_reload',
+            message=f'重新加载频道模板库: {count} 条',
+            user_id=actor.get('user_id'),
+            username=actor.get('username')
+        )
+        
+        return jsonify({'success': True, 'data': get_channel_matcher().get_statistics()}), 200
+    except Exception as e:
+        logger.error(f'重新加载模板库异常: {e}')
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@channel_template_bp.route('/sync-categories', methods=['POST'])
+@channel_template_bp.route('/sync-categories/<int:source_id>', methods=['POST'])
+@token_required
+def sync_categories(source_id=None):
+    """按模板库批量同步频道分类（不传 source_id 则同步所有源）"""
+    try:
+        result = get_channel_matcher().update_database_categories(source_id)
+        
+        actor = getattr(request, 'user', {})
+        LogService.log_operation(
+            action='template_sync_categories',
+            message=f'同步频道分类 source_id={source_id or "全部"}: 更新 {result["updated"]}，跳过 {result["skipped"]}',
+            user_id=actor.get('user_id'),
+            username=actor.get('username')
+        )
+        
+        return jsonify({'success': True, 'data': result}), 200
+    except Exception as e:
+        logger.error(f'同步频道分类异常: {e}')
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @channel_template_bp.route('/templates', methods=['POST'])
 @token_required
 def add_template():
@@ -2,11 +2,15 @@
 IPTV 直播源 API 路由
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from app.utils.auth import token_required
+from app.utils.streaming import get_stream_mode, stream_rows
 from app.services.iptv_service import IPTVService
+from app.services.playlist_service import PlaylistService
+from app.services.fetch_jobs import get_fetch_job_manager
 from app.services import LogService
 from app.utils import get_logger
+from app.utils.channel_filter import ChannelFilterError, compile_channel_filters
 
 logger = get_logger('iptv_routes')
 
@@ -17,20 +21,42 @@ iptv_bp = Blueprint('iptv', __name__, url_prefix='/api/iptv')
 @token_required
 def fetch_channels():
     """
-    获取并保存 IPTV 频道
+    提交获取并保存 IPTV 频道的作业（立即返回作业 ID）
+    
+    同一账户已有参数相同的进行中作业时返回该作业（coalesced 为 true），不会重复访问 EPG；
+    参数不同时新建作业，排在已有作业之后执行（job.queued_after 为前一个作业的 ID）。
     
     Request Body:
     {
         "account_id": 1,
         "filter_sd": true,          // 可选，是否过滤标清频道
-        "channel_filters": []       // 可选，频道名称过滤器（正则表达式）
+        "channel_filters": [],      // 可选，频道名称过滤器（正则表达式）
+        "wait": false               // 可选，为 true 时等待作业结束并直接返回获取结果（旧的同步行为）
     }
     
-    Response:
+    Response (202):
     {
         "success": true,
-        "message": "成功保存 100 个频道",
-        "channel_count": 100
+        "message": "已提交获取作业",
+        "job_id": "3f2a...",
+        "coalesced": false,
+        "job": {"job_id", "status": "queued", "stage": "queued", "progress": {"done", "total"}, ...}
+    }
+    
+    作业结束后 GET /api/iptv/jobs/<job_id> 的 result 为获取结果：
+    {
+        "success": true,
+        "message": "成功同步 100 个频道（新增 2，更新 1，删除 0，未变化 97）",
+        "channel_count": 100,
+        "diff": {"added": 2, "changed": 1, "removed": 0, "unchanged": 97},
+        "skipped": false,           // 频道列表页面未变化时为 true（未解析、未写库）
+        "excluded": [               // 被名称过滤器排除的频道及命中的规则
+            {"channel_id": "6001", "channel_name": "1001", "rule": "^\\d+$"}
+        ],
+        "variant_groups": [         // 过滤标清时每组保留的频道
+            {"name": "广东卫视", "winner": "广东卫视高清", "variant": "高清", "dropped": ["广东卫视"]}
+        ],
+        "timings": {"queue_wait_ms": 0.1, "run_ms": 2300.5, ...}
     }
     """
     try:
@@ -42,27 +68,55 @@ def fetch_channels():
                 'success': False,
                 'message': '缺少 account_id 参数'
             }), 400
+        try:
+            account_id = int(account_id)
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'message': 'account_id 参数无效'
+            }), 400
         
         filter_sd = data.get('filter_sd', True)
         channel_filters = data.get('channel_filters', None)
+        try:
+            compile_channel_filters(channel_filters)
+        except ChannelFilterError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
         
-        # 调用服务层
-        result = IPTVService.fetch_and_save_channels(
+        # 通过获取调度器执行（与定时任务共享并发限制，同一账户参数相同的重复提交合并）
+        job, created = get_fetch_job_manager().submit(
             account_id=account_id,
             filter_sd=filter_sd,
             channel_filters=channel_filters
         )
         actor = getattr(request, 'user', {})
-        LogService.log_operation(
-            action='channel_fetch',
-            message=f"获取频道 account_id={account_id} -> {result.get('message', '')}",
-            user_id=actor.get('user_id'),
-            username=actor.get('username'),
-            status='success' if result.get('success') else 'failed'
-        )
-
-        status_code = 200 if result['success'] else 400
-        return jsonify(result), status_code
+        if created:
+            def log_result(future):
+                result = future.result()
+                LogService.log_operation(
+                    action='channel_fetch',
+                    message=f"获取频道 account_id={account_id} -> {result.get('message', '')}",
+                    user_id=actor.get('user_id'),
+                    username=actor.get('username'),
+                    status='success' if result.get('success') else 'failed'
+                )
+            job.future.add_done_callback(log_result)
+        
+        if data.get('wait'):
+            result = job.future.result()
+            status_code = 200 if result['success'] else 400
+            return jsonify(result), status_code
+        
+        return jsonify({
+            'success': True,
+            'message': '已有参数相同的获取作业' if not created else '已提交获取作业',
+            'job_id': job.job_id,
+            'coalesced': not created,
+            'job': job.to_dict(include_result=False)
+        }), 202
         
     except Exception as e:
         logger.error(f'获取频道异常: {e}')
@@ -72,6 +126,79 @@ def fetch_channels():
         }), 500
 
 
+@iptv_bp.route('/jobs', methods=['GET'])
+@token_required
+def get_fetch_jobs():
+    """
+    获取最近的频道获取作业（最新的在前，不含结果详情）
+    
+    Query Params:
+    - account_id: 账户 ID（可选）
+    - limit: 返回条数（可选，默认 50）
+    """
+    try:
+        account_id = request.args.get('account_id', type=int)
+        limit = request.args.get('limit', 50, type=int)
+        jobs = get_fetch_job_manager().list_jobs(account_id=account_id, limit=limit)
+        return jsonify({
+            'success': True,
+            'jobs': [job.to_dict(include_result=False) for job in jobs]
+        }), 200
+    except Exception as e:
+        logger.error(f'获取作业列表异常: {e}')
+        return jsonify({
+            'success': False,
+            'message': f'系统异常: {str(e)}'
+        }), 500
+
+
+@iptv_bp.route('/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_fetch_job(job_id):
+    """
+    获取频道获取作业的状态和进度
+    
+    Query Params:
+    - stream: 流式订阅（可选，ndjson: 每次状态变化输出一行，作业结束后关闭）
+    
+    Response:
+    {
+        "success": true,
+        "job": {
+            "job_id": "3f2a...",
+            "status": "running",            // queued / running / success / failed
+            "stage": "saving",              // queued / authenticating / downloading / parsing / saving / finished
+            "progress": {"done": 200, "total": 350},
+            "message": "正在保存 200/350",
+            "result": null                  // 结束后为获取结果
+        }
+    }
+    """
+    try:
+        manager = get_fetch_job_manager()
+        job = manager.get(job_id)
+        if job is None:
+            return jsonify({
+                'success': False,
+                'message': '作业不存在或已过期'
+            }), 404
+        
+        stream_mode = get_stream_mode()
+        if stream_mode:
+            return stream_rows(manager.iter_updates(job), stream_mode, key='updates', success=True)
+        
+        return jsonify({
+            'success': True,
+            'job': job.to_dict()
+        }), 200
+    except Exception as e:
+        logger.error(f'获取作业状态异常: {e}')
+        return jsonify({
+            'success': False,
+            'message': f'系统异常: {str(e)}'
+        }), 500
+
+
 @iptv_bp.route('/channels/<int:source_id>', methods=['GET'])
 @token_required
 def get_channels(source_id):
@@ -80,6 +207,7 @@ def get_channels(source_id):
     
     Query Params:
     - status: 频道状态（可选，1: 启用, 0: 禁用）
+    - stream: 流式输出（可选，json: 分块输出 JSON，ndjson: 每行一个频道）
     
     Response:
     {
@@ -101,6 +229,15 @@ def get_channels(source_id):
     try:
         status = request.args.get('status', type=int)
         
+        stream_mode = get_stream_mode()
+        if stream_mode:
+            return stream_rows(
+                IPTVService.iter_channels_by_source(source_id, status),
+                stream_mode,
+                key='channels',
+                success=True
+            )
+        
         channels = IPTVService.get_channels_by_source(source_id, status)
         
         return jsonify({
@@ -260,6 +397,47 @@ def get_statistics(source_id):
         }), 500
 
 
+@iptv_bp.route('/changes/<int:source_id>', methods=['GET'])
+@token_required
+def get_channel_changes(source_id):
+    """
+    获取直播源的频道变更记录（每次获取频道时的新增/更新/删除）
+    
+    Query Parameters:
+        limit: 返回条数（默认 100，最大 1000）
+    
+    Response:
+    {
+        "success": true,
+        "data": [
+            {
+                "channel_id": "6197",
+                "change_type": "changed",     // added / changed / removed
+                "channel_name": "广东卫视高清",
+                "details": {"channel_url": ["旧地址", "新地址"]},
+                "created_at": "2024-01-01 12:00:00"
+            }
+        ]
+    }
+    """
+    try:
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+        changes = IPTVService.get_channel_changes(source_id, limit)
+        
+        return jsonify({
+            'success': True,
+            'data': changes,
+            'count': len(changes)
+        }), 200
+        
+    except Exception as e:
+        logger.error(f'获取频道变更记录异常: {e}')
+        return jsonify({
+            'success': False,
+            'message': f'系统异常: {str(e)}'
+        }), 500
+
+
 @iptv_bp.route('/accounts', methods=['GET'])
 @token_required
 def get_accounts():
@@ -307,76 +485,75 @@ def get_accounts():
 @token_required
 def export_channels():
     """
-    导出频道列表为文本格式
+    导出频道列表
     
     Query Params:
     - source_id: 源ID（可选，不传则导出所有）
     - category: 分类（可选，不传则导出所有）
+    - format: 格式（可选，txt / m3u / m3u8 / json，默认 txt）
+    - stream: 是否强制流式输出（可选，1: 不使用缓存，直接逐行输出）
     
     Response:
-    返回文本格式：
+    指定 source_id 时返回缓存的播放列表，支持 ETag / Last-Modified 条件请求，
+    内容未变化时返回 304；导出所有源或指定 stream 时逐行流式输出，内存占用与频道数无关
+    
+    txt 格式：
     央视,#genre#
     CCTV1,rtsp://xxx
     CCTV2,rtsp://xxx
     广东,#genre#
     ...
+    
+    m3u 格式：
+    #EXTM3U
+    #EXTINF:-1 tvg-id="6197" tvg-name="广东卫视" tvg-logo="..." group-title="广东",广东卫视
+    rtsp://xxx
+    ...
     """
     try:
-        from app.utils import execute_query
-        
         source_id = request.args.get('source_id', type=int)
         category = request.args.get('category')
+        fmt = (request.args.get('format') or 'txt').lower()
         
-        # 构建查询SQL
-        sql = """
-            SELECT channel_name, channel_url, category
-            FROM channels
-            WHERE 1=1
-        """
-        params = []
-        
-        if source_id:
-            sql += " AND source_id = ?"
-            params.append(source_id)
-        
-        if category:
-            sql += " AND category = ?"
-            params.append(category)
-        
-        sql += " ORDER BY category, channel_name"
-        
-        channels = execute_query(sql, tuple(params))
+        playlist_format = PlaylistService.get_format(fmt)
+        if playlist_format is None:
+            return jsonify({
+                'success': False,
+                'message': f'不支持的导出格式: {fmt}'
+            }), 400
         
-        # 按分类分组
-        grouped = {}
-        for channel in channels:
-            cat = channel['category'] or '未分类'
-            if cat not in grouped:
-                grouped[cat] = []
-            grouped[cat].append(channel)
+        headers = {
+            'Content-Type': playlist_format.mimetype,
+            'Content-Disposition': f'attachment; filename=channels.{playlist_format.extension}',
+            'Cache-Control': 'no-cache'
+        }
+        actor = getattr(request, 'user', {})
         
-        # 生成文本内容
-        lines = []
-        for cat in sorted(grouped.keys()):
-            lines.append(f"{cat},#genre#")
-            for channel in grouped[cat]:
-                lines.append(f"{channel['channel_name']},{channel['channel_url']}")
+        if not source_id or get_stream_mode():
+            # 导出所有源或要求流式输出：直接从游标流式输出，不缓存
+            # 播放器会反复轮询导出地址，这里只写文件日志，不逐次写入操作日志表
+            logger.info(f'流式导出频道列表（{fmt}）source_id={source_id or "全部"}，用户 {actor.get("username")}')
+            return Response(
+                stream_with_context(PlaylistService.iter_playlist(playlist_format, source_id, category)),
+                headers=headers
+            )
         
-        text_content = '\n'.join(lines)
+        # 缓存命中时不访问数据库；仅在频道变化后重新生成
+        artifact, cached = PlaylistService.get_artifact(source_id, category, fmt)
         
-        # 记录日志
-        actor = getattr(request, 'user', {})
-        LogService.log_operation(
-            action='channel_export',
-            message=f'导出频道列表，共 {len(channels)} 个频道',
-            user_id=actor.get('user_id'),
-            username=actor.get('username')
-        )
+        # 记录日志（仅在重新生成时记录，避免播放器轮询时每次写库）
+        if not cached:
+            LogService.log_operation(
+                action='channel_export',
+                message=f'导出频道列表（{fmt}），共 {artifact.channel_count} 个频道',
+                user_id=actor.get('user_id'),
+                username=actor.get('username')
+            )
         
-        return text_content, 200, {
-            'Content-Type': 'text/plain; charset=utf-8',
-            'Content-Disposition': 'attachment; filename=channels.txt'
-        }
+        response = Response(artifact.body, headers=headers)
+        response.set_etag(artifact.etag)
+        response.last_modified = artifact.last_modified
+        return response.make_conditional(request)
         
     except Exception as e:
         logger.error(f'导出频道异常: {e}')
@@ -6,6 +6,8 @@ from flask import Blueprint, request, jsonify
 from app.services import ScheduleService, LogService
 from app.utils import token_required
 from app.utils import get_logger
+from app.utils.channel_filter import ChannelFilterError, compile_channel_filters
+from app.utils.cron import REPEAT_TYPES, CronError, validate_schedule
 
 schedule_bp = Blueprint('schedule', __name__, url_prefix='/api/schedule')
 logger = get_logger('schedule_routes')
@@ -18,28 +20,35 @@ def create_task():
     try:
         data = request.json
         
-        # 验证必填字段
-        required_fields = ['account_id', 'task_type', 'schedule_time']
+        repeat_type = data.get('repeat_type', 'daily')
+        
+        # 验证必填字段（cron 类型的执行时间由 cron 表达式决定）
+        required_fields = ['account_id', 'task_type']
+        required_fields.append('cron_expr' if repeat_type == 'cron' else 'schedule_time')
         for field in required_fields:
             if field not in data:
                 return jsonify({'error': f'缺少必填字段: {field}'}), 400
         
         account_id = data.get('account_id')
         task_type = data.get('task_type')
-        schedule_time = data.get('schedule_time')
-        repeat_type = data.get('repeat_type', 'daily')
+        schedule_time = data.get('schedule_time') or ''
         filter_sd = data.get('filter_sd', True)
         channel_filters = data.get('channel_filters')
         is_enabled = data.get('is_enabled', True)
         
-        # 验证时间格式
-        if not _is_valid_time_format(schedule_time):
-            return jsonify({'error': '时间格式不正确，应为 HH:MM'}), 400
+        # 验证重复类型、时间格式、cron 表达式和抖动窗口
+        try:
+            cron_expr, jitter_minutes = validate_schedule(
+                repeat_type, schedule_time, data.get('cron_expr'), data.get('jitter_minutes', 0)
+            )
+        except CronError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # 验证重复类型
-        valid_repeat_types = ['once', 'daily', 'weekly', 'monthly']
-        if repeat_type not in valid_repeat_types:
-            return jsonify({'error': f'无效的重复类型: {repeat_type}'}), 400
+        # 验证频道过滤器（编译失败的正则不会进入任务表）
+        try:
+            compile_channel_filters(channel_filters)
+        except ChannelFilterError as e:
+            return jsonify({'error': str(e)}), 400
         
         result = ScheduleService.create_task(
             account_id=account_id,
@@ -48,7 +57,9 @@ def create_task():
             repeat_type=repeat_type,
             filter_sd=filter_sd,
             channel_filters=channel_filters,
-            is_enabled=is_enabled
+            is_enabled=is_enabled,
+            cron_expr=cron_expr,
+            jitter_minutes=jitter_minutes
         )
         if result['success']:
             actor = getattr(request, 'user', {})
@@ -118,17 +129,23 @@ def update_task(task_id):
     try:
         data = request.json
         
-        # 验证时间格式（如果更新了 schedule_time）
-        if 'schedule_time' in data:
+        # 验证时间格式（如果更新了 schedule_time，cron 类型不使用执行时间）
+        if 'schedule_time' in data and data.get('repeat_type') != 'cron':
             if not _is_valid_time_format(data['schedule_time']):
                 return jsonify({'error': '时间格式不正确，应为 HH:MM'}), 400
         
-        # 验证重复类型
+        # 验证重复类型（cron 表达式与未修改的字段一起在 ScheduleService 中校验）
         if 'repeat_type' in data:
-            valid_repeat_types = ['once', 'daily', 'weekly', 'monthly']
-            if data['repeat_type'] not in valid_repeat_types:
+            if data['repeat_type'] not in REPEAT_TYPES:
                 return jsonify({'error': f'无效的重复类型: {data["repeat_type"]}'}), 400
         
+        # 验证频道过滤器
+        if 'channel_filters' in data:
+            try:
+                compile_channel_filters(data['channel_filters'])
+            except ChannelFilterError as e:
+                return jsonify({'error': str(e)}), 400
+        
         result = ScheduleService.update_task(task_id, **data)
         if result['success']:
             actor = getattr(request, 'user', {})
@@ -244,18 +261,36 @@ def get_task_status(task_id):
 @schedule_bp.route('/tasks/<int:task_id>/execute', methods=['POST'])
 @token_required
 def execute_task_now(task_id):
-    """立即执行定时任务"""
+    """
+    立即执行定时任务（提交获取作业后立即返回作业 ID，进度通过 GET /api/iptv/jobs/<job_id> 查询）
+    
+    Request Body（可选）:
+    {
+        "wait": false       // 为 true 时等待作业结束并直接返回执行结果（旧的同步行为）
+    }
+    """
     try:
-        from app.utils.scheduler import get_scheduler
-        from app.services.iptv_service import IPTVService
-        import traceback
+        from app.services.fetch_jobs import get_fetch_job_manager
         
         # 获取任务信息
         task = ScheduleService.get_task(task_id)
         if not task:
             return jsonify({'error': '任务不存在'}), 404
         
+        if task['task_type'] != 'fetch_channels':
+            return jsonify({'error': f'不支持的任务类型: {task["task_type"]}'}), 400
+        
         actor = getattr(request, 'user', {})
+        data = request.get_json(silent=True) or {}
+        
+        logger.info(f'执行任务 {task_id}（账户 {task["account_id"]}，类型 {task["task_type"]}）')
+        job, created = get_fetch_job_manager().submit(
+            account_id=task['account_id'],
+            filter_sd=bool(task.get('filter_sd', True)),
+            channel_filters=task.get('channel_filters'),
+            task_id=task_id,
+            source='task'
+        )
         
         # 记录任务开始执行
         LogService.log_task(
@@ -263,75 +298,51 @@ def execute_task_now(task_id):
             account_id=task['account_id'],
             task_type=task['task_type'],
             status='running',
-            message='用户手动触发任务执行'
+            message=(
+                f'用户手动触发任务执行（账户已有参数相同的获取作业 {job.job_id}，等待其结果）' if not created
+                else f'用户手动触发任务执行（排在参数不同的获取作业 {job.queued_after} 之后）' if job.queued_after
+                else '用户手动触发任务执行'
+            )
         )
         
-        try:
-            # 执行任务
-            if task['task_type'] == 'fetch_channels':
-                logger.info(f'执行任务 {task_id}（账户 {task["account_id"]}，类型 {task["task_type"]}）')
-                result = IPTVService.fetch_and_save_channels(
-                    account_id=task['account_id'],
-                    filter_sd=task.get('filter_sd', True),
-                    channel_filters=task.get('channel_filters')
-                )
-                logger.info(f'任务 {task_id} 执行结果: {result}')
-                
-                # 记录执行结果
-                status = 'success' if result.get('success') else 'failed'
-                LogService.log_task(
-                    task_id=task_id,
-                    account_id=task['account_id'],
-                    task_type=task['task_type'],
-                    status=status,
-                    message=result.get('message', '')
-                )
-                
-                # 记录操作日志
-                LogService.log_operation(
-                    action='schedule_execute',
-                    message=f'手动执行任务 {task_id}（{task["task_type"]}）：{result.get("message", "")}',
-                    user_id=actor.get('user_id'),
-                    username=actor.get('username'),
-                    status=status
-                )
-                
-                # 更新任务执行记录
-                ScheduleService.record_execution(task_id, result.get('success', False), result.get('message'))
-                
-                return jsonify({
-                    'success': result.get('success', False),
-                    'message': result.get('message', '任务执行失败'),
-                    'result': result
-                }), 200 if result.get('success') else 400
-            else:
-                return jsonify({'error': f'不支持的任务类型: {task["task_type"]}'}), 400
-        
-        except Exception as e:
-            # 捕获完整的异常堆栈
-            error_trace = traceback.format_exc()
-            logger.error(f'任务 {task_id} 执行异常:\n{error_trace}')
-            
-            # 记录执行失败
+        def record_result(future):
+            """作业结束后记录执行结果（合并到已有作业时同样记录到本任务）"""
+            result = future.result()
+            logger.info(f'任务 {task_id} 执行结果: {result}')
+            status = 'success' if result.get('success') else 'failed'
             LogService.log_task(
                 task_id=task_id,
                 account_id=task['account_id'],
                 task_type=task['task_type'],
-                status='failed',
-                message=f'任务执行异常: {str(e)}'
+                status=status,
+                message=result.get('message', '')
             )
-            
             LogService.log_operation(
                 action='schedule_execute',
-                message=f'手动执行任务 {task_id} 异常: {str(e)}',
+                message=f'手动执行任务 {task_id}（{task["task_type"]}）：{result.get("message", "")}',
                 user_id=actor.get('user_id'),
                 username=actor.get('username'),
-                status='failed'
+                status=status
             )
-            
-            ScheduleService.record_execution(task_id, False, str(e))
-            
-            return jsonify({'error': f'任务执行失败: {str(e)}'}), 500
+            ScheduleService.record_execution(task_id, result.get('success', False), result.get('message'))
+        
+        job.future.add_done_callback(record_result)
+        
+        if data.get('wait'):
+            result = job.future.result()
+            return jsonify({
+                'success': result.get('success', False),
+                'message': result.get('message', '任务执行失败'),
+                'result': result
+            }), 200 if result.get('success') else 400
+        
+        return jsonify({
+            'success': True,
+            'message': '任务已提交执行' if created else '账户已有参数相同的获取作业，已合并',
+            'job_id': job.job_id,
+            'coalesced': not created,
+            'job': job.to_dict(include_result=False)
+        }), 202
     
     except Exception as e:
         import traceback
@@ -348,6 +359,35 @@ def execute_task_now(task_id):
         return jsonify({'error': str(e)}), 500
 
 
+
+@schedule_bp.route('/fetch/statistics', methods=['GET'])
+@token_required
+def get_fetch_statistics():
+    """获取频道获取调度器的并发与排队统计、定时任务执行器统计、EPG 会话缓存命中情况、连接池复用情况，以及 EPG 请求的熔断与耗时分布"""
+    try:
+        from app.services.fetch_orchestrator import get_fetch_orchestrator
+        from app.services.fetch_jobs import get_fetch_job_manager
+        from app.utils.http_resilience import get_http_statistics
+        from app.utils.http_transport import get_transport_statistics
+        from app.utils.tellyget_core import get_session_cache_stats
+        from app.utils.scheduler import get_scheduler
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                **get_fetch_orchestrator().get_statistics(),
+                'scheduler': get_scheduler().get_statistics(),
+                'jobs': get_fetch_job_manager().get_statistics(),
+                'epg_sessions': get_session_cache_stats(),
+                'epg_http': get_http_statistics(),
+                'epg_transport': get_transport_statistics()
+            }
+        }), 200
+    
+    except Exception as e:
+        logger.error(f'获取调度统计异常: {e}')
+        return jsonify({'error': str(e)}), 500
+
 def _is_valid_time_format(time_str):
     """验证时间格式 (HH:MM)"""
     try:
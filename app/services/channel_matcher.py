@@ -1,64 +1,121 @@
 """
 频道匹配服务
 将电信接口返回的频道与模板库进行匹配，补充分类等信息
+
+模板库以 channel_template 表为唯一数据源（public/data.json 仅用于初始化该表），
+匹配引擎在内存中维护一份不可变索引，整体替换、按版本号失效。
 """
 
-import json
-import os
-from app.utils import get_logger, execute_query, execute_update
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from types import MappingProxyType
+from app.utils import get_logger, execute_query, get_db_context
+from app.services.playlist_service import PlaylistService
 
 logger = get_logger('channel_matcher')
 
+# UPDATE ... FROM 需要 SQLite 3.33+，更早的版本改用关联子查询
+_UPDATE_FROM_SUPPORTED = sqlite3.sqlite_version_info >= (3, 33, 0)
+
 
 class ChannelMatcher:
     """频道匹配器"""
-    
+
     def __init__(self):
-        self.template_data = None
-        self.channel_map = {}  # channel_id -> template
-        self._load_template()
-    
-    def _load_template(self):
-        """加载频道模板库"""
-        try:
-            template_path = os.path.join(
-                os.path.dirname(__file__), 
-                '../../public/data.json'
-            )
-            
-            if not os.path.exists(template_path):
-                logger.warning('频道模板文件不存在')
-                return
-            
-            with open(template_path, 'r', encoding='utf-8') as f:
-                self.template_data = json.load(f)
-            
-            # 建立 channel_id 映射
-            for channel in self.template_data.get('channels', []):
-                self.channel_map[channel['channel_id']] = channel
-            
-            logger.info(f'加载了 {len(self.channel_map)} 个模板频道')
-            
-        except Exception as e:
-            logger.error(f'加载频道模板失败: {e}')
-    
+        self._lock = threading.Lock()
+        self._version = 0
+        # (构建时的版本号, channel_id -> 模板)，模板为只读字典
+        self._snapshot = (-1, MappingProxyType({}))
+        self._stats = {
+            'lookups': 0,
+            'hits': 0,
+            'loads': 0,
+            'load_time_ms': 0.0,
+            'loaded_at': None,
+        }
+
+    def invalidate(self):
+        """使索引失效，下次匹配时从数据库重新加载"""
+        with self._lock:
+            self._version += 1
+
+    def reload(self):
+        """
+        立即从数据库重新加载模板库（启动预热 / 热更新）
+
+        Returns:
+            int: 加载的模板数量
+        """
+        self.invalidate()
+        return len(self._get_index())
+
+    def _get_index(self):
+        """获取模板索引，版本过期时重建"""
+        version, index = self._snapshot
+        if version == self._version:
+            return index
+
+        with self._lock:
+            version, index = self._snapshot
+            if version == self._version:
+                return index
+
+            building_version = self._version
+            started = time.perf_counter()
+            rows = execute_query('SELECT id, channel_id, name, group_title FROM channel_template')
+            index = MappingProxyType({
+                str(row['channel_id']): MappingProxyType(row)
+                for row in rows
+            })
+            load_time_ms = (time.perf_counter() - started) * 1000
+
+            self._snapshot = (building_version, index)
+            self._stats['loads'] += 1
+            self._stats['load_time_ms'] = round(load_time_ms, 3)
+            self._stats['loaded_at'] = datetime.now().isoformat()
+
+        logger.info(f'加载了 {len(index)} 个模板频道，耗时 {load_time_ms:.1f}ms')
+        return index
+
+    def match_many(self, channel_ids):
+        """
+        批量匹配模板频道
+
+        Args:
+            channel_ids: 电信接口返回的频道ID列表
+
+        Returns:
+            dict: channel_id -> 模板频道信息（包含 name, group_title 等），未匹配为 None
+        """
+        index = self._get_index()
+        result = {channel_id: index.get(str(channel_id)) for channel_id in channel_ids}
+        hits = sum(1 for template in result.values() if template is not None)
+
+        with self._lock:
+            self._stats['lookups'] += len(result)
+            self._stats['hits'] += hits
+
+        return result
+
     def match_channel(self, channel_id):
         """
         根据 channel_id 匹配模板频道
-        
+
         Args:
             channel_id: 电信接口返回的频道ID
-            
+
         Returns:
             dict: 匹配到的模板频道信息，包含 name, group_title 等
             None: 未匹配到
         """
-        return self.channel_map.get(str(channel_id))
-    
-    def enrich_channel(self, channel_data):
+        return self.match_many([channel_id])[channel_id]
+
+    def enrich_channel(self, channel_data, template=None):
         """
         增强频道数据，补充分类等信息
-        
+
         Args:
             channel_data: 电信接口返回的频道数据
                 {
@@ -67,7 +124,8 @@ class ChannelMatcher:
                     'ChannelURL': 'igmp://...',
                     ...
                 }
-        
+            template: 已匹配到的模板（可选，不传则自行匹配）
+
         Returns:
             dict: 增强后的频道数据
                 {
@@ -82,10 +140,11 @@ class ChannelMatcher:
         channel_id = channel_data.get('ChannelID', '')
         channel_name = channel_data.get('ChannelName', '')
         channel_url = channel_data.get('ChannelURL', '')
-        
+
         # 匹配模板
-        template = self.match_channel(channel_id)
-        
+        if template is None:
+            template = self.match_channel(channel_id)
+
         enriched = {
             'channel_id': channel_id,
             'channel_name': channel_name,
@@ -99,128 +158,173 @@ class ChannelMatcher:
             'category': None,
             'template_name': None
         }
-        
+
         if template:
             enriched['is_matched'] = True
             enriched['category'] = template.get('group_title')
             enriched['template_name'] = template.get('name')
             # 优先使用模板的标准名称
             enriched['channel_name'] = template.get('name')
-            
+
             logger.debug(f'频道 {channel_id} 匹配成功: {enriched["template_name"]} ({enriched["category"]})')
         else:
             logger.debug(f'频道 {channel_id} 未匹配到模板: {channel_name}')
-        
+
         return enriched
-    
+
     def enrich_channels_batch(self, channels_data):
         """
         批量增强频道数据
-        
+
         Args:
             channels_data: 电信接口返回的频道列表
-        
+
         Returns:
             list: 增强后的频道列表
         """
-        enriched_channels = []
-        matched_count = 0
-        
-        for channel in channels_data:
-            enriched = self.enrich_channel(channel)
-            enriched_channels.append(enriched)
-            
-            if enriched['is_matched']:
-                matched_count += 1
-        
+        templates = self.match_many(channel.get('ChannelID', '') for channel in channels_data)
+        enriched_channels = [
+            self.enrich_channel(channel, templates[channel.get('ChannelID', '')] or {})
+            for channel in channels_data
+        ]
+        matched_count = sum(1 for enriched in enriched_channels if enriched['is_matched'])
+
         logger.info(f'批量增强完成: 总数 {len(channels_data)}, 匹配 {matched_count}, 未匹配 {len(channels_data) - matched_count}')
-        
+
         return enriched_channels
-    
-    def update_database_categories(self, source_id):
+
+    def update_database_categories(self, source_id=None):
         """
-        更新数据库中已存在频道的分类信息
-        
+        按模板库批量更新数据库中已存在频道的分类和标准名称
+
+        模板映射先写入临时表，再用一条 UPDATE 关联更新，整个过程在一个事务内完成，
+        耗时与模板数量相关，而不是逐行更新。只更新分类或标准名称与模板不一致的频道，
+        并清空其内容摘要，下次获取时按更新后的字段重新计算。
+        SQLite 3.33 以上使用 UPDATE ... FROM，更早的版本使用等价的关联子查询。
+
         Args:
-            source_id: 源ID
-            
+            source_id: 源ID（可选，不传则处理所有源）
+
         Returns:
             dict: 更新结果 {'updated': 10, 'skipped': 5}
         """
+        index = self._get_index()
+        source_clause = 'AND channels.source_id = ?' if source_id is not None else ''
+        params = (source_id,) if source_id is not None else ()
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
         try:
-            # 获取该源下的所有频道
-            sql = """
-                SELECT id, channel_id, channel_name, category
-                FROM channels
-                WHERE source_id = ?
-            """
-            channels = execute_query(sql, (source_id,))
-            
-            updated_count = 0
-            skipped_count = 0
-            
-            for channel in channels:
-                # 匹配模板
-                template = self.match_channel(channel['channel_id'])
-                
-                if template:
-                    new_category = template.get('group_title')
-                    new_name = template.get('name')
-                    
-                    # 更新分类和标准名称
-                    if channel['category'] != new_category:
-                        update_sql = """
-                            UPDATE channels 
-                            SET category = ?, channel_name = ?, updated_at = datetime('now')
-                            WHERE id = ?
+            with get_db_context() as db:
+                try:
+                    db.execute('DROP TABLE IF EXISTS temp.template_map')
+                    db.execute("""
+                        CREATE TEMP TABLE template_map (
+                            channel_id TEXT PRIMARY KEY,
+                            name TEXT,
+                            group_title TEXT
+                        )
+                    """)
+                    db.executemany(
+                        'INSERT INTO temp.template_map (channel_id, name, group_title) VALUES (?, ?, ?)',
+                        ((channel_id, template['name'], template['group_title'])
+                         for channel_id, template in index.items())
+                    )
+
+                    total = db.execute(
+                        f'SELECT COUNT(*) FROM channels WHERE 1=1 {source_clause}',
+                        params
+                    ).fetchone()[0]
+
+                    if _UPDATE_FROM_SUPPORTED:
+                        sql = f"""
+                            UPDATE channels
+                            SET category = m.group_title,
+                                channel_name = m.name,
+                                content_hash = NULL,
+                                updated_at = ?
+                            FROM temp.template_map AS m
+                            WHERE channels.channel_id = m.channel_id
+                              AND (channels.category IS NOT m.group_title
+                                   OR channels.channel_name IS NOT m.name)
+                              {source_clause}
                         """
-                        execute_update(update_sql, (new_category, new_name, channel['id']))
-                        updated_count += 1
-                        logger.debug(f'更新频道 {channel["id"]}: {new_name} -> {new_category}')
                     else:
-                        skipped_count += 1
-                else:
-                    skipped_count += 1
-            
+                        sql = f"""
+                            UPDATE channels
+                            SET category = (SELECT m.group_title FROM temp.template_map AS m
+                                            WHERE m.channel_id = channels.channel_id),
+                                channel_name = (SELECT m.name FROM temp.template_map AS m
+                                                WHERE m.channel_id = channels.channel_id),
+                                content_hash = NULL,
+                                updated_at = ?
+                            WHERE EXISTS (
+                                SELECT 1 FROM temp.template_map AS m
+                                WHERE m.channel_id = channels.channel_id
+                                  AND (channels.category IS NOT m.group_title
+                                       OR channels.channel_name IS NOT m.name)
+                            )
+                              {source_clause}
+                        """
+                    cursor = db.execute(sql, (now,) + params)
+                    updated_count = cursor.rowcount
+
+                    db.execute('DROP TABLE temp.template_map')
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+
+            skipped_count = total - updated_count
+            if updated_count:
+                PlaylistService.invalidate(source_id)
             logger.info(f'分类更新完成: 更新 {updated_count}, 跳过 {skipped_count}')
-            
+
             return {
                 'updated': updated_count,
                 'skipped': skipped_count
             }
-            
+
         except Exception as e:
             logger.error(f'更新数据库分类失败: {e}')
             raise
-    
+
     def get_statistics(self):
         """
-        获取模板库统计信息
-        
+        获取模板库及匹配统计信息
+
         Returns:
             dict: 统计信息
         """
-        if not self.template_data:
-            return None
-        
+        index = self._get_index()
+
         categories = {}
-        for channel in self.template_data.get('channels', []):
-            category = channel.get('group_title', '未分类')
+        for template in index.values():
+            category = template.get('group_title') or '未分类'
             categories[category] = categories.get(category, 0) + 1
-        
+
+        with self._lock:
+            stats = dict(self._stats)
+            version = self._snapshot[0]
+
+        stats['hit_ratio'] = round(stats['hits'] / stats['lookups'], 4) if stats['lookups'] else 0.0
         return {
-            'total': len(self.channel_map),
-            'categories': categories
+            'total': len(index),
+            'categories': categories,
+            'version': version,
+            **stats
         }
 
 
 # 全局实例
 _matcher_instance = None
+_matcher_lock = threading.Lock()
 
 
 def get_channel_matcher():
     """获取频道匹配器单例"""
     global _matcher_instance
     if _matcher_instance is None:
-        _matcher_instance = ChannelMatcher()
+        with _matcher_lock:
+            if _matcher_instance is None:
+                _matcher_instance = ChannelMatcher()
     return _matcher_instance
@@ -3,6 +3,8 @@
 """
 from app.utils import get_db_context, execute_query, execute_update
 from app.utils.logger import get_logger
+from app.services.channel_matcher import get_channel_matcher
+from app.services.playlist_service import PlaylistService
 from datetime import datetime
 
 logger = get_logger()
@@ -166,6 +168,7 @@ class ChannelTemplateService:
                    VALUES (?, ?, ?, ?)''',
                 (new_id, str(channel_id), name, group_title)
             )
+            ChannelTemplateService.invalidate_index()
             
             logger.info(f"添加频道模板: {name} ({channel_id}) - {group_title}")
             return {'success': True, 'message': '添加成功', 'id': new_id}
@@ -234,6 +237,7 @@ class ChannelTemplateService:
             
             sql = f"UPDATE channel_template SET {', '.join(updates)} WHERE id = ?"
             execute_update(sql, tuple(params))
+            ChannelTemplateService.invalidate_index()
             
             logger.info(f"更新频道模板: ID={template_id}")
             return {'success': True, 'message': '更新成功'}
@@ -269,6 +273,7 @@ class ChannelTemplateService:
                 'DELETE FROM channel_template WHERE id = ?',
                 (template_id,)
             )
+            ChannelTemplateService.invalidate_index()
             
             logger.info(f"删除频道模板: {template['name']} ({template['channel_id']})")
             return {'success': True, 'message': '删除成功'}
@@ -277,6 +282,32 @@ class ChannelTemplateService:
             logger.error(f"删除频道模板失败: {e}")
             return {'success': False, 'message': str(e)}
     
+    @staticmethod
+    def invalidate_index():
+        """使匹配引擎的模板索引（下次匹配时重建）和播放列表缓存失效（播放列表的 tvg-name 取自模板）"""
+        get_channel_matcher().invalidate()
+        PlaylistService.invalidate()
+    
+    @staticmethod
+    def match_channels_info(channel_ids):
+        """
+        批量匹配频道信息，规则同 match_channel_info
+        
+        Args:
+            channel_ids (iterable): 频道ID列表
+            
+        Returns:
+            dict: channel_id -> {'name': 频道名称, 'group_title': 分组}
+        """
+        templates = get_channel_matcher().match_many(channel_ids)
+        return {
+            channel_id: (
+                {'name': template['name'], 'group_title': template['group_title']}
+                if template else {'name': None, 'group_title': '未分类'}
+            )
+            for channel_id, template in templates.items()
+        }
+    
     @staticmethod
     def match_channel_info(channel_id):
         """
@@ -290,7 +321,7 @@ class ChannelTemplateService:
         Returns:
             dict: {'name': 频道名称, 'group_title': 分组}
         """
-        template = ChannelTemplateService.get_template_by_channel_id(channel_id)
+        template = get_channel_matcher().match_channel(channel_id)
         
         if template:
             return {
@@ -0,0 +1,311 @@
+"""
+频道获取作业
+接口提交获取任务后立即返回作业 ID，客户端轮询或流式订阅作业进度；
+同一账户、相同参数（是否过滤标清、过滤规则）的进行中作业会被复用，重复提交不会再次访问 EPG；
+参数不同的提交排在该账户已有作业之后执行，保存的频道以最后执行的作业为准
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+
+from app.utils import get_logger
+from app.services.fetch_orchestrator import get_fetch_orchestrator
+from app.utils.channel_filter import ChannelFilterError, compile_channel_filters
+from config import get_config
+
+logger = get_logger('fetch_jobs')
+config = get_config()
+
+# 进度阶段的显示名称
+STAGE_NAMES = {
+    'queued': '排队中',
+    'authenticating': '正在认证',
+    'downloading': '正在获取频道列表',
+    'parsing': '正在解析频道',
+    'saving': '正在保存',
+    'finished': '已完成',
+}
+
+
+def _params_key(filter_sd, channel_filters):
+    """作业参数的规范化表示，参数相同的提交才能合并"""
+    try:
+        rules = compile_channel_filters(channel_filters).rules
+    except ChannelFilterError:
+        # 无效规则由获取过程报告失败，这里只需保证不与其他参数合并
+        rules = ('invalid', repr(channel_filters))
+    return bool(filter_sd), rules
+
+
+class FetchJob:
+    """一次频道获取作业"""
+
+    def __init__(self, account_id, filter_sd=True, channel_filters=None, task_id=None, source='manual'):
+        """
+        Args:
+            account_id: 账户 ID
+            filter_sd: 是否过滤标清频道
+            channel_filters: 频道名称过滤器
+            task_id: 定时任务 ID（可选）
+            source: 提交来源（manual 手动获取 / task 执行定时任务 / schedule 定时触发）
+        """
+        self.job_id = uuid.uuid4().hex
+        self.account_id = account_id
+        self.filter_sd = filter_sd
+        self.channel_filters = channel_filters
+        self.task_id = task_id
+        self.source = source
+        self.status = 'queued'   # queued / running / success / failed
+        self.stage = 'queued'
+        self.done = None
+        self.total = None
+        self.message = STAGE_NAMES['queued']
+        self.result = None
+        self.coalesced = 0       # 合并进来的重复提交次数
+        self.queued_after = None  # 排在同一账户的哪个作业之后执行（作业 ID）
+        self.params_key = _params_key(filter_sd, channel_filters)
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.version = 0         # 每次状态变化加 1，供流式订阅判断
+        self.future = Future()   # 结果为获取结果 dict
+        self._cond = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ('success', 'failed')
+
+    def update_progress(self, stage, done=None, total=None):
+        """进度回调（由获取线程、事件循环线程或写线程调用）"""
+        with self._cond:
+            if self.finished:
+                return
+            if self.status == 'queued':
+                self.status = 'running'
+                self.started_at = datetime.now()
+            self.stage = stage
+            self.done = done
+            self.total = total
+            name = STAGE_NAMES.get(stage, stage)
+            self.message = f'{name} {done}/{total}' if total is not None else name
+            self.version += 1
+            self._cond.notify_all()
+
+    def finish(self, result):
+        """记录结果并唤醒订阅者"""
+        with self._cond:
+            self.result = result
+            self.status = 'success' if result.get('success') else 'failed'
+            self.stage = 'finished'
+            self.message = result.get('message', '')
+            self.finished_at = datetime.now()
+            if self.started_at is None:
+                self.started_at = self.finished_at
+            self.version += 1
+            self._cond.notify_all()
+        self.future.set_result(result)
+
+    def wait_for_change(self, version, timeout=None):
+        """
+        等待作业状态变化
+
+        Args:
+            version: 调用方已看到的版本
+            timeout: 最长等待秒数
+
+        Returns:
+            bool: 版本是否已变化
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self.version != version, timeout)
+
+    def to_dict(self, include_result=True):
+        """转换为字典"""
+        with self._cond:
+            data = {
+                'job_id': self.job_id,
+                'account_id': self.account_id,
+                'task_id': self.task_id,
+                'source': self.source,
+                'status': self.status,
+                'stage': self.stage,
+                'progress': {'done': self.done, 'total': self.total},
+                'message': self.message,
+                'coalesced': self.coalesced,
+                'queued_after': self.queued_after,
+                'version': self.version,
+                'created_at': self.created_at.isoformat(),
+                'started_at': self.started_at.isoformat() if self.started_at else None,
+                'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            }
+            if include_result:
+                data['result'] = self.result
+            return data
+
+
+class FetchJobManager:
+    """频道获取作业管理：提交、合并同一账户相同参数的重复提交、保留最近的作业供查询"""
+
+    def __init__(self, history=None):
+        """
+        Args:
+            history: 保留的已结束作业数（默认 FETCH_JOB_HISTORY）
+        """
+        self.history = max(1, int(history or config.FETCH_JOB_HISTORY))
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()   # job_id -> FetchJob（按提交顺序）
+        self._active = {}            # account_id -> 未结束的 FetchJob 列表（按执行顺序）
+        self._stats = {'submitted': 0, 'coalesced': 0, 'queued': 0}
+
+    def submit(self, account_id, filter_sd=True, channel_filters=None, task_id=None, source='manual'):
+        """
+        提交获取作业（立即返回）
+
+        同一账户任一未结束的作业（运行中或排队中）参数相同时直接返回该作业，不再重复获取；
+        都不相同时新建作业，排在该账户最后一个作业之后执行（同一账户不会同时保存两份频道）。
+
+        Returns:
+            tuple: (FetchJob, 是否为新建的作业)
+        """
+        key = _params_key(filter_sd, channel_filters)
+        with self._lock:
+            pending = self._active.setdefault(account_id, [])
+            same = next((job for job in pending if job.params_key == key), None)
+            if same is not None:
+                same.coalesced += 1
+                self._stats['coalesced'] += 1
+                logger.info(f'账户 {account_id} 已有参数相同的获取作业 {same.job_id}，合并本次提交')
+                return same, False
+
+            previous = pending[-1] if pending else None
+
+            job = FetchJob(account_id, filter_sd, channel_filters, task_id, source)
+            self._jobs[job.job_id] = job
+            pending.append(job)
+            self._stats['submitted'] += 1
+            if previous is not None:
+                job.queued_after = previous.job_id
+                self._stats['queued'] += 1
+                logger.info(f'账户 {account_id} 的获取作业 {previous.job_id} 参数不同，新作业 {job.job_id} 排在其后执行')
+            self._prune()
+
+        if previous is None:
+            self._start(job)
+        else:
+            previous.future.add_done_callback(lambda f: self._start(job))
+        return job, True
+
+    def _start(self, job):
+        """把作业交给获取调度器"""
+        try:
+            future = get_fetch_orchestrator().submit(
+                account_id=job.account_id,
+                filter_sd=job.filter_sd,
+                channel_filters=job.channel_filters,
+                task_id=job.task_id,
+                progress=job.update_progress
+            )
+        except Exception as e:
+            # 获取线程池已关闭等情况：作业直接以失败结束，不留在进行中
+            future = Future()
+            future.set_exception(e)
+        future.add_done_callback(lambda f: self._on_done(job, f))
+
+    def _on_done(self, job, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.error(f'获取作业 {job.job_id} 异常: {e}')
+            result = {
+                'success': False,
+                'message': f'系统异常: {str(e)}',
+                'channel_count': 0
+            }
+        with self._lock:
+            pending = self._active.get(job.account_id, [])
+            if job in pending:
+                pending.remove(job)
+            if not pending:
+                self._active.pop(job.account_id, None)
+        job.finish(result)
+
+    def _prune(self):
+        """只保留最近 history 个已结束的作业（调用方持有锁）"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        """获取作业"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self, account_id=None, limit=50):
+        """
+        获取最近的作业（最新的在前）
+
+        Args:
+            account_id: 账户 ID（可选）
+            limit: 返回条数
+        """
+        with self._lock:
+            jobs = list(self._jobs.values())
+        jobs.reverse()
+        if account_id is not None:
+            jobs = [job for job in jobs if job.account_id == account_id]
+        return jobs[:limit]
+
+    def iter_updates(self, job, timeout=None, heartbeat=15):
+        """
+        逐次产出作业状态，直到作业结束
+
+        Args:
+            job: FetchJob
+            timeout: 最长订阅秒数（可选，默认 FETCH_JOB_STREAM_TIMEOUT）
+            heartbeat: 无变化时重复输出当前状态的间隔秒数（保持连接）
+
+        Yields:
+            dict: 作业状态（结束时包含结果）
+        """
+        timeout = config.FETCH_JOB_STREAM_TIMEOUT if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        version = None
+        while True:
+            finished = job.finished
+            snapshot = job.to_dict(include_result=finished)
+            yield snapshot
+            if finished:
+                return
+            version = snapshot['version']
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            job.wait_for_change(version, min(heartbeat, remaining))
+
+    def get_statistics(self):
+        """作业统计"""
+        with self._lock:
+            return {
+                **self._stats,
+                'active': sum(len(pending) for pending in self._active.values()),
+                'retained': len(self._jobs),
+            }
+
+
+# 全局实例
+_manager_instance = None
+_manager_lock = threading.Lock()
+
+
+def get_fetch_job_manager():
+    """获取频道获取作业管理器单例"""
+    global _manager_instance
+    if _manager_instance is None:
+        with _manager_lock:
+            if _manager_instance is None:
+                _manager_instance = FetchJobManager()
+    return _manager_instance
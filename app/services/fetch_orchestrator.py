@@ -0,0 +1,151 @@
+"""
+频道获取调度器
+多个账户的频道获取并发执行：网络请求在有界线程池中进行（所有账户访问同一个 EPG 认证主机，
+线程数即对该主机的并发上限）；写库统一交给单个写线程串行执行，避免多个获取任务争抢 SQLite 写锁
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.utils import get_logger
+from app.services.iptv_service import IPTVService
+from config import get_config
+
+logger = get_logger('fetch_orchestrator')
+config = get_config()
+
+
+class FetchOrchestrator:
+    """频道获取调度器"""
+
+    def __init__(self, max_workers=None):
+        """
+        初始化调度器
+
+        Args:
+            max_workers: 获取线程数（默认 FETCH_MAX_WORKERS）
+        """
+        self.max_workers = max(1, int(max_workers or config.FETCH_MAX_WORKERS))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='fetch-worker'
+        )
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fetch-db-writer')
+        self._lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'queued': 0,
+            'running': 0,
+        }
+
+    def submit(self, account_id, filter_sd=True, channel_filters=None, task_id=None, progress=None):
+        """
+        提交一个账户的频道获取任务（立即返回）
+
+        Args:
+            account_id: 账户 ID
+            filter_sd: 是否过滤标清频道
+            channel_filters: 频道名称过滤器
+            task_id: 定时任务 ID（可选，仅用于日志）
+            progress: 进度回调 progress(stage, done=None, total=None)（可选），stage 依次为
+                authenticating / downloading / parsing / saving，可能在不同线程中调用
+
+        Returns:
+            Future: 结果为 IPTVService.fetch_and_save_channels 的返回值，
+                另附 timings: {'queue_wait_ms', 'fetch_ms', 'save_ms', 'run_ms'}
+        """
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self._stats['submitted'] += 1
+            self._stats['queued'] += 1
+        return self._executor.submit(
+            self._run, account_id, filter_sd, channel_filters, task_id, submitted_at, progress
+        )
+
+    def _run(self, account_id, filter_sd, channel_filters, task_id, submitted_at, progress=None):
+        """在获取线程中执行：网络请求 -> 交给写线程保存"""
+        started = time.perf_counter()
+        with self._lock:
+            self._stats['queued'] -= 1
+            self._stats['running'] += 1
+
+        timings = {'queue_wait_ms': round((started - submitted_at) * 1000, 1)}
+        result = None
+        try:
+            fetched = IPTVService.fetch_remote_channels(account_id, filter_sd, channel_filters, progress)
+            timings['fetch_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+            if fetched['success']:
+                save_started = time.perf_counter()
+                result = self._writer.submit(
+                    IPTVService.save_fetched_channels,
+                    fetched['account'], fetched['channels'], fetched['page_digest'], progress
+                ).result()
+                IPTVService.merge_fetch_report(result, fetched)
+                timings['save_ms'] = round((time.perf_counter() - save_started) * 1000, 1)
+            else:
+                result = fetched
+        except Exception as e:
+            logger.error(f'账户 {account_id} 获取任务异常: {e}')
+            result = {
+                'success': False,
+                'message': f'系统异常: {str(e)}',
+                'channel_count': 0
+            }
+        finally:
+            timings['run_ms'] = round((time.perf_counter() - started) * 1000, 1)
+            with self._lock:
+                self._stats['running'] -= 1
+                self._stats['completed' if result and result.get('success') else 'failed'] += 1
+
+        result['timings'] = timings
+        logger.info(
+            f'账户 {account_id} 获取完成（任务 {task_id}）: {"成功" if result.get("success") else "失败"}，'
+            f'排队 {timings["queue_wait_ms"]}ms，运行 {timings["run_ms"]}ms'
+        )
+        return result
+
+    def run(self, account_id, filter_sd=True, channel_filters=None, task_id=None):
+        """
+        提交获取任务并等待结果（供同步接口使用，仍受并发限制）
+
+        Returns:
+            dict: 同 submit 的 Future 结果
+        """
+        return self.submit(account_id, filter_sd, channel_filters, task_id).result()
+
+    def get_statistics(self):
+        """
+        获取调度器统计信息
+
+        Returns:
+            dict: 线程数及 submitted / completed / failed / queued / running 计数
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            'max_workers': self.max_workers,
+            **stats
+        }
+
+    def shutdown(self, wait=True):
+        """关闭线程池"""
+        self._executor.shutdown(wait=wait)
+        self._writer.shutdown(wait=wait)
+
+
+# 全局实例
+_orchestrator_instance = None
+_orchestrator_lock = threading.Lock()
+
+
+def get_fetch_orchestrator():
+    """获取频道获取调度器单例"""
+    global _orchestrator_instance
+    if _orchestrator_instance is None:
+        with _orchestrator_lock:
+            if _orchestrator_instance is None:
+                _orchestrator_instance = FetchOrchestrator()
+    return _orchestrator_instance
@@ -3,11 +3,14 @@ IPTV 直播源服务层
 负责调用 tellyget_core 获取频道并保存到数据库
 """
 
+import hashlib
+import json
 from datetime import datetime
 from app.utils.tellyget_core import TellyGetCore
-from app.utils.database import execute_query, execute_update
+from app.utils.database import execute_query, iter_query, execute_update, get_db_context
 from app.utils import get_logger
 from app.services.channel_template_service import ChannelTemplateService
+from app.services.playlist_service import PlaylistService
 
 logger = get_logger('iptv_service')
 
@@ -15,11 +18,37 @@ logger = get_logger('iptv_service')
 class IPTVService:
     """IPTV 服务类"""
     
+    # 依赖 channels(source_id, channel_id) 唯一索引（见 init_database）
+    _UPSERT_CHANNEL_SQL = """
+        INSERT INTO channels (
+            source_id, channel_id, channel_name, channel_url,
+            user_channel_id, time_shift, channel_sdp_url,
+            channel_logo_url, positon, category, status,
+            content_hash, created_at, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)
+        ON CONFLICT(source_id, channel_id) DO UPDATE SET
+            channel_name = excluded.channel_name,
+            channel_url = excluded.channel_url,
+            channel_logo_url = excluded.channel_logo_url,
+            category = excluded.category,
+            content_hash = excluded.content_hash,
+            updated_at = excluded.updated_at
+    """
+    
+    # 参与内容摘要计算的字段
+    _HASH_FIELDS = ('channel_name', 'channel_url', 'channel_logo_url', 'category')
+    
+    # 保存频道时每比较多少个频道报告一次进度
+    _PROGRESS_STEP = 200
+
     @staticmethod
     def fetch_and_save_channels(account_id, filter_sd=True, channel_filters=None):
         """
         获取并保存频道到数据库
         
+        依次执行 fetch_remote_channels（网络请求）和 save_fetched_channels（写库），
+        需要并发获取多个账户时使用 FetchOrchestrator 分别调度这两步。
+        
         Args:
             account_id: 账户 ID（从 accounts 表）
             filter_sd: 是否过滤标清频道
@@ -29,9 +58,38 @@ class IPTVService:
             dict: {
                 'success': bool,
                 'message': str,
-                'channel_count': int
+                'channel_count': int,
+                'diff': {'added': int, 'changed': int, 'removed': int, 'unchanged': int},
+                'skipped': bool,    # 页面未变化，跳过了解析和保存
+                'excluded': list,   # 被名称过滤器排除的频道 {'channel_id', 'channel_name', 'rule'}
+                'variant_groups': list  # 标清过滤去重的分组 {'name', 'winner', 'variant', 'dropped'}
             }
         """
+        fetched = IPTVService.fetch_remote_channels(account_id, filter_sd, channel_filters)
+        if not fetched['success']:
+            return fetched
+        result = IPTVService.save_fetched_channels(fetched['account'], fetched['channels'], fetched['page_digest'])
+        return IPTVService.merge_fetch_report(result, fetched)
+
+    @staticmethod
+    def fetch_remote_channels(account_id, filter_sd=True, channel_filters=None, progress=None):
+        """
+        从 EPG 获取账户的频道列表（只做网络请求，不写频道表）
+        
+        频道列表页面的摘要与账户上次保存的相同（且直播源已有频道）时不解析页面，
+        返回的 channels 为 None。
+        
+        Args:
+            account_id: 账户 ID（从 accounts 表）
+            filter_sd: 是否过滤标清频道
+            channel_filters: 频道名称过滤器
+            progress: 进度回调 progress(stage)（可选）
+            
+        Returns:
+            dict: 成功时 {'success': True, 'account': dict, 'channels': list | None,
+                'page_digest': str, 'excluded': list, 'variant_groups': list}，
+                失败时 {'success': False, 'message': str, 'channel_count': 0}
+        """
         try:
             # 获取账户信息
             account = IPTVService._get_account(account_id)
@@ -62,8 +120,9 @@ class IPTVService:
                 address=account.get('address', '')
             )
             
-            # 获取频道
-            success, result = core.fetch_channels(filter_sd, channel_filters)
+            # 获取频道（直播源还没有频道时不比较摘要，必须完整保存一次）
+            known_digest = account['page_digest'] if account['has_channels'] else None
+            success, result = core.fetch_channels(filter_sd, channel_filters, known_digest, progress)
             
             if not success:
                 return {
@@ -72,38 +131,106 @@ class IPTVService:
                     'channel_count': 0
                 }
             
-            channels = result
-            logger.info(f'获取到 {len(channels)} 个频道，开始保存到数据库')
+            if result is None:
+                logger.info(f'账户 {account["username"]} 的频道列表页面未变化，跳过解析')
+            else:
+                logger.info(f'获取到 {len(result)} 个频道')
+            return {
+                'success': True,
+                'account': account,
+                'channels': result,
+                'page_digest': core.page_digest,
+                'excluded': core.excluded_channels,
+                'variant_groups': core.variant_groups
+            }
             
-            # 保存到数据库
-            saved_count = IPTVService._save_channels_to_db(account_id, channels)
+        except Exception as e:
+            return IPTVService._fetch_error(account_id, e)
+
+    @staticmethod
+    def save_fetched_channels(account, channels, page_digest=None, progress=None):
+        """
+        保存 fetch_remote_channels 获取到的频道并更新账户状态
+        
+        Args:
+            account: 账户信息（fetch_remote_channels 返回的 account）
+            channels: 电信接口返回的原始频道列表，None 表示页面未变化
+            page_digest: 频道列表页面摘要，保存成功后记录到账户
+            progress: 进度回调 progress('saving', 已处理数, 总数)（可选）
+            
+        Returns:
+            dict: 同 fetch_and_save_channels
+        """
+        try:
+            if channels is None:
+                # 页面未变化：不匹配模板、不写频道表，只更新获取时间
+                IPTVService._update_account_status(account['id'], success=True)
+                count = execute_query(
+                    'SELECT COUNT(*) AS count FROM channels WHERE source_id = ?',
+                    (account['source_id'],)
+                )[0]['count']
+                return {
+                    'success': True,
+                    'message': f'频道列表未变化，跳过解析和保存（共 {count} 个频道）',
+                    'channel_count': count,
+                    'diff': {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': count},
+                    'skipped': True
+                }
+            
+            logger.info(f'开始保存账户 {account["username"]} 的 {len(channels)} 个频道到数据库')
+            
+            # 保存到数据库（单事务批量写入）
+            save_result = IPTVService._save_channels_to_db(account['source_id'], channels, progress)
+            saved_count = save_result['saved']
+            diff = {key: save_result[key] for key in ('added', 'changed', 'removed', 'unchanged')}
+            if diff['added'] or diff['changed'] or diff['removed']:
+                PlaylistService.invalidate(account['source_id'])
             
             # 更新账户状态
-            IPTVService._update_account_status(account_id, success=True)
+            IPTVService._update_account_status(account['id'], success=True, page_digest=page_digest)
             
             return {
                 'success': True,
-                'message': f'成功保存 {saved_count} 个频道',
-                'channel_count': saved_count
+                'message': (
+                    f'成功同步 {saved_count} 个频道'
+                    f'（新增 {diff["added"]}，更新 {diff["changed"]}，'
+                    f'删除 {diff["removed"]}，未变化 {diff["unchanged"]}）'
+                ),
+                'channel_count': saved_count,
+                'diff': diff,
+                'skipped': False
             }
             
         except Exception as e:
-            import traceback
-            error_trace = traceback.format_exc()
-            error_msg = str(e) if str(e) else f"{type(e).__name__}: 无详细信息"
-            logger.error(f'获取并保存频道异常: {error_msg}\n{error_trace}')
-            IPTVService._update_account_status(account_id, success=False, error=error_msg)
-            return {
-                'success': False,
-                'message': f'系统异常: {error_msg}',
-                'channel_count': 0
-            }
+            return IPTVService._fetch_error(account['id'], e)
+
+    @staticmethod
+    def merge_fetch_report(result, fetched):
+        """把获取阶段的过滤报告（excluded / variant_groups）附加到保存结果中"""
+        for key in ('excluded', 'variant_groups'):
+            result[key] = fetched[key]
+        return result
+
+    @staticmethod
+    def _fetch_error(account_id, e):
+        """记录获取 / 保存频道时的异常并返回失败结果"""
+        import traceback
+        error_trace = traceback.format_exc()
+        error_msg = str(e) if str(e) else f"{type(e).__name__}: 无详细信息"
+        logger.error(f'获取并保存频道异常: {error_msg}\n{error_trace}')
+        IPTVService._update_account_status(account_id, success=False, error=error_msg)
+        return {
+            'success': False,
+            'message': f'系统异常: {error_msg}',
+            'channel_count': 0
+        }
 
     @staticmethod
     def _get_account(account_id):
         """获取账户信息"""
         sql = """
-            SELECT id, username, password, mac, imei, address, source_id
+            SELECT id, username, password, mac, imei, address, source_id, channel_page_digest,
+                   EXISTS(SELECT 1 FROM channels WHERE channels.source_id = accounts.source_id) AS has_channels
             FROM accounts
             WHERE id = ?
         """
@@ -117,118 +244,247 @@ class IPTVService:
                 'mac': row['mac'],
                 'imei': row['imei'] or '',
                 'address': row['address'] or '',
-                'source_id': row['source_id']
+                'source_id': row['source_id'],
+                'page_digest': row['channel_page_digest'],
+                'has_channels': bool(row['has_channels'])
             }
         return None
 
     @staticmethod
-    def _save_channels_to_db(account_id, channels):
-        """保存频道到数据库（自动匹配模板库补充分类信息）"""
-        account = IPTVService._get_account(account_id)
-        if not account or not account['source_id']:
-            logger.warning(f'账户 {account_id} 没有关联直播源')
-            return 0
-        
-        source_id = account['source_id']
-        saved_count = 0
+    def _content_hash(channel):
+        """频道内容摘要（名称、地址、台标、分类），用于与已保存的频道比较"""
+        content = '\x1f'.join(str(channel[field] or '') for field in IPTVService._HASH_FIELDS)
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _save_channels_to_db(source_id, channels, progress=None):
+        """
+        差异同步频道到数据库（自动匹配模板库补充分类信息）
+
+        整批频道在同一个连接、同一个事务中完成：一次性读出该源已有频道的内容摘要，
+        与本次获取的频道逐个比较，只写入新增、内容变化和已下线（删除）的频道，
+        并把每一项变化记录到 channel_changes 表，只提交一次。内容未变化的频道不写入。
+
+        Args:
+            source_id: 直播源 ID
+            channels: 电信接口返回的原始频道列表
+            progress: 进度回调 progress('saving', 已处理数, 总数)（可选）
+
+        Returns:
+            dict: {
+                'saved': int,       # 本次获取的频道数
+                'added': int,       # 新增
+                'changed': int,     # 内容有变化而更新
+                'removed': int,     # 已不在本次列表中而删除
+                'unchanged': int,   # 内容未变化，未写入
+                'matched': int      # 匹配到模板库的频道数
+            }
+        """
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         matched_count = 0
         
+        # 解析频道（同一批次内重复的 channel_id 以最后一条为准）
+        rows = {}
         for channel in channels:
             try:
-                # 解析频道信息
                 parsed = TellyGetCore.parse_channel_info(channel)
+                rows[parsed['channel_id']] = parsed
+            except Exception as e:
+                logger.error(f'解析频道失败 {channel.get("ChannelName", "Unknown")}: {e}')
+                continue
+        
+        # 整批匹配模板库，使用匹配结果或原始信息
+        match_infos = ChannelTemplateService.match_channels_info(rows.keys())
+        for channel_id, parsed in rows.items():
+            match_info = match_infos[channel_id]
+            if match_info['name']:
+                parsed['channel_name'] = match_info['name']
+                matched_count += 1
+            parsed['category'] = match_info['group_title']  # "未分类" 或实际分类
+            parsed['content_hash'] = IPTVService._content_hash(parsed)
+        
+        counts = {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0}
+        upsert_params = []
+        journal = []
+        report = progress or (lambda stage, done=None, total=None: None)
+        total = len(rows)
+        report('saving', 0, total)
+        
+        with get_db_context() as db:
+            try:
+                existing = {
+                    row['channel_id']: row
+                    for row in db.execute(
+                        """
+                        SELECT id, channel_id, channel_name, channel_url, channel_logo_url,
+                               category, content_hash
+                        FROM channels
+                        WHERE source_id = ?
+                        """,
+                        (source_id,)
+                    )
+                }
                 
-                # 使用模板匹配频道名称和分组
-                channel_id = parsed['channel_id']
-                match_info = ChannelTemplateService.match_channel_info(channel_id)
-                
-                # 使用匹配结果或原始信息
-                final_name = match_info['name'] if match_info['name'] else parsed['channel_name']
-                final_category = match_info['group_title']  # "未分类" 或实际分类
-                
-                # 统计匹配成功的频道
-                if match_info['name']:
-                    matched_count += 1
-                
-                # 检查频道是否已存在
-                check_sql = """
-                    SELECT id FROM channels
-                    WHERE source_id = ? AND channel_id = ?
-                """
-                existing = execute_query(check_sql, (source_id, channel_id))
-                
-                if existing:
-                    # 更新已存在的频道（包含分类信息）
-                    update_sql = """
-                        UPDATE channels
-                        SET channel_name = ?,
-                            channel_url = ?,
-                            channel_logo_url = ?,
-                            category = ?,
-                            updated_at = ?
-                        WHERE source_id = ? AND channel_id = ?
-                    """
-                    execute_update(update_sql, (
-                        final_name,
-                        parsed['channel_url'],
-                        parsed['channel_logo_url'],
-                        final_category,
-                        datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                        source_id,
-                        channel_id
-                    ))
-                else:
-                    # 插入新频道（包含分类信息）
-                    insert_sql = """
-                        INSERT INTO channels (
-                            source_id, channel_id, channel_name, channel_url,
-                            user_channel_id, time_shift, channel_sdp_url,
-                            channel_logo_url, positon, category, status,
-                            created_at, updated_at
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """
-                    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    execute_update(insert_sql, (
+                for done, (channel_id, parsed) in enumerate(rows.items()):
+                    if done and done % IPTVService._PROGRESS_STEP == 0:
+                        report('saving', done, total)
+                    old = existing.get(channel_id)
+                    new_hash = parsed['content_hash']
+                    if old is None:
+                        counts['added'] += 1
+                        journal.append((source_id, channel_id, 'added', parsed['channel_name'], None, new_hash, None))
+                    else:
+                        # 升级前保存的频道没有摘要，按已保存的字段计算
+                        old_hash = old['content_hash'] or IPTVService._content_hash(old)
+                        if old_hash == new_hash:
+                            counts['unchanged'] += 1
+                            continue
+                        counts['changed'] += 1
+                        details = {
+                            field: [old[field], parsed[field]]
+                            for field in IPTVService._HASH_FIELDS
+                            if (old[field] or '') != (parsed[field] or '')
+                        }
+                        journal.append((
+                            source_id, channel_id, 'changed', parsed['channel_name'],
+                            old_hash, new_hash, json.dumps(details, ensure_ascii=False)
+                        ))
+                    
+                    upsert_params.append((
                         source_id,
                         channel_id,
-                        final_name,
+                        parsed['channel_name'],
                         parsed['channel_url'],
                         parsed['user_channel_id'],
                         parsed['time_shift'],
                         parsed['channel_sdp_url'],
                         parsed['channel_logo_url'],
                         parsed['positon'],
-                        final_category,
-                        0,  # status: 0 表示启用
+                        parsed['category'],
+                        new_hash,
                         now,
                         now
                     ))
                 
-                saved_count += 1
+                removed = [old for channel_id, old in existing.items() if channel_id not in rows]
+                counts['removed'] = len(removed)
+                for old in removed:
+                    journal.append((
+                        source_id, old['channel_id'], 'removed', old['channel_name'],
+                        old['content_hash'] or IPTVService._content_hash(old), None, None
+                    ))
                 
-            except Exception as e:
-                logger.error(f'保存频道失败 {parsed.get("channel_name", "Unknown")}: {e}')
-                continue
+                if upsert_params:
+                    db.executemany(IPTVService._UPSERT_CHANNEL_SQL, upsert_params)
+                if removed:
+                    db.executemany('DELETE FROM channels WHERE id = ?', [(old['id'],) for old in removed])
+                if journal:
+                    db.executemany(
+                        """
+                        INSERT INTO channel_changes (
+                            source_id, channel_id, change_type, channel_name,
+                            old_hash, new_hash, details, created_at
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        [entry + (now,) for entry in journal]
+                    )
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        report('saving', total, total)
         
-        logger.info(f'成功保存 {saved_count} 个频道，其中 {matched_count} 个匹配到模板库')
-        return saved_count
+        result = {'saved': len(rows), 'matched': matched_count, **counts}
+        logger.info(
+            f'同步 {result["saved"]} 个频道（新增 {counts["added"]}，更新 {counts["changed"]}，'
+            f'删除 {counts["removed"]}，未变化 {counts["unchanged"]}），其中 {matched_count} 个匹配到模板库'
+        )
+        return result
 
     @staticmethod
-    def _update_account_status(account_id, success=True, error=None):
-        """更新账户状态"""
+    def get_channel_changes(source_id, limit=100):
+        """
+        获取直播源的频道变更记录（最新的在前）
+        
+        Args:
+            source_id: 直播源 ID
+            limit: 返回条数
+            
+        Returns:
+            list: 变更记录
+        """
+        sql = """
+            SELECT id, channel_id, change_type, channel_name, old_hash, new_hash, details, created_at
+            FROM channel_changes
+            WHERE source_id = ?
+            ORDER BY id DESC
+            LIMIT ?
+        """
+        changes = execute_query(sql, (source_id, limit))
+        for change in changes:
+            change['details'] = json.loads(change['details']) if change['details'] else None
+        return changes
+
+    @staticmethod
+    def cleanup_channel_changes(days=30):
+        """
+        清除超过指定天数的频道变更记录
+        
+        Args:
+            days: 保留天数
+            
+        Returns:
+            int: 删除的记录数
+        """
+        sql = "DELETE FROM channel_changes WHERE created_at < datetime('now', 'localtime', '-' || ? || ' days')"
+        result = execute_update(sql, (days,))
+        logger.info(f'频道变更记录清理完成：删除 {result} 条超过{days}天的记录')
+        return result
+
+    @staticmethod
+    def _update_account_status(account_id, success=True, error=None, page_digest=None):
+        """更新账户状态（page_digest 不为空时同时记录频道列表页面摘要）"""
         sql = """
             UPDATE accounts
             SET last_fetch_time = ?,
-                last_fetch_status = ?
+                last_fetch_status = ?,
+                channel_page_digest = COALESCE(?, channel_page_digest)
             WHERE id = ?
         """
         status = 'success' if success else 'failed'
         execute_update(sql, (
             datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             status if not error else f'{status}: {error}',
+            page_digest,
             account_id
         ))
 
+    @staticmethod
+    def iter_channels_by_source(source_id, status=None):
+        """
+        逐行迭代直播源的频道（直接遍历游标，适合流式输出）
+        
+        Args:
+            source_id: 直播源 ID
+            status: 频道状态（可选）
+            
+        Yields:
+            dict: 频道信息
+        """
+        sql = """
+            SELECT id, channel_id, channel_name, channel_url,
+                   channel_logo_url, status, created_at, updated_at
+            FROM channels
+            WHERE source_id = ?
+        """
+        params = [source_id]
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(status)
+        sql += " ORDER BY positon ASC, id ASC"
+        
+        return iter_query(sql, tuple(params))
+
     @staticmethod
     def get_channels_by_source(source_id, status=None):
         """
@@ -241,39 +497,7 @@ class IPTVService:
         Returns:
             list: 频道列表
         """
-        if status is not None:
-            sql = """
-                SELECT id, channel_id, channel_name, channel_url,
-                       channel_logo_url, status, created_at, updated_at
-                FROM channels
-                WHERE source_id = ? AND status = ?
-                ORDER BY positon ASC, id ASC
-            """
-            result = execute_query(sql, (source_id, status))
-        else:
-            sql = """
-                SELECT id, channel_id, channel_name, channel_url,
-                       channel_logo_url, status, created_at, updated_at
-                FROM channels
-                WHERE source_id = ?
-                ORDER BY positon ASC, id ASC
-            """
-            result = execute_query(sql, (source_id,))
-        
-        channels = []
-        for row in result:
-            channels.append({
-                'id': row[0],
-                'channel_id': row[1],
-                'channel_name': row[2],
-                'channel_url': row[3],
-                'channel_logo_url': row[4],
-                'status': row[5],
-                'created_at': row[6],
-                'updated_at': row[7]
-            })
-        
-        return channels
+        return list(IPTVService.iter_channels_by_source(source_id, status))
 
     @staticmethod
     def update_channel_status(channel_id, status):
@@ -299,6 +523,9 @@ class IPTVService:
                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 channel_id
             ))
+            channel = execute_query("SELECT source_id FROM channels WHERE id = ?", (channel_id,), fetch_one=True)
+            if channel:
+                PlaylistService.invalidate(channel['source_id'])
             return True
         except Exception as e:
             logger.error(f'更新频道状态失败: {e}')
@@ -318,6 +545,7 @@ class IPTVService:
         sql = "DELETE FROM channels WHERE source_id = ?"
         try:
             execute_update(sql, (source_id,))
+            PlaylistService.invalidate(source_id)
             logger.info(f'删除直播源 {source_id} 的所有频道')
             return True
         except Exception as e:
@@ -0,0 +1,247 @@
+"""
+播放列表服务
+按格式（txt / m3u / json）逐行从数据库游标流式生成频道导出内容；
+单个源的导出结果按 (source_id, category, format) 缓存为可直接发送的字节（LRU，最多 PLAYLIST_CACHE_SIZE 个，
+m3u8 与 m3u 共用一份），只有对应源的频道发生变化时才失效重建，播放器轮询时无需访问数据库
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+from app.utils import iter_query, get_logger
+from config import get_config
+
+logger = get_logger('playlist_service')
+config = get_config()
+
+# body: 响应字节; etag: 内容摘要; last_modified: 生成时间(UTC); channel_count: 频道数
+PlaylistArtifact = namedtuple('PlaylistArtifact', ['body', 'etag', 'last_modified', 'channel_count'])
+
+_cache = OrderedDict()  # (source_id, category, format) -> PlaylistArtifact，按最近使用排序
+_cache_lock = threading.Lock()
+_generation = 0  # 每次失效递增，避免把失效前开始生成的旧内容写入缓存
+
+
+class PlaylistFormat:
+    """
+    播放列表格式基类
+
+    按 begin() -> write(row) * N -> end() 的顺序输出文本片段，
+    row 按分组、频道名排序，字段见 PlaylistService._PLAYLIST_SQL
+    """
+    mimetype = 'text/plain; charset=utf-8'
+    extension = 'txt'
+
+    def __init__(self):
+        self.count = 0
+
+    def begin(self):
+        return ''
+
+    def write(self, row):
+        return ''
+
+    def end(self):
+        return ''
+
+
+class TxtPlaylistFormat(PlaylistFormat):
+    """文本格式：分类,#genre# 行后跟 名称,地址 行"""
+
+    def __init__(self):
+        super().__init__()
+        self._group = None
+
+    def write(self, row):
+        self.count += 1
+        lines = []
+        if row['group_title'] != self._group:
+            self._group = row['group_title']
+            lines.append(f"{self._group},#genre#")
+        lines.append(f"{row['channel_name']},{row['channel_url']}")
+        text = '\n'.join(lines)
+        return text if self.count == 1 else '\n' + text
+
+
+class M3UPlaylistFormat(PlaylistFormat):
+    """扩展 M3U 格式，带 tvg-id / tvg-name / tvg-logo / group-title 及回看属性"""
+    mimetype = 'audio/x-mpegurl; charset=utf-8'
+    extension = 'm3u'
+
+    @staticmethod
+    def _attr(value):
+        return str(value or '').replace('"', "'")
+
+    def begin(self):
+        return '#EXTM3U\n'
+
+    def write(self, row):
+        self.count += 1
+        name = row['channel_name']
+        attrs = [
+            f'tvg-id="{self._attr(row["channel_id"])}"',
+            f'tvg-name="{self._attr(row["template_name"] or name)}"',
+            f'tvg-logo="{self._attr(row["channel_logo_url"])}"',
+            f'group-title="{self._attr(row["group_title"])}"',
+        ]
+        if str(row['time_shift'] or '') == '1' and config.PLAYLIST_CATCHUP_SOURCE:
+            attrs.append('catchup="append"')
+            attrs.append(f'catchup-source="{config.PLAYLIST_CATCHUP_SOURCE}"')
+        return f"#EXTINF:-1 {' '.join(attrs)},{name}\n{row['channel_url']}\n"
+
+
+class JsonPlaylistFormat(PlaylistFormat):
+    """JSON 数组格式"""
+    mimetype = 'application/json; charset=utf-8'
+    extension = 'json'
+
+    def begin(self):
+        return '['
+
+    def write(self, row):
+        self.count += 1
+        item = json.dumps({
+            'tvg_id': row['channel_id'],
+            'name': row['channel_name'],
+            'tvg_name': row['template_name'] or row['channel_name'],
+            'url': row['channel_url'],
+            'logo': row['channel_logo_url'] or '',
+            'group': row['group_title'],
+            'catchup': str(row['time_shift'] or '') == '1',
+        }, ensure_ascii=False)
+        return item if self.count == 1 else ',' + item
+
+    def end(self):
+        return ']'
+
+
+PLAYLIST_FORMATS = {
+    'txt': TxtPlaylistFormat,
+    'm3u': M3UPlaylistFormat,
+    'm3u8': M3UPlaylistFormat,
+    'json': JsonPlaylistFormat,
+}
+
+
+class PlaylistService:
+    """播放列表服务类"""
+
+    _PLAYLIST_SQL = """
+        SELECT c.channel_id, c.channel_name, c.channel_url, c.channel_logo_url,
+               c.time_shift, COALESCE(c.category, '未分类') AS group_title,
+               t.name AS template_name
+        FROM channels c
+        LEFT JOIN channel_template t ON t.channel_id = c.channel_id
+        WHERE 1=1
+    """
+
+    @staticmethod
+    def get_format(fmt):
+        """
+        获取格式实现
+
+        Args:
+            fmt: 格式名（txt / m3u / m3u8 / json）
+
+        Returns:
+            PlaylistFormat: 格式实例，不支持的格式返回 None
+        """
+        format_cls = PLAYLIST_FORMATS.get((fmt or 'txt').lower())
+        return format_cls() if format_cls else None
+
+    @staticmethod
+    def iter_playlist(playlist_format, source_id=None, category=None):
+        """
+        逐行流式生成播放列表
+
+        Args:
+            playlist_format: PlaylistFormat 实例
+            source_id: 源ID（可选，不传则包含所有源）
+            category: 分类（可选）
+
+        Yields:
+            str: 文本片段
+        """
+        sql = PlaylistService._PLAYLIST_SQL
+        params = []
+
+        if source_id:
+            sql += " AND c.source_id = ?"
+            params.append(source_id)
+
+        if category:
+            sql += " AND c.category = ?"
+            params.append(category)
+
+        sql += " ORDER BY group_title, c.channel_name"
+
+        yield playlist_format.begin()
+        for row in iter_query(sql, tuple(params)):
+            yield playlist_format.write(row)
+        yield playlist_format.end()
+
+    @staticmethod
+    def get_artifact(source_id=None, category=None, fmt='txt'):
+        """
+        获取播放列表（优先使用缓存）
+
+        Args:
+            source_id: 源ID（可选，不传则包含所有源）
+            category: 分类（可选）
+            fmt: 格式（txt / m3u / m3u8 / json）
+
+        Returns:
+            tuple: (PlaylistArtifact, 是否命中缓存)
+        """
+        playlist_format = PlaylistService.get_format(fmt)
+        # 同一实现的格式（m3u / m3u8）共用一份缓存
+        key = (source_id, category or None, playlist_format.extension)
+        with _cache_lock:
+            artifact = _cache.get(key)
+            generation = _generation
+            if artifact is not None:
+                _cache.move_to_end(key)
+        if artifact is not None:
+            return artifact, True
+
+        artifact = PlaylistService._build(source_id, category, playlist_format)
+        # 不存在的分类（生成结果为空）不缓存，任意 category 参数无法挤占缓存
+        if generation == _generation and (artifact.channel_count or not category):
+            with _cache_lock:
+                if generation == _generation:
+                    _cache[key] = artifact
+                    while len(_cache) > config.PLAYLIST_CACHE_SIZE:
+                        _cache.popitem(last=False)
+        logger.info(f'生成播放列表 {key}: {artifact.channel_count} 个频道, {len(artifact.body)} 字节')
+        return artifact, False
+
+    @staticmethod
+    def invalidate(source_id=None):
+        """
+        使播放列表缓存失效
+
+        Args:
+            source_id: 源ID（可选，不传则清空全部缓存）
+        """
+        global _generation
+        with _cache_lock:
+            _generation += 1
+            if source_id is None:
+                _cache.clear()
+            else:
+                # 包含所有源的列表（source_id 为 None）也一并失效
+                for key in [key for key in _cache if key[0] in (source_id, None)]:
+                    del _cache[key]
+
+    @staticmethod
+    def _build(source_id, category, playlist_format):
+        """生成完整的播放列表字节"""
+        body = ''.join(PlaylistService.iter_playlist(playlist_format, source_id, category)).encode('utf-8')
+        return PlaylistArtifact(
+            body=body,
+            etag=hashlib.sha1(body).hexdigest(),
+            last_modified=datetime.now(timezone.utc).replace(microsecond=0),
+            channel_count=playlist_format.count
+        )
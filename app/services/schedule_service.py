@@ -2,10 +2,14 @@
 定时任务管理服务
 """
 
-from app.utils import execute_query, execute_update, get_logger
+from app.utils import execute_query, execute_update, get_db_context, get_logger
+from app.utils.channel_filter import ChannelFilterError, compile_channel_filters
+from app.utils.cron import CronError, validate_schedule
 from app.utils.scheduler import Task, get_scheduler
+from config import get_config
 
 logger = get_logger('schedule_service')
+config = get_config()
 
 
 class ScheduleService:
@@ -13,7 +17,8 @@ class ScheduleService:
     
     @staticmethod
     def create_task(account_id, task_type, schedule_time, repeat_type='daily', 
-                   filter_sd=True, channel_filters=None, is_enabled=True):
+                   filter_sd=True, channel_filters=None, is_enabled=True,
+                   cron_expr=None, jitter_minutes=0):
         """
         创建定时任务
         
@@ -21,26 +26,38 @@ class ScheduleService:
             account_id: 账户 ID
             task_type: 任务类型 (fetch_channels 等)
             schedule_time: 调度时间 (HH:MM 格式)
-            repeat_type: 重复类型 (once, daily, weekly, monthly)
+            repeat_type: 重复类型 (once, daily, weekly, monthly, cron)
             filter_sd: 是否过滤标清频道
-            channel_filters: 频道过滤器 (JSON 字符串)
+            channel_filters: 频道过滤器（列表、JSON 数组或逗号分隔的字符串，统一保存为 JSON 数组）
             is_enabled: 是否启用
+            cron_expr: cron 表达式（repeat_type 为 cron 时必填）
+            jitter_minutes: 抖动窗口（分钟），执行时间在窗口内按任务 ID 固定错开
             
         Returns:
             dict: 任务信息
         """
+        try:
+            channel_filters = compile_channel_filters(channel_filters).to_json()
+            cron_expr, jitter_minutes = validate_schedule(repeat_type, schedule_time, cron_expr, jitter_minutes)
+        except (ChannelFilterError, CronError) as e:
+            return {
+                'success': False,
+                'message': str(e)
+            }
+        
         try:
             # 插入数据库
             sql = """
                 INSERT INTO schedule_tasks 
                 (account_id, task_type, schedule_time, repeat_type, filter_sd, 
-                 channel_filters, is_enabled, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                 channel_filters, is_enabled, cron_expr, jitter_minutes, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
             """
             
             execute_update(sql, (
                 account_id, task_type, schedule_time, repeat_type,
-                1 if filter_sd else 0, channel_filters, 1 if is_enabled else 0
+                1 if filter_sd else 0, channel_filters, 1 if is_enabled else 0,
+                cron_expr, jitter_minutes
             ))
             
             # 获取插入的任务
@@ -57,9 +74,12 @@ class ScheduleService:
                     is_enabled=is_enabled,
                     repeat_type=repeat_type,
                     filter_sd=filter_sd,
-                    channel_filters=channel_filters
+                    channel_filters=channel_filters,
+                    cron_expr=cron_expr,
+                    jitter_minutes=jitter_minutes
                 )
                 scheduler.add_task(task_obj)
+                scheduler.flush_state()
             
             return {
                 'success': True,
@@ -79,7 +99,8 @@ class ScheduleService:
         sql = """
             SELECT id, account_id, task_type, schedule_time, repeat_type,
                    filter_sd, channel_filters, is_enabled, last_executed,
-                   next_execution, execution_count, last_error, created_at, updated_at
+                   next_execution, execution_count, last_error, cron_expr, jitter_minutes,
+                   created_at, updated_at
             FROM schedule_tasks
             WHERE id = ?
         """
@@ -92,10 +113,11 @@ class ScheduleService:
         sql = """
             SELECT id, account_id, task_type, schedule_time, repeat_type,
                    filter_sd, channel_filters, is_enabled, last_executed,
-                   next_execution, execution_count, last_error, created_at, updated_at
+                   next_execution, execution_count, last_error, cron_expr, jitter_minutes,
+                   created_at, updated_at
             FROM schedule_tasks
             WHERE account_id = ? AND task_type = ?
-            ORDER BY created_at DESC
+            ORDER BY created_at DESC, id DESC
             LIMIT 1
         """
         result = execute_query(sql, (account_id, task_type), fetch_one=True)
@@ -108,7 +130,8 @@ class ScheduleService:
             sql = """
                 SELECT id, account_id, task_type, schedule_time, repeat_type,
                        filter_sd, channel_filters, is_enabled, last_executed,
-                       next_execution, execution_count, last_error, created_at, updated_at
+                       next_execution, execution_count, last_error, cron_expr, jitter_minutes,
+                       created_at, updated_at
                 FROM schedule_tasks
                 WHERE account_id = ?
                 ORDER BY created_at DESC
@@ -118,7 +141,8 @@ class ScheduleService:
             sql = """
                 SELECT id, account_id, task_type, schedule_time, repeat_type,
                        filter_sd, channel_filters, is_enabled, last_executed,
-                       next_execution, execution_count, last_error, created_at, updated_at
+                       next_execution, execution_count, last_error, cron_expr, jitter_minutes,
+                       created_at, updated_at
                 FROM schedule_tasks
                 ORDER BY created_at DESC
             """
@@ -130,7 +154,7 @@ class ScheduleService:
         try:
             allowed_fields = {
                 'schedule_time', 'repeat_type', 'filter_sd', 
-                'channel_filters', 'is_enabled'
+                'channel_filters', 'is_enabled', 'cron_expr', 'jitter_minutes'
             }
             
             updates = {}
@@ -144,6 +168,39 @@ class ScheduleService:
                     'message': '没有要更新的字段'
                 }
             
+            if 'channel_filters' in updates:
+                try:
+                    updates['channel_filters'] = compile_channel_filters(updates['channel_filters']).to_json()
+                except ChannelFilterError as e:
+                    return {
+                        'success': False,
+                        'message': str(e)
+                    }
+            
+            if {'schedule_time', 'repeat_type', 'cron_expr', 'jitter_minutes'} & updates.keys():
+                # 与未修改的字段一起校验
+                current = ScheduleService.get_task(task_id)
+                if not current:
+                    return {
+                        'success': False,
+                        'message': '任务不存在'
+                    }
+                merged = {**current, **updates}
+                try:
+                    cron_expr, jitter_minutes = validate_schedule(
+                        merged['repeat_type'], merged['schedule_time'],
+                        merged.get('cron_expr'), merged.get('jitter_minutes')
+                    )
+                except CronError as e:
+                    return {
+                        'success': False,
+                        'message': str(e)
+                    }
+                if 'cron_expr' in updates or 'repeat_type' in updates:
+                    updates['cron_expr'] = cron_expr
+                if 'jitter_minutes' in updates:
+                    updates['jitter_minutes'] = jitter_minutes
+            
             # 构建 SQL
             set_clause = ', '.join([f'{k} = ?' for k in updates.keys()])
             values = list(updates.values()) + [task_id]
@@ -156,17 +213,14 @@ class ScheduleService:
             
             execute_update(sql, values)
             
-            # 更新调度器中的任务
+            # 更新调度器中的任务（调度时间变化时重新排入调度队列）
+            task_updates = dict(updates)
+            for key in ('is_enabled', 'filter_sd'):
+                if key in task_updates:
+                    task_updates[key] = task_updates[key] == 1 or task_updates[key] is True
             scheduler = get_scheduler()
-            task = scheduler.get_task(task_id)
-            if task:
-                for key, value in updates.items():
-                    if key == 'is_enabled':
-                        task.is_enabled = value == 1 or value is True
-                    elif key == 'filter_sd':
-                        task.filter_sd = value == 1 or value is True
-                    else:
-                        setattr(task, key, value)
+            scheduler.update_task(task_id, **task_updates)
+            scheduler.flush_state()
             
             return {
                 'success': True,
@@ -232,7 +286,7 @@ class ScheduleService:
         sql = (
             """
             UPDATE schedule_tasks
-            SET last_executed = CURRENT_TIMESTAMP,
+            SET last_executed = datetime('now', 'localtime'),
                 execution_count = execution_count + 1,
                 last_error = ?
             WHERE id = ?
@@ -241,15 +295,46 @@ class ScheduleService:
         last_error = None if success else (message or '执行失败')
         execute_update(sql, (last_error, task_id))
     
+    @staticmethod
+    def save_task_states(states):
+        """
+        批量保存调度器中的任务状态（下次执行时间、上次执行时间、换算后的 cron 表达式）
+        
+        Args:
+            states: Task.to_state() 的列表
+        """
+        # 调度器中的内置任务（如日志清理）没有数据库记录
+        rows = [
+            (state['next_execution'], state['last_executed'], state['cron_expr'], state['task_id'])
+            for state in states
+            if isinstance(state['task_id'], int)
+        ]
+        if not rows:
+            return
+        with get_db_context() as db:
+            db.executemany(
+                """
+                UPDATE schedule_tasks
+                SET next_execution = ?,
+                    last_executed = COALESCE(?, last_executed),
+                    cron_expr = ?
+                WHERE id = ?
+                """,
+                rows
+            )
+            db.commit()
+    
     @staticmethod
     def sync_tasks_to_scheduler():
         """
         将数据库中的任务同步到调度器
-        在应用启动时调用
+        在应用启动时调用：恢复持久化的下次执行时间，错过的执行按 SCHEDULER_CATCHUP_POLICY 处理
         """
         try:
             tasks = ScheduleService.get_all_tasks()
             scheduler = get_scheduler()
+            scheduler.set_state_store(ScheduleService.save_task_states)
+            policy = config.SCHEDULER_CATCHUP_POLICY
             
             for task_data in tasks:
                 task = Task(
@@ -260,10 +345,21 @@ class ScheduleService:
                     is_enabled=bool(task_data['is_enabled']),
                     repeat_type=task_data['repeat_type'],
                     filter_sd=bool(task_data['filter_sd']),
-                    channel_filters=task_data.get('channel_filters')
+                    channel_filters=task_data.get('channel_filters'),
+                    next_execution=task_data.get('next_execution'),
+                    last_executed=task_data.get('last_executed'),
+                    execution_count=task_data.get('execution_count'),
+                    cron_expr=task_data.get('cron_expr'),
+                    jitter_minutes=task_data.get('jitter_minutes')
                 )
+                if task.is_enabled:
+                    missed = task.catch_up(policy)
+                    if missed:
+                        logger.info(f'任务 {task.task_id} 在停机期间错过 {missed} 次执行（补跑策略: {policy}）')
                 scheduler.add_task(task)
             
+            # 恢复后的下次执行时间一次写回
+            scheduler.flush_state()
             logger.info(f'从数据库同步了 {len(tasks)} 个定时任务')
             return True
         except Exception as e:
@@ -2,7 +2,10 @@
 工具模块
 """
 from .auth import hash_password, verify_password, generate_token, verify_token, token_required
-from .database import get_db_connection, get_db_context, execute_query, execute_update, table_exists
+from .database import (
+    get_db_context, execute_query, iter_query, execute_update, table_exists,
+    get_pool_stats
+)
 from .logger import setup_logger, get_logger
 
 __all__ = [
@@ -11,11 +14,12 @@ __all__ = [
     'generate_token',
     'verify_token',
     'token_required',
-    'get_db_connection',
     'get_db_context',
     'execute_query',
+    'iter_query',
     'execute_update',
     'table_exists',
+    'get_pool_stats',
     'setup_logger',
     'get_logger',
 ]
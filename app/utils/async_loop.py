@@ -0,0 +1,75 @@
+"""
+后台事件循环 - 在独立线程中常驻一个 asyncio 事件循环，供同步代码提交协程
+"""
+import asyncio
+import threading
+
+from app.utils import get_logger
+
+logger = get_logger('async_loop')
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop():
+    """
+    获取后台事件循环（首次调用时启动后台线程）
+
+    Returns:
+        asyncio.AbstractEventLoop: 常驻运行的事件循环
+    """
+    global _loop
+    if _loop is not None and not _loop.is_closed():
+        return _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                loop.run_forever()
+
+            thread = threading.Thread(target=run, name='AsyncLoopThread', daemon=True)
+            thread.start()
+            started.wait()
+            _loop = loop
+            logger.info('后台事件循环已启动')
+        return _loop
+
+
+def in_event_loop():
+    """
+    当前是否运行在后台事件循环中
+
+    Returns:
+        bool: 在后台事件循环线程的协程中调用时为 True
+    """
+    try:
+        return asyncio.get_running_loop() is _loop
+    except RuntimeError:
+        return False
+
+
+def run_coroutine(coro, timeout=None):
+    """
+    在后台事件循环中执行协程并同步等待结果
+
+    不能在后台事件循环线程内调用（会自己等自己）。
+
+    Args:
+        coro: 协程对象
+        timeout (float): 最长等待秒数（可选）
+
+    Returns:
+        协程的返回值
+    """
+    loop = get_event_loop()
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
@@ -0,0 +1,133 @@
+"""
+频道清晰度去重 - 同一频道的多个清晰度版本只保留优先级最高的一个
+
+频道名末尾的清晰度标记（4K / 超高清 / 超清 / 高清 / HD / -HD / 标清 / SD）去掉后
+得到归一化名称，没有标记的视为标清。一次遍历建立 归一化名称 -> 当前最优频道 的索引，
+同一清晰度的重复频道（如仅码率不同）保留最先出现的一个，整体 O(n)。
+"""
+import re
+from functools import lru_cache
+
+# 清晰度 -> 频道名末尾的标记（不区分大小写）
+VARIANT_SUFFIXES = {
+    '4K': ('4K超高清', '超高清', '4K', 'UHD'),
+    '超清': ('超清', 'FHD'),
+    '高清': ('高清', 'HD'),
+    '标清': ('标清', 'SD'),
+}
+
+DEFAULT_VARIANT_PRIORITY = ('4K', '超清', '高清', '标清')
+
+# 没有清晰度标记的频道视为标清
+_DEFAULT_VARIANT = '标清'
+
+
+def parse_variant_priority(value):
+    """
+    解析清晰度优先级
+
+    Args:
+        value: 逗号分隔的字符串或列表，从高到低，如 "4K,超清,高清,标清"
+
+    Returns:
+        tuple: 清晰度优先级
+
+    Raises:
+        ValueError: 包含未知的清晰度
+    """
+    if not value:
+        return DEFAULT_VARIANT_PRIORITY
+    if isinstance(value, str):
+        value = value.split(',')
+    priority = tuple(item.strip() for item in value if item.strip())
+    unknown = [item for item in priority if item not in VARIANT_SUFFIXES]
+    if unknown:
+        raise ValueError(f'未知的清晰度: {", ".join(unknown)}')
+    return priority
+
+
+class VariantRules:
+    """清晰度识别与排序规则"""
+
+    def __init__(self, priority=DEFAULT_VARIANT_PRIORITY):
+        self.priority = tuple(priority)
+        # 不在优先级列表中的清晰度排在最后
+        self._rank = {variant: rank for rank, variant in enumerate(self.priority)}
+        self._variant_of = {}
+        suffixes = []
+        for variant, variant_suffixes in VARIANT_SUFFIXES.items():
+            for suffix in variant_suffixes:
+                self._variant_of[suffix.upper()] = variant
+                suffixes.append(suffix)
+        # 长标记优先（4K超高清 先于 超高清 / 4K）
+        suffixes.sort(key=len, reverse=True)
+        self._suffix_re = re.compile(
+            r'^(.+?)[\s\-_]*(' + '|'.join(re.escape(suffix) for suffix in suffixes) + r')$',
+            re.IGNORECASE
+        )
+
+    def normalize(self, name):
+        """
+        拆分频道名
+
+        Args:
+            name: 频道名称
+
+        Returns:
+            tuple: (归一化名称, 清晰度)
+        """
+        name = name.strip()
+        m = self._suffix_re.match(name)
+        if m is None:
+            return name, _DEFAULT_VARIANT
+        return m.group(1), self._variant_of[m.group(2).upper()]
+
+    def rank(self, variant):
+        """清晰度排序值，越小越优先"""
+        return self._rank.get(variant, len(self.priority))
+
+
+@lru_cache(maxsize=8)
+def get_variant_rules(priority=DEFAULT_VARIANT_PRIORITY):
+    """获取（缓存的）清晰度规则"""
+    return VariantRules(priority)
+
+
+def dedupe_channels(channels, rules=None, groups=None):
+    """
+    按归一化名称去重，每组保留清晰度优先级最高的频道（保持原有顺序）
+
+    Args:
+        channels: 原始频道列表
+        rules: VariantRules（可选，默认 4K > 超清 > 高清 > 标清）
+        groups: 可选列表，有频道被去掉的分组以
+            {'name', 'winner', 'variant', 'dropped'} 追加到其中
+
+    Returns:
+        list: 去重后的频道
+    """
+    rules = rules or get_variant_rules()
+    best = {}       # 归一化名称 -> (排序值, 频道下标)
+    members = {}    # 归一化名称 -> 组内频道下标（仅在需要报告分组时记录）
+    for i, channel in enumerate(channels):
+        base, variant = rules.normalize(channel.get('ChannelName', ''))
+        rank = rules.rank(variant)
+        current = best.get(base)
+        if current is None or rank < current[0]:
+            best[base] = (rank, i)
+        if groups is not None:
+            members.setdefault(base, []).append(i)
+
+    winners = {i for _, i in best.values()}
+    if groups is not None:
+        for base, indexes in members.items():
+            if len(indexes) < 2:
+                continue
+            winner = channels[best[base][1]]
+            groups.append({
+                'name': base,
+                'winner': winner.get('ChannelName', ''),
+                'variant': rules.normalize(winner.get('ChannelName', ''))[1],
+                'dropped': [channels[i].get('ChannelName', '') for i in indexes if i not in winners],
+            })
+    return [channel for i, channel in enumerate(channels) if i in winners]
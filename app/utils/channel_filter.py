@@ -0,0 +1,144 @@
+"""
+频道名称过滤器 - 将 channel_filters 中的正则规则一次编译，逐个频道单次匹配
+
+规则可以是列表、JSON 数组字符串（定时任务表单提交的格式）或逗号分隔的字符串。
+逗号分隔只用于不含逗号的简单规则：正则本身带逗号（如 {1,2}）时拆分会改变规则，直接拒绝。
+所有规则合并成一个带命名分组的交替表达式 (?P<f0>...)|(?P<f1>...)，
+一次 search 即可判断是否命中并得到命中的规则；规则自带分组（可能有反向引用）
+或带全局标志无法合并时，退回逐条预编译的规则集合。
+"""
+import json
+import re
+from functools import lru_cache
+
+
+class ChannelFilterError(ValueError):
+    """频道过滤规则无效"""
+
+
+# 带逗号的量词 {m,n} / {m,} / {,n}
+_COMMA_QUANTIFIER = re.compile(r'\{\d*,\d*\}')
+
+
+def _split_comma_rules(text):
+    """
+    拆分逗号分隔的规则；拆分有歧义时拒绝，而不是悄悄改变规则
+
+    Raises:
+        ChannelFilterError: 含带逗号的量词，或拆开后有无法编译的片段（如 [,;]）
+    """
+    if _COMMA_QUANTIFIER.search(text):
+        raise ChannelFilterError('规则中的逗号有歧义（如 {1,2}），请使用 JSON 数组提交频道过滤器')
+    rules = text.split(',')
+    for rule in rules:
+        try:
+            re.compile(rule.strip())
+        except re.error:
+            raise ChannelFilterError(f'按逗号拆分后的规则无效 "{rule.strip()}"，请使用 JSON 数组提交频道过滤器')
+    return rules
+
+
+def parse_filter_rules(value):
+    """
+    规范化频道过滤规则
+
+    Args:
+        value: None、规则列表、JSON 数组字符串或逗号分隔的字符串
+
+    Returns:
+        tuple: 去掉首尾空白和空规则后的规则
+
+    Raises:
+        ChannelFilterError: 格式错误，或逗号分隔的字符串无法无歧义地拆分
+    """
+    if not value:
+        return ()
+    if isinstance(value, str):
+        text = value.strip()
+        if text.startswith('['):
+            try:
+                value = json.loads(text)
+            except ValueError:
+                raise ChannelFilterError('频道过滤器不是有效的 JSON 数组')
+        else:
+            value = _split_comma_rules(text)
+    if not isinstance(value, (list, tuple)):
+        raise ChannelFilterError('频道过滤器应为字符串列表')
+    rules = []
+    for rule in value:
+        if not isinstance(rule, str):
+            raise ChannelFilterError(f'频道过滤规则应为字符串: {rule!r}')
+        rule = rule.strip()
+        if rule:
+            rules.append(rule)
+    return tuple(rules)
+
+
+class ChannelFilter:
+    """编译后的频道名称过滤器"""
+
+    def __init__(self, rules):
+        self.rules = tuple(rules)
+        self._patterns = []
+        for rule in self.rules:
+            try:
+                self._patterns.append(re.compile(rule))
+            except re.error as e:
+                raise ChannelFilterError(f'频道过滤规则无效 "{rule}": {e}')
+
+        self._combined = None
+        if self._patterns and not any(pattern.groups for pattern in self._patterns):
+            try:
+                self._combined = re.compile('|'.join(
+                    f'(?P<f{i}>{rule})' for i, rule in enumerate(self.rules)
+                ))
+            except re.error:
+                self._combined = None
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def match(self, name):
+        """
+        返回命中的规则
+
+        Args:
+            name: 频道名称
+
+        Returns:
+            str | None: 第一条命中的规则，未命中时为 None
+        """
+        if self._combined is not None:
+            m = self._combined.search(name)
+            return self.rules[int(m.lastgroup[1:])] if m else None
+        for rule, pattern in zip(self.rules, self._patterns):
+            if pattern.search(name):
+                return rule
+        return None
+
+    def to_json(self):
+        """规则的 JSON 文本（保存到 schedule_tasks.channel_filters）"""
+        return json.dumps(list(self.rules), ensure_ascii=False) if self.rules else None
+
+
+@lru_cache(maxsize=256)
+def _compile(rules):
+    return ChannelFilter(rules)
+
+
+def compile_channel_filters(value):
+    """
+    编译频道过滤规则（按规范化后的规则缓存，同一任务的规则只编译一次）
+
+    Args:
+        value: 同 parse_filter_rules；已编译的 ChannelFilter 原样返回
+
+    Returns:
+        ChannelFilter: 编译后的过滤器
+
+    Raises:
+        ChannelFilterError: 规则格式错误或正则表达式无效
+    """
+    if isinstance(value, ChannelFilter):
+        return value
+    return _compile(parse_filter_rules(value))
@@ -0,0 +1,138 @@
+"""
+频道列表解析器 - 直接在 getchannellistHWCTC.jsp 的响应字节上单遍扫描，逐个产出频道
+
+页面中每个频道是一段
+    Authentication.CTCSetConfig('Channel','ChannelID="6197",ChannelName="...",...');
+解析器用 bytes.find 在字节流上定位这些调用，不构建 HTML 树，也不对整页做正则回溯；
+支持分块输入（边下载边解析），跨块截断的调用会保留到下一块再解析。
+"""
+import re
+
+# 单个频道配置调用 Authentication.CTCSetConfig('Channel','<参数>')，
+# 与原实现的正则 Authentication.CTCSetConfig\('Channel','(.+?)'\) 语义一致：
+# 前缀后紧跟任意一个非换行字符，参数非空、不跨行，到第一个 ') 结束
+_CALL_PREFIX = b'Authentication'
+_CALL_START = b"CTCSetConfig('Channel','"
+_CALL_END = b"')"
+_PREFIX_LEN = len(_CALL_PREFIX) + 1
+_CHANNEL_ID_RE = re.compile(rb'ChannelID="[^"]+"')
+
+
+def parse_channel_params(params):
+    """
+    解析 ChannelID="..",ChannelName="..",... 形式的参数串
+
+    与原实现相同：按 '",' 切分、按第一个 '="' 拆分键值（最后一个值保留结尾的引号）
+
+    Args:
+        params (str): 参数串
+
+    Returns:
+        dict: 频道字段
+    """
+    channel = {}
+    for channel_param in params.split('",'):
+        if '="' in channel_param:
+            key, value = channel_param.split('="', 1)
+            channel[key] = value
+    return channel
+
+
+class ChannelListParser:
+    """
+    增量频道列表解析器
+
+    使用方法:
+        parser = ChannelListParser()
+        for chunk in chunks:
+            channels = parser.feed(chunk)
+            ...
+        channels = parser.close()
+    """
+
+    def __init__(self, encoding='utf-8'):
+        self.encoding = encoding or 'utf-8'
+        self._buffer = b''
+        self.count = 0
+
+    def _scan(self, buffer, final):
+        """扫描缓冲区中完整的频道调用，返回 (频道列表, 需要保留到下一块的起始位置)"""
+        channels = []
+        pos = 0
+        while True:
+            start = buffer.find(_CALL_START, pos)
+            if start == -1:
+                keep = max(pos, len(buffer) - len(_CALL_START) - _PREFIX_LEN)
+                break
+
+            body = start + len(_CALL_START)
+            end = buffer.find(_CALL_END, body + 1)
+            if end == -1:
+                keep = max(0, start - _PREFIX_LEN)
+                break
+
+            raw = buffer[body:end]
+            if b'\n' in raw:
+                # 参数跨行，不是一个有效调用，从参数开始处继续查找
+                pos = body
+                continue
+            pos = end + len(_CALL_END)
+
+            prefix_start = start - _PREFIX_LEN
+            if (prefix_start < 0 or buffer[prefix_start:start - 1] != _CALL_PREFIX
+                    or buffer[start - 1:start] == b'\n'):
+                continue
+            if not _CHANNEL_ID_RE.search(raw):
+                continue
+
+            channels.append(parse_channel_params(raw.decode(self.encoding, errors='replace')))
+
+        self.count += len(channels)
+        return channels, (len(buffer) if final else keep)
+
+    def feed(self, data):
+        """
+        输入一块数据
+
+        Args:
+            data (bytes): 响应数据块
+
+        Returns:
+            list: 本块中完整出现的频道
+        """
+        buffer = self._buffer + data if self._buffer else data
+        channels, keep = self._scan(buffer, final=False)
+        self._buffer = buffer[keep:]
+        return channels
+
+    def close(self):
+        """
+        结束输入
+
+        Returns:
+            list: 剩余数据中的频道
+        """
+        buffer, self._buffer = self._buffer, b''
+        channels, _ = self._scan(buffer, final=True)
+        return channels
+
+
+def iter_channels(data, encoding='utf-8'):
+    """
+    逐个产出页面中的频道
+
+    Args:
+        data: 页面内容（bytes / str）或 bytes 块的可迭代对象
+        encoding (str): 页面编码
+
+    Yields:
+        dict: 原始频道字段（ChannelID, ChannelName, ChannelURL, ...）
+    """
+    if isinstance(data, str):
+        data, encoding = data.encode('utf-8'), 'utf-8'
+    chunks = (data,) if isinstance(data, (bytes, bytearray)) else data
+
+    parser = ChannelListParser(encoding)
+    for chunk in chunks:
+        yield from parser.feed(bytes(chunk))
+    yield from parser.close()
@@ -0,0 +1,327 @@
+"""
+定时任务的下次执行时间计算 - cron 表达式与确定性的抖动窗口
+
+支持标准 5 段 cron 表达式（分 时 日 月 周）：
+    *  a  a-b  */n  a-b/n  a/n  以及逗号分隔的组合，月份和星期可以使用英文缩写（JAN、MON）；
+    日字段可以使用 L 表示每月最后一天；星期 0 和 7 都表示周日；
+    日和星期都不是 * 时按标准 cron 语义取并集。
+另支持 @hourly / @daily / @weekly / @monthly / @yearly。
+
+旧的重复类型换算为等价的 cron 表达式（weekly 固定在首次执行的星期几，
+monthly 固定在首次执行的日期，29~31 日换算为每月最后一天）。
+
+抖动窗口：同一时刻的大量任务按任务 ID 的哈希在窗口内错开，同一任务每次的偏移固定。
+"""
+import calendar
+import zlib
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+REPEAT_TYPES = ('once', 'daily', 'weekly', 'monthly', 'cron')
+
+# 抖动窗口上限（分钟）
+MAX_JITTER_MINUTES = 24 * 60
+
+# 找不到下次执行时间时最多向后搜索的年数（如 2 月 30 日）
+_SEARCH_YEARS = 5
+
+_MACROS = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *',
+}
+
+_MONTH_NAMES = {name.upper(): i for i, name in enumerate(calendar.month_abbr) if name}
+_DAY_NAMES = {'SUN': 0, 'MON': 1, 'TUE': 2, 'WED': 3, 'THU': 4, 'FRI': 5, 'SAT': 6}
+
+# 字段名, 最小值, 最大值, 名称映射
+_FIELDS = (
+    ('分钟', 0, 59, None),
+    ('小时', 0, 23, None),
+    ('日', 1, 31, None),
+    ('月', 1, 12, _MONTH_NAMES),
+    ('星期', 0, 7, _DAY_NAMES),
+)
+
+
+class CronError(ValueError):
+    """cron 表达式无效"""
+
+
+def _parse_value(text, names, field):
+    text = text.strip().upper()
+    if names and text in names:
+        return names[text]
+    try:
+        return int(text)
+    except ValueError:
+        raise CronError(f'{field}字段的值无效: {text}')
+
+
+def _parse_field(text, index):
+    """
+    解析一个字段
+
+    Returns:
+        tuple: (取值集合, 是否为 *)
+    """
+    field, low, high, names = _FIELDS[index]
+    values = set()
+    for part in text.split(','):
+        if not part:
+            raise CronError(f'{field}字段为空')
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            try:
+                step = int(step_text)
+            except ValueError:
+                raise CronError(f'{field}字段的步长无效: {step_text}')
+            if step < 1:
+                raise CronError(f'{field}字段的步长必须大于 0')
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start_text, end_text = part.split('-', 1)
+            start = _parse_value(start_text, names, field)
+            end = _parse_value(end_text, names, field)
+        else:
+            start = _parse_value(part, names, field)
+            # a/n 表示从 a 开始到最大值
+            end = high if step > 1 else start
+        if not (low <= start <= high and low <= end <= high) or start > end:
+            raise CronError(f'{field}字段超出范围 {low}-{high}: {part}')
+        values.update(range(start, end + 1, step))
+    return frozenset(values), text == '*'
+
+
+class CronExpression:
+    """解析后的 cron 表达式"""
+
+    def __init__(self, expr):
+        if not isinstance(expr, str) or not expr.strip():
+            raise CronError('cron 表达式不能为空')
+        self.expr = expr.strip()
+        text = _MACROS.get(self.expr.lower(), self.expr)
+        parts = text.split()
+        if len(parts) != 5:
+            raise CronError(f'cron 表达式应为 5 段（分 时 日 月 周）: {self.expr}')
+
+        self.minutes = sorted(_parse_field(parts[0], 0)[0])
+        self.hours = sorted(_parse_field(parts[1], 1)[0])
+        if parts[2].upper() == 'L':
+            self.days, self.last_day, dom_any = frozenset(), True, False
+        else:
+            self.days, dom_any = _parse_field(parts[2], 2)
+            self.last_day = False
+        self.months = _parse_field(parts[3], 3)[0]
+        weekdays, dow_any = _parse_field(parts[4], 4)
+        # 7 与 0 都是周日
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+        self._dom_any = dom_any
+        self._dow_any = dow_any
+
+    def _day_matches(self, day):
+        """日期是否满足日和星期字段"""
+        last = calendar.monthrange(day.year, day.month)[1]
+        dom = (self.last_day and day.day == last) or day.day in self.days
+        dow = (day.weekday() + 1) % 7 in self.weekdays
+        if self._dom_any and self._dow_any:
+            return True
+        if self._dom_any:
+            return dow
+        if self._dow_any:
+            return dom
+        return dom or dow
+
+    def next_after(self, after):
+        """
+        计算严格晚于 after 的下一次执行时间
+
+        Args:
+            after: datetime
+
+        Returns:
+            datetime | None: 下一次执行时间（秒和微秒为 0），表达式永远不会触发时为 None
+        """
+        current = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = after.year + _SEARCH_YEARS
+        while current.year <= limit:
+            if current.month not in self.months:
+                year, month = divmod(current.month, 12)
+                current = datetime(current.year + year, month + 1, 1)
+                continue
+            if not self._day_matches(current):
+                current = datetime(current.year, current.month, current.day) + timedelta(days=1)
+                continue
+            hour = next((h for h in self.hours if h >= current.hour), None)
+            if hour is None:
+                current = datetime(current.year, current.month, current.day) + timedelta(days=1)
+                continue
+            if hour != current.hour:
+                current = current.replace(hour=hour, minute=0)
+            minute = next((m for m in self.minutes if m >= current.minute), None)
+            if minute is None:
+                current = current.replace(minute=0) + timedelta(hours=1)
+                continue
+            return current.replace(minute=minute)
+        return None
+
+    def __repr__(self):
+        return f'CronExpression({self.expr!r})'
+
+
+@lru_cache(maxsize=256)
+def parse_cron(expr):
+    """
+    解析（并缓存）cron 表达式
+
+    Raises:
+        CronError: 表达式无效
+    """
+    return CronExpression(expr)
+
+
+def parse_schedule_time(schedule_time):
+    """
+    解析 HH:MM
+
+    Returns:
+        tuple: (小时, 分钟)
+
+    Raises:
+        CronError: 格式不正确
+    """
+    try:
+        hour, minute = (int(part) for part in str(schedule_time).split(':'))
+    except ValueError:
+        raise CronError('时间格式不正确，应为 HH:MM')
+    if not (0 <= hour <= 23 and 0 <= minute <= 59):
+        raise CronError('时间格式不正确，应为 HH:MM')
+    return hour, minute
+
+
+def legacy_expression(repeat_type, schedule_time, first_run):
+    """
+    把 daily / weekly / monthly 换算为 cron 表达式
+
+    Args:
+        repeat_type: 重复类型
+        schedule_time: HH:MM
+        first_run: 首次执行时间（weekly 取其星期几，monthly 取其日期）
+
+    Returns:
+        str | None: cron 表达式，once 返回 None
+    """
+    hour, minute = parse_schedule_time(schedule_time)
+    if repeat_type == 'daily':
+        return f'{minute} {hour} * * *'
+    if repeat_type == 'weekly':
+        return f'{minute} {hour} * * {(first_run.weekday() + 1) % 7}'
+    if repeat_type == 'monthly':
+        day = first_run.day
+        return f'{minute} {hour} {day if day <= 28 else "L"} * *'
+    return None
+
+
+def first_occurrence(schedule_time, after):
+    """严格晚于 after 的第一个 HH:MM"""
+    hour, minute = parse_schedule_time(schedule_time)
+    scheduled = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if scheduled <= after:
+        scheduled += timedelta(days=1)
+    return scheduled
+
+
+def jitter_offset(key, window_minutes):
+    """
+    确定性的抖动偏移
+
+    Args:
+        key: 任务标识（通常为任务 ID）
+        window_minutes: 抖动窗口（分钟），0 表示不抖动
+
+    Returns:
+        timedelta: [0, window) 内的偏移，精确到秒
+    """
+    if not window_minutes:
+        return timedelta(0)
+    seconds = int(window_minutes) * 60
+    return timedelta(seconds=zlib.crc32(str(key).encode('utf-8')) % seconds)
+
+
+def next_fire_time(repeat_type, schedule_time, after, cron_expr=None, jitter=timedelta(0)):
+    """
+    计算下次执行时间
+
+    Args:
+        repeat_type: once / daily / weekly / monthly / cron
+        schedule_time: HH:MM（cron 类型不使用）
+        after: 从该时间之后开始计算
+        cron_expr: cron 表达式（cron 类型必填；weekly / monthly 为换算后的表达式，省略时以首次执行时间换算）
+        jitter: 抖动偏移（jitter_offset 的返回值）
+
+    Returns:
+        datetime | None: 下次执行时间，不再执行时为 None
+    """
+    if repeat_type == 'once':
+        # 仅执行一次：今天的时间已过则不再执行
+        hour, minute = parse_schedule_time(schedule_time)
+        scheduled = after.replace(hour=hour, minute=minute, second=0, microsecond=0) + jitter
+        return scheduled if scheduled > after else None
+
+    if repeat_type == 'cron':
+        if not cron_expr:
+            raise CronError('cron 类型的任务缺少 cron 表达式')
+        expression = parse_cron(cron_expr)
+    elif repeat_type in ('daily', 'weekly', 'monthly'):
+        if repeat_type == 'daily' or not cron_expr:
+            cron_expr = legacy_expression(repeat_type, schedule_time, first_occurrence(schedule_time, after - jitter))
+        expression = parse_cron(cron_expr)
+    else:
+        raise CronError(f'无效的重复类型: {repeat_type}')
+
+    # 偏移后的执行时间晚于 after  <=>  原始执行时间晚于 after - jitter
+    scheduled = expression.next_after(after - jitter)
+    return scheduled + jitter if scheduled else None
+
+
+def validate_schedule(repeat_type, schedule_time, cron_expr=None, jitter_minutes=0):
+    """
+    校验任务的调度参数
+
+    Args:
+        repeat_type: 重复类型
+        schedule_time: HH:MM（cron 类型不使用）
+        cron_expr: cron 表达式（cron 类型必填，其他类型忽略）
+        jitter_minutes: 抖动窗口（分钟）
+
+    Returns:
+        tuple: (cron_expr, jitter_minutes)，非 cron 类型的 cron_expr 为 None
+
+    Raises:
+        CronError: 参数无效
+    """
+    if repeat_type not in REPEAT_TYPES:
+        raise CronError(f'无效的重复类型: {repeat_type}')
+    if repeat_type == 'cron':
+        if not isinstance(cron_expr, str) or not cron_expr.strip():
+            raise CronError('cron 类型的任务缺少 cron 表达式')
+        expression = parse_cron(cron_expr.strip())
+        if expression.next_after(datetime.now()) is None:
+            raise CronError(f'cron 表达式永远不会触发: {expression.expr}')
+        cron_expr = expression.expr
+    else:
+        parse_schedule_time(schedule_time)
+        cron_expr = None
+    try:
+        jitter_minutes = int(jitter_minutes or 0)
+    except (TypeError, ValueError):
+        raise CronError('抖动窗口应为整数（分钟）')
+    if not 0 <= jitter_minutes <= MAX_JITTER_MINUTES:
+        raise CronError(f'抖动窗口应在 0~{MAX_JITTER_MINUTES} 分钟之间')
+    return cron_expr, jitter_minutes
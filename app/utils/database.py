@@ -3,6 +3,8 @@
 """
 import sqlite3
 import os
+import queue
+import threading
 from contextlib import contextmanager
 from config import get_config
 
@@ -10,32 +12,281 @@ from config import get_config
 config = get_config()
 
 
-def get_db_connection():
+class PoolTimeoutError(sqlite3.OperationalError):
+    """连接池已满且等待超时（与 SQLite 锁超时同属 OperationalError）"""
+
+
+class ConnectionPool:
     """
-    获取数据库连接
-    
+    SQLite 连接池
+
+    - 有界：最多保持 size 个常驻连接，用完归还复用（LIFO，优先复用最"热"的连接）
+    - 线程内可重入：同一线程嵌套获取时直接复用当前持有的连接，避免自己等自己
+    - 池满时最多等待 timeout 秒，仍拿不到则临时创建一个溢出连接，用完即关闭；
+      overflow=False 时不创建溢出连接，超时抛出 PoolTimeoutError（写连接池据此保证只有一个写连接）
+    - readonly=True 的池只发放只读连接（PRAGMA query_only），与写连接分开管理
+
+    统计计数：
+        hits: 复用已有连接的次数
+        misses: 新建连接的次数
+        waits: 因池满而等待的次数
+        overflows: 等待超时后创建溢出连接的次数
+        timeouts: 不允许溢出时等待超时的次数
+    """
+
+    def __init__(self, database, size=8, timeout=5, readonly=False, overflow=True):
+        self.database = database
+        self.readonly = readonly
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.overflow = overflow
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._held = {}  # 线程 ID -> [连接, 嵌套深度, 是否溢出]
+        self._stats = {'hits': 0, 'misses': 0, 'waits': 0, 'overflows': 0, 'timeouts': 0}
+
+    def _connect(self):
+        """创建新连接"""
+        return _create_connection(self.database, readonly=self.readonly)
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def acquire(self):
+        """获取连接（同一线程重复获取时返回同一连接）"""
+        ident = threading.get_ident()
+        with self._lock:
+            held = self._held.get(ident)
+            if held is not None:
+                held[1] += 1
+                self._stats['hits'] += 1
+                return held[0]
+
+        conn, overflow = self._checkout()
+        with self._lock:
+            self._held[ident] = [conn, 1, overflow]
+        return conn
+
+    def _checkout(self):
+        """从池中取出连接，返回 (连接, 是否为溢出连接)"""
+        try:
+            conn = self._idle.get_nowait()
+            self._count('hits')
+            return conn, False
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                self._stats['misses'] += 1
+                create = True
+            else:
+                self._stats['waits'] += 1
+                create = False
+
+        if create:
+            try:
+                return self._connect(), False
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+            self._count('hits')
+            return conn, False
+        except queue.Empty:
+            if not self.overflow:
+                self._count('timeouts')
+                raise PoolTimeoutError(f'等待数据库连接超时（{self.timeout} 秒）')
+            with self._lock:
+                self._stats['misses'] += 1
+                self._stats['overflows'] += 1
+            return self._connect(), True
+
+    def release(self, conn):
+        """归还连接；未提交的事务会被回滚"""
+        with self._lock:
+            ident = threading.get_ident()
+            held = self._held.get(ident)
+            if held is None or held[0] is not conn:
+                # 由其他线程归还（如流式响应在别的线程被关闭），按连接查找持有者
+                ident = next((k for k, v in self._held.items() if v[0] is conn), None)
+                if ident is None:
+                    conn.close()
+                    return
+                held = self._held[ident]
+            held[1] -= 1
+            if held[1] > 0:
+                return
+            del self._held[ident]
+            overflow = held[2]
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            if not overflow:
+                overflow = True  # 连接已不可用，丢弃
+                with self._lock:
+                    self._created -= 1
+
+        if overflow:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    def close(self):
+        """关闭所有空闲连接"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+    def is_held_by_current_thread(self):
+        """当前线程是否正持有本池的连接"""
+        with self._lock:
+            return threading.get_ident() in self._held
+
+    def stats(self):
+        """连接池统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            created = self._created
+        idle = self._idle.qsize()
+        stats.update({
+            'readonly': self.readonly,
+            'size': self.size,
+            'created': created,
+            'idle': idle,
+            'in_use': created - idle,
+        })
+        return stats
+
+
+def _create_connection(database, readonly=False):
+    """
+    创建连接并应用存储调优参数（见 config 中的 DB_* 配置）
+
+    Args:
+        database (str): 数据库文件路径
+        readonly (bool): 是否为只读连接
+
     Returns:
         sqlite3.Connection: 数据库连接对象
     """
-    conn = sqlite3.connect(config.DATABASE_PATH)
+    conn = sqlite3.connect(
+        database,
+        timeout=config.DB_BUSY_TIMEOUT / 1000,
+        check_same_thread=False
+    )
     conn.row_factory = sqlite3.Row
+    if not readonly:
+        # journal_mode 持久化在数据库文件中，由写连接负责设置
+        conn.execute(f'PRAGMA journal_mode = {config.DB_JOURNAL_MODE}')
+    conn.execute(f'PRAGMA synchronous = {config.DB_SYNCHRONOUS}')
+    conn.execute(f'PRAGMA cache_size = {int(config.DB_CACHE_SIZE)}')
+    conn.execute(f'PRAGMA mmap_size = {int(config.DB_MMAP_SIZE)}')
+    conn.execute(f'PRAGMA temp_store = {config.DB_TEMP_STORE}')
+    conn.execute(f'PRAGMA busy_timeout = {int(config.DB_BUSY_TIMEOUT)}')
+    if readonly:
+        conn.execute('PRAGMA query_only = ON')
     return conn
 
 
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+def get_pool(readonly=False):
+    """
+    获取全局连接池（数据库路径变化时自动重建）
+
+    读连接池有 DB_POOL_SIZE 个连接；写连接池只有 1 个连接且不创建溢出连接，
+    进程内的写操作在此串行化，等待超过 DB_WRITE_TIMEOUT 秒抛出 PoolTimeoutError。
+    WAL 模式下读连接不会被写事务阻塞。
+
+    Args:
+        readonly (bool): True 获取读连接池，False 获取写连接池
+
+    Returns:
+        ConnectionPool: 连接池
+    """
+    pool = _pools.get(readonly)
+    if pool is not None and pool.database == config.DATABASE_PATH:
+        return pool
+    with _pool_lock:
+        pool = _pools.get(readonly)
+        if pool is None or pool.database != config.DATABASE_PATH:
+            if pool is not None:
+                pool.close()
+            if readonly:
+                pool = ConnectionPool(
+                    config.DATABASE_PATH,
+                    size=config.DB_POOL_SIZE,
+                    timeout=config.DB_POOL_TIMEOUT,
+                    readonly=True
+                )
+            else:
+                pool = ConnectionPool(
+                    config.DATABASE_PATH,
+                    size=1,
+                    timeout=config.DB_WRITE_TIMEOUT,
+                    overflow=False
+                )
+            _pools[readonly] = pool
+        return pool
+
+
+def get_pool_stats():
+    """
+    获取连接池统计信息
+
+    Returns:
+        dict: {'read': {...}, 'write': {...}}，
+            每项包含 hits / misses / waits / overflows / timeouts / size / created / idle / in_use
+    """
+    return {
+        'read': get_pool(readonly=True).stats(),
+        'write': get_pool(readonly=False).stats(),
+    }
+
+
 @contextmanager
-def get_db_context():
+def get_db_context(readonly=False):
     """
-    数据库上下文管理器
-    
+    数据库上下文管理器（从连接池获取连接，退出时归还）
+
+    同一线程内嵌套使用时共享同一个连接，内层的 commit 会一并提交外层事务。
+    当前线程已持有写连接时，只读请求也复用该写连接，以便读到本事务内未提交的修改。
+
+    Args:
+        readonly (bool): 是否只需要读连接
+
     使用方法:
         with get_db_context() as db:
+            db.execute('UPDATE users SET ...')
+            db.commit()
+
+        with get_db_context(readonly=True) as db:
             db.execute('SELECT * FROM users')
     """
-    conn = get_db_connection()
+    pool = get_pool(readonly=False)
+    if readonly and not pool.is_held_by_current_thread():
+        pool = get_pool(readonly=True)
+    conn = pool.acquire()
     try:
         yield conn
     finally:
-        conn.close()
+        pool.release(conn)
 
 
 def execute_query(sql, params=None, fetch_one=False):
@@ -50,7 +301,7 @@ def execute_query(sql, params=None, fetch_one=False):
     Returns:
         dict 或 list: 查询结果
     """
-    with get_db_context() as db:
+    with get_db_context(readonly=True) as db:
         cursor = db.execute(sql, params or ())
         if fetch_one:
             row = cursor.fetchone()
@@ -58,6 +309,25 @@ def execute_query(sql, params=None, fetch_one=False):
         return [dict(row) for row in cursor.fetchall()]
 
 
+def iter_query(sql, params=None):
+    """
+    逐行迭代查询结果（直接遍历游标，不一次性加载全部结果）
+    
+    迭代期间占用一个读连接，迭代结束或生成器关闭时归还。
+    
+    Args:
+        sql (str): SQL 语句
+        params (tuple): 参数
+        
+    Yields:
+        dict: 每一行数据
+    """
+    with get_db_context(readonly=True) as db:
+        cursor = db.execute(sql, params or ())
+        for row in cursor:
+            yield dict(row)
+
+
 def execute_update(sql, params=None):
     """
     执行数据库更新操作
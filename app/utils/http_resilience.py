@@ -0,0 +1,274 @@
+"""
+EPG HTTP 调用的容错层 - 超时、带抖动的指数退避重试、按主机熔断、分步骤耗时直方图
+
+每个 EPG 请求步骤（获取 base_url、令牌、登录、频道列表）都通过 call_async 执行：
+    1. 目标主机的熔断器处于打开状态时直接抛出 CircuitOpenError，不再发起请求；
+    2. 幂等步骤在连接失败、超时或 5xx 时按 0.5s、1s、2s...（带随机抖动）重试；
+    3. 调用结果计入熔断器，连续失败达到阈值后熔断，冷却后放行一次试探请求；
+    4. 每次尝试的耗时按步骤记入直方图。
+"""
+import asyncio
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import aiohttp
+
+from app.utils import get_logger
+from config import get_config
+
+logger = get_logger('http_resilience')
+config = get_config()
+
+# 直方图分桶上限（毫秒），最后一个桶为 +Inf
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# 可重试的异常：连接失败、超时、5xx
+RETRYABLE_ERRORS = (
+    aiohttp.ClientConnectionError,
+    aiohttp.ServerTimeoutError,
+    asyncio.TimeoutError,
+)
+
+
+class CircuitOpenError(Exception):
+    """主机已熔断，请求未发出"""
+
+
+class UpstreamError(Exception):
+    """上游返回 5xx"""
+
+
+def check_status(status, url):
+    """5xx 视为上游故障（计入熔断、可重试）"""
+    if status >= 500:
+        raise UpstreamError(f'EPG 返回 HTTP {status}: {url}')
+
+
+def host_of(url):
+    """熔断按 host:port 区分"""
+    return urlparse(url).netloc or url
+
+
+class CircuitBreaker:
+    """
+    单个主机的熔断器
+
+    closed: 正常放行；连续失败 failure_threshold 次后转为 open
+    open: 直接拒绝，reset_timeout 秒后转为 half_open
+    half_open: 只放行一个试探请求，成功则 closed，失败则重新 open
+    """
+
+    def __init__(self, host, failure_threshold=None, reset_timeout=None):
+        self.host = host
+        self.failure_threshold = failure_threshold or config.EPG_BREAKER_THRESHOLD
+        self.reset_timeout = config.EPG_BREAKER_RESET if reset_timeout is None else reset_timeout
+        self._lock = threading.Lock()
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+        self._probing = False
+
+    def before_call(self):
+        """请求前检查，熔断中时抛出 CircuitOpenError"""
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError(f'EPG 主机 {self.host} 暂时不可用（熔断中）')
+                self.state = 'half_open'
+                self._probing = False
+            if self.state == 'half_open':
+                if self._probing:
+                    self.rejected += 1
+                    raise CircuitOpenError(f'EPG 主机 {self.host} 暂时不可用（熔断恢复试探中）')
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                logger.info(f'EPG 主机 {self.host} 已恢复，关闭熔断')
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+
+    def release(self):
+        """结束试探但不改变状态（请求被取消或失败与主机无关）"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    logger.warning(f'EPG 主机 {self.host} 连续失败 {self.failures} 次，熔断 {self.reset_timeout} 秒')
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'rejected': self.rejected,
+            }
+
+
+class LatencyHistogram:
+    """耗时直方图（累计分桶计数，与 Prometheus histogram 相同的口径）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total = 0
+        self.errors = 0
+        self.sum_ms = 0.0
+
+    def observe(self, elapsed_ms, ok=True):
+        index = len(LATENCY_BUCKETS_MS)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.total += 1
+            self.sum_ms += elapsed_ms
+            if not ok:
+                self.errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            buckets = {}
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS_MS + ('+Inf',), self.counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            return {
+                'count': self.total,
+                'errors': self.errors,
+                'avg_ms': round(self.sum_ms / self.total, 1) if self.total else 0,
+                'buckets': buckets,
+            }
+
+
+_lock = threading.Lock()
+_breakers = {}
+_histograms = {}
+_retries = {'attempts': 0, 'retries': 0}
+
+
+def get_circuit_breaker(host):
+    """获取主机的熔断器"""
+    with _lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(host)
+        return breaker
+
+
+def _observe(step, elapsed_ms, ok):
+    with _lock:
+        histogram = _histograms.get(step)
+        if histogram is None:
+            histogram = _histograms[step] = LatencyHistogram()
+        _retries['attempts'] += 1
+    histogram.observe(elapsed_ms, ok)
+
+
+def retry_delay(attempt, base=None, cap=10.0):
+    """第 attempt 次重试前的等待秒数（指数退避，乘以 0.5~1 的随机抖动）"""
+    base = config.EPG_RETRY_BACKOFF if base is None else base
+    return min(cap, base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+
+def _attempts(idempotent, retries):
+    if not idempotent:
+        return 1
+    return 1 + (config.EPG_RETRY_ATTEMPTS if retries is None else retries)
+
+
+def _after_failure(breaker, step, url, started, attempt, attempts, error):
+    """记录一次失败的尝试，返回是否还要重试"""
+    _observe(step, (time.perf_counter() - started) * 1000, ok=False)
+    retryable = isinstance(error, RETRYABLE_ERRORS + (UpstreamError,))
+    if retryable:
+        breaker.record_failure()
+    else:
+        # 主机有响应（如返回内容无法解析），不计入熔断
+        breaker.release()
+    # 本次失败触发熔断时不再重试，直接抛出实际的错误
+    if not retryable or attempt + 1 >= attempts or breaker.state == 'open':
+        return False
+    with _lock:
+        _retries['retries'] += 1
+    logger.warning(f'EPG 请求 {step} 失败（第 {attempt + 1} 次）: {error!r}，重试 {url}')
+    return True
+
+
+async def call_async(step, url, func, idempotent=True, retries=None):
+    """
+    以容错方式执行一个异步请求步骤
+
+    Args:
+        step: 步骤名（直方图按步骤统计）
+        url: 请求地址（熔断按其主机区分）
+        func: 无参协程函数，每次尝试调用一次
+        idempotent: 是否允许重试
+        retries: 最大重试次数（可选，默认 EPG_RETRY_ATTEMPTS）
+
+    Returns:
+        func 的返回值
+
+    Raises:
+        CircuitOpenError: 主机熔断中
+        最后一次尝试的异常
+    """
+    breaker = get_circuit_breaker(host_of(url))
+    attempts = _attempts(idempotent, retries)
+    for attempt in range(attempts):
+        breaker.before_call()
+        started = time.perf_counter()
+        try:
+            result = await func()
+        except Exception as e:
+            if not _after_failure(breaker, step, url, started, attempt, attempts, e):
+                raise
+            await asyncio.sleep(retry_delay(attempt))
+        except BaseException:
+            breaker.release()
+            raise
+        else:
+            _observe(step, (time.perf_counter() - started) * 1000, ok=True)
+            breaker.record_success()
+            return result
+
+
+def get_http_statistics():
+    """
+    获取容错层统计信息
+
+    Returns:
+        dict: {'attempts', 'retries', 'breakers': {host: {...}}, 'latency': {step: {...}}}
+    """
+    with _lock:
+        breakers = dict(_breakers)
+        histograms = dict(_histograms)
+        stats = dict(_retries)
+    return {
+        **stats,
+        'breakers': {host: breaker.snapshot() for host, breaker in breakers.items()},
+        'latency': {step: histogram.snapshot() for step, histogram in histograms.items()},
+    }
+
+
+def reset_http_statistics():
+    """清空熔断器和统计（测试使用）"""
+    with _lock:
+        _breakers.clear()
+        _histograms.clear()
+        _retries.update(attempts=0, retries=0)
@@ -0,0 +1,103 @@
+"""
+EPG HTTP 传输层 - 在所有账户之间共享按主机划分的长连接池
+
+Cookie 仍然属于每个账户自己的 aiohttp.ClientSession，只有底层 TCP 连接被复用：
+后台事件循环上的所有 AsyncIPTVClient 共用一个 TCPConnector。批量刷新同一 EPG 主机下的多个账户时，
+只有第一个请求需要建立连接。
+"""
+import threading
+
+import aiohttp
+
+from app.utils import async_loop, get_logger
+from config import get_config
+
+logger = get_logger('http_transport')
+config = get_config()
+
+_connector = None
+_lock = threading.Lock()
+_stats = {'requests': 0, 'connections_created': 0, 'connections_reused': 0}
+
+
+def default_headers(user_agent):
+    """EPG 请求的公共请求头（EPG_ACCEPT_GZIP 关闭时要求不压缩）"""
+    return {
+        'User-Agent': user_agent,
+        'Accept-Encoding': 'gzip, deflate' if config.EPG_ACCEPT_GZIP else 'identity',
+    }
+
+
+def create_connector():
+    """创建按主机限制连接数、保持长连接的 TCPConnector（须在目标事件循环中调用）"""
+    return aiohttp.TCPConnector(
+        limit=config.EPG_POOL_SIZE,
+        limit_per_host=config.EPG_POOL_PER_HOST,
+        keepalive_timeout=config.EPG_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=300
+    )
+
+
+def get_shared_connector():
+    """
+    获取后台事件循环共享的 TCPConnector
+
+    只能在事件循环中调用；当前不是后台事件循环（如测试中的 asyncio.run）时返回 None，
+    由调用方自行创建连接。
+
+    Returns:
+        aiohttp.TCPConnector | None
+    """
+    global _connector
+    if not async_loop.in_event_loop():
+        return None
+    # 后台事件循环是单线程的，这里不需要加锁
+    if _connector is None or _connector.closed:
+        _connector = create_connector()
+        logger.info(
+            f'EPG 连接池已创建（总数 {config.EPG_POOL_SIZE}，每主机 {config.EPG_POOL_PER_HOST}，'
+            f'空闲保持 {config.EPG_KEEPALIVE_TIMEOUT}s）'
+        )
+    return _connector
+
+
+def _count(key):
+    with _lock:
+        _stats[key] += 1
+
+
+async def _on_request_start(session, context, params):
+    _count('requests')
+
+
+async def _on_connection_create_end(session, context, params):
+    _count('connections_created')
+
+
+async def _on_connection_reuseconn(session, context, params):
+    _count('connections_reused')
+
+
+def create_trace_config():
+    """统计请求数、新建连接数和复用连接数的 TraceConfig"""
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+    return trace_config
+
+
+def get_transport_statistics():
+    """
+    获取连接池统计
+
+    Returns:
+        dict: {'requests', 'connections_created', 'connections_reused', 'pool_size', 'pool_per_host'}
+    """
+    with _lock:
+        stats = dict(_stats)
+    return {
+        **stats,
+        'pool_size': config.EPG_POOL_SIZE,
+        'pool_per_host': config.EPG_POOL_PER_HOST,
+    }
@@ -2,19 +2,46 @@
 定时任务调度器 - 用于管理定时执行的任务
 """
 
+import heapq
+import itertools
 import threading
 import time
-from datetime import datetime, timedelta
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
 from app.utils import get_logger
+from app.utils.cron import first_occurrence, jitter_offset, legacy_expression, next_fire_time
+from config import get_config
 
 logger = get_logger('scheduler')
+config = get_config()
+
+# 任务上一次执行尚未结束时，新的执行时间到达的处理方式
+OVERLAP_POLICIES = ('skip', 'queue', 'cancel')
+
+# 重启后错过的执行的处理方式：补跑一次 / 逐次补跑 / 跳过
+CATCHUP_POLICIES = ('once', 'all', 'skip')
+
+# 逐次补跑的最大次数
+MAX_CATCHUP_RUNS = 100
+
+# 持久化到数据库的时间格式（本地时间）
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _parse_time(value):
+    """解析数据库中的时间（字符串或 datetime）"""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
 
 
 class Task:
     """定时任务类"""
     
     def __init__(self, task_id, task_type, account_id, schedule_time, is_enabled=True, 
-                 repeat_type='once', filter_sd=True, channel_filters=None):
+                 repeat_type='once', filter_sd=True, channel_filters=None,
+                 next_execution=None, last_executed=None, execution_count=0,
+                 cron_expr=None, jitter_minutes=0):
         """
         初始化定时任务
         
@@ -24,9 +51,14 @@ class Task:
             account_id: 账户 ID
             schedule_time: 调度时间 (HH:MM 格式或 datetime)
             is_enabled: 是否启用
-            repeat_type: 重复类型 (once, daily, weekly, monthly)
+            repeat_type: 重复类型 (once, daily, weekly, monthly, cron)
             filter_sd: 是否过滤标清频道
             channel_filters: 频道过滤器
+            next_execution: 持久化的下次执行时间（可选，从数据库恢复时传入，可能已经错过）
+            last_executed: 持久化的上次执行时间（可选）
+            execution_count: 持久化的执行次数（可选）
+            cron_expr: cron 表达式（cron 类型必填；weekly / monthly 为换算后的表达式，省略时按首次执行时间换算）
+            jitter_minutes: 抖动窗口（分钟），执行时间按任务 ID 在窗口内固定错开
         """
         self.task_id = task_id
         self.task_type = task_type
@@ -35,6 +67,8 @@ class Task:
         self.repeat_type = repeat_type
         self.filter_sd = filter_sd
         self.channel_filters = channel_filters
+        self.cron_expr = cron_expr or None
+        self.jitter_minutes = jitter_minutes or 0
         
         # 解析调度时间
         if isinstance(schedule_time, str):
@@ -42,52 +76,63 @@ class Task:
         else:
             self.schedule_time = schedule_time.strftime('%H:%M')
         
-        self.last_executed = None
-        self.next_execution = self._calculate_next_execution()
-        self.execution_count = 0
+        self.last_executed = _parse_time(last_executed)
+        self.execution_count = execution_count or 0
         self.last_error = None
-    
-    def _calculate_next_execution(self):
-        """计算下次执行时间"""
-        now = datetime.now()
-        hour, minute = map(int, self.schedule_time.split(':'))
-        
-        # 今天的执行时间
-        scheduled = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        self.missed_runs = 0     # 启动时需要额外补跑的次数（补跑策略 all）
+        self._heap_seq = None  # 调度器堆中当前有效条目的序号
         
-        if self.repeat_type == 'once':
-            # 仅执行一次，如果时间已过，则不再执行
-            if scheduled <= now:
-                return None
-            return scheduled
-        
-        elif self.repeat_type == 'daily':
-            # 每天执行
-            if scheduled <= now:
-                scheduled += timedelta(days=1)
-            return scheduled
-        
-        elif self.repeat_type == 'weekly':
-            # 每周执行（同一天同一时间）
-            if scheduled <= now:
-                scheduled += timedelta(weeks=1)
-            return scheduled
+        next_execution = _parse_time(next_execution)
+        self._anchor_cron_expr(next_execution)
+        if next_execution is not None:
+            self.next_execution = next_execution
+        elif repeat_type == 'once' and self.last_executed is not None:
+            # 已经执行过的一次性任务
+            self.next_execution = None
+        else:
+            self.next_execution = self._calculate_next_execution()
+    
+    def _calculate_next_execution(self, now=None):
+        """
+        计算下次执行时间
         
-        elif self.repeat_type == 'monthly':
-            # 每月执行
-            if scheduled <= now:
-                # 下个月同一天
-                next_month = now.replace(day=1) + timedelta(days=32)
-                scheduled = next_month.replace(
-                    day=now.day if now.day <= 28 else 28,
-                    hour=hour,
-                    minute=minute,
-                    second=0,
-                    microsecond=0
-                )
-            return scheduled
+        Args:
+            now: 从该时间之后开始计算（可选，默认当前时间）
+        """
+        return next_fire_time(
+            self.repeat_type,
+            self.schedule_time,
+            now or datetime.now(),
+            cron_expr=self.cron_expr,
+            jitter=self.jitter
+        )
+    
+    @property
+    def jitter(self):
+        """本任务在抖动窗口内的固定偏移"""
+        return jitter_offset(self.task_id, self.jitter_minutes)
+    
+    def _anchor_cron_expr(self, first_run=None):
+        """weekly / monthly 固定在首次执行的星期几 / 日期（换算为 cron 表达式）"""
+        if self.repeat_type not in ('weekly', 'monthly') or self.cron_expr:
+            return
+        if first_run is None:
+            first_run = first_occurrence(self.schedule_time, datetime.now() - self.jitter)
+        else:
+            first_run -= self.jitter
+        self.cron_expr = legacy_expression(self.repeat_type, self.schedule_time, first_run)
+    
+    def reschedule(self, schedule_changed=True):
+        """
+        调度参数修改后重新计算下次执行时间
         
-        return scheduled
+        Args:
+            schedule_changed: 执行时间或重复类型是否改变（weekly / monthly 需要重新固定星期几 / 日期）
+        """
+        if schedule_changed and self.repeat_type != 'cron':
+            self.cron_expr = None
+            self._anchor_cron_expr()
+        self.next_execution = self._calculate_next_execution()
     
     def should_execute(self):
         """检查是否应该执行"""
@@ -110,6 +155,47 @@ class Task:
         """标记执行出错"""
         self.last_error = str(error)
     
+    def catch_up(self, policy, now=None):
+        """
+        处理重启期间错过的执行（next_execution 已经过去）
+        
+        Args:
+            policy: once 到期立即补跑一次；all 补跑每一次错过的执行（最多 MAX_CATCHUP_RUNS 次）；
+                skip 不补跑，从当前时间重新计算下次执行时间
+            now: 当前时间（可选）
+            
+        Returns:
+            int: 错过的执行次数
+        """
+        if policy not in CATCHUP_POLICIES:
+            raise ValueError(f'无效的补跑策略: {policy}')
+        now = now or datetime.now()
+        if self.next_execution is None or self.next_execution > now:
+            return 0
+        
+        # 统计错过的次数：从错过的那次开始按周期推算到当前时间
+        missed = 1
+        scheduled = self._calculate_next_execution(self.next_execution)
+        while scheduled is not None and scheduled <= now and missed < MAX_CATCHUP_RUNS:
+            missed += 1
+            scheduled = self._calculate_next_execution(scheduled)
+        
+        if policy == 'skip':
+            self.next_execution = self._calculate_next_execution(now)
+        elif policy == 'all':
+            # 保留过去的执行时间，调度器启动后立即到期
+            self.missed_runs = missed - 1
+        return missed
+    
+    def to_state(self):
+        """需要持久化的调度状态"""
+        return {
+            'task_id': self.task_id,
+            'next_execution': self.next_execution.strftime(TIME_FORMAT) if self.next_execution else None,
+            'last_executed': self.last_executed.strftime(TIME_FORMAT) if self.last_executed else None,
+            'cron_expr': self.cron_expr,
+        }
+    
     def to_dict(self):
         """转换为字典"""
         return {
@@ -121,6 +207,8 @@ class Task:
             'schedule_time': self.schedule_time,
             'filter_sd': self.filter_sd,
             'channel_filters': self.channel_filters,
+            'cron_expr': self.cron_expr,
+            'jitter_minutes': self.jitter_minutes,
             'last_executed': self.last_executed.isoformat() if self.last_executed else None,
             'next_execution': self.next_execution.isoformat() if self.next_execution else None,
             'execution_count': self.execution_count,
@@ -128,27 +216,239 @@ class Task:
         }
 
 
+class TaskTypeExecutor:
+    """
+    某一任务类型的执行器：独立线程池 + 重叠策略 + 统计
+    
+    回调返回 Future 时（如提交到 FetchOrchestrator），任务一直算作执行中直到该 Future 完成，
+    但线程池的线程在回调返回后立即释放，不会阻塞等待该 Future（并发由 Future 所在的调度器限制）。
+    重叠策略：
+        skip: 上一次还在执行（或排队）时跳过本次
+        queue: 排在上一次之后执行（最多积压一次）
+        cancel: 取消还在排队的上一次；上一次已开始执行时无法中断，直接开始本次
+    """
+    
+    def __init__(self, task_type, callback, max_workers=None, overlap=None):
+        self.task_type = task_type
+        self.callback = callback
+        self.max_workers = max_workers or config.SCHEDULER_WORKERS
+        self.overlap = overlap or config.SCHEDULER_OVERLAP_POLICY
+        if self.overlap not in OVERLAP_POLICIES:
+            raise ValueError(f'无效的重叠策略: {self.overlap}')
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=f'task-{task_type}'
+        )
+        # 可重入：cancel 策略在持锁时取消上一次执行，取消会同步触发 _on_done
+        self._lock = threading.RLock()
+        self._in_flight = {}     # task_id -> 本次执行的 Future（回调返回的 Future 完成后才结束）
+        self._queued = {}        # task_id -> 线程池中尚未开始的 Future（cancel 策略据此取消）
+        self._pending = {}       # task_id -> (Task, 次数)：等待上一次结束后执行（queue 策略或逐次补跑）
+        self._stats = {
+            'submitted': 0,
+            'queued': 0,
+            'running': 0,
+            'completed': 0,
+            'failed': 0,
+            'skipped': 0,
+            'cancelled': 0,
+        }
+    
+    def dispatch(self, task, runs=1):
+        """
+        提交一次执行（立即返回）
+        
+        Args:
+            task: 任务
+            runs: 执行次数（逐次补跑时大于 1，其余次数在前一次结束后依次执行）
+        
+        Returns:
+            str: 'submitted' / 'skipped' / 'queued' / 'cancelled_previous'
+        """
+        with self._lock:
+            previous = self._in_flight.get(task.task_id)
+            outcome = 'submitted'
+            if previous is None and runs > 1:
+                self._pending[task.task_id] = (task, runs - 1)
+            if previous is not None:
+                if self.overlap == 'skip':
+                    self._stats['skipped'] += 1
+                    logger.warning(f'任务 {task.task_id} 上一次执行尚未结束，跳过本次')
+                    return 'skipped'
+                if self.overlap == 'queue':
+                    if task.task_id not in self._pending:
+                        self._pending[task.task_id] = (task, 1)
+                    logger.info(f'任务 {task.task_id} 上一次执行尚未结束，排在其后执行')
+                    return 'queued'
+                # cancel：只能取消还在排队的上一次
+                queued = self._queued.get(task.task_id)
+                if queued is not None and queued.cancel() and previous.cancel():
+                    self._stats['cancelled'] += 1
+                    logger.info(f'任务 {task.task_id} 取消了尚未开始的上一次执行')
+                else:
+                    logger.warning(f'任务 {task.task_id} 上一次执行已开始，无法取消，直接开始本次')
+                outcome = 'cancelled_previous'
+            self._submit(task)
+            return outcome
+    
+    def _submit(self, task):
+        """提交到线程池（调用方持有锁）"""
+        self._stats['submitted'] += 1
+        self._stats['queued'] += 1
+        run = Future()
+        self._in_flight[task.task_id] = run
+        self._queued[task.task_id] = self.executor.submit(self._invoke, task, run)
+        run.add_done_callback(lambda f: self._on_done(task, f))
+    
+    def _invoke(self, task, run):
+        """在线程池中执行回调；回调返回 Future 时挂上完成回调后立即释放线程"""
+        with self._lock:
+            self._stats['queued'] -= 1
+            self._stats['running'] += 1
+            if self._in_flight.get(task.task_id) is run:
+                self._queued.pop(task.task_id, None)
+        try:
+            logger.info(f'执行定时任务: {task.task_id} ({task.task_type})')
+            result = self.callback(task)
+        except BaseException as e:
+            run.set_exception(e)
+            return
+        if isinstance(result, Future):
+            result.add_done_callback(lambda f: self._settle(run, f))
+        else:
+            run.set_result(result)
+    
+    @staticmethod
+    def _settle(run, future):
+        """回调返回的 Future 完成后结束本次执行"""
+        try:
+            run.set_result(future.result())
+        except BaseException as e:
+            run.set_exception(e)
+    
+    def _on_done(self, task, future):
+        with self._lock:
+            if self._in_flight.get(task.task_id) is future:
+                del self._in_flight[task.task_id]
+                self._queued.pop(task.task_id, None)
+            if future.cancelled():
+                # 被取消的执行没有进入 _invoke
+                self._stats['queued'] -= 1
+            elif future.exception() is not None:
+                self._stats['failed'] += 1
+            else:
+                self._stats['completed'] += 1
+            if not future.cancelled():
+                self._stats['running'] -= 1
+            pending = None
+            if task.task_id not in self._in_flight:
+                pending = self._pending.pop(task.task_id, None)
+            if pending is not None:
+                pending_task, runs = pending
+                if runs > 1:
+                    self._pending[task.task_id] = (pending_task, runs - 1)
+                self._submit(pending_task)
+        
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f'执行任务 {task.task_id} 失败: {future.exception()}')
+            task.mark_error(future.exception())
+    
+    def get_statistics(self):
+        """队列深度、执行中数量和累计计数"""
+        with self._lock:
+            return {
+                **self._stats,
+                'max_workers': self.max_workers,
+                'overlap': self.overlap,
+                'in_flight': len(self._in_flight),
+                'pending': sum(runs for _, runs in self._pending.values()),
+            }
+    
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+
 class Scheduler:
-    """任务调度器"""
+    """
+    任务调度器
+    
+    任务按 next_execution 放入最小堆，调度线程在条件变量上睡到最早的执行时间；
+    add_task / update_task / remove_task 改变堆顶时立即唤醒调度线程重新计算等待时间。
+    堆中的过期条目（任务已删除、停用或时间已变）在弹出时丢弃。
+    
+    调度线程只负责计时：到期任务交给对应任务类型的 TaskTypeExecutor 执行，
+    慢任务不会推迟其他任务。
+    """
     
     def __init__(self, check_interval=60):
         """
         初始化调度器
         
         Args:
-            check_interval: 检查任务的间隔（秒）
+            check_interval: 最长睡眠时间（秒），用于兜底系统时间被调整的情况
         """
         self.tasks = {}
         self.check_interval = check_interval
         self.running = False
         self.thread = None
         self.callbacks = {}  # 任务执行回调
+        self.executors = {}  # 任务类型 -> TaskTypeExecutor
         self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self._heap = []  # (next_execution, 序号, task_id)
+        self._seq = itertools.count()
+        self._dirty = set()      # 调度状态有变化、尚未持久化的任务
+        self._state_store = None
+    
+    def set_state_store(self, store):
+        """
+        设置调度状态的持久化函数
+        
+        Args:
+            store: store(states)，states 为 Task.to_state() 的列表，一次批量写入
+        """
+        self._state_store = store
+    
+    def flush_state(self):
+        """把有变化的任务调度状态批量写入存储"""
+        with self.lock:
+            if not self._dirty or self._state_store is None:
+                return 0
+            states = [self.tasks[task_id].to_state() for task_id in self._dirty if task_id in self.tasks]
+            self._dirty.clear()
+        if not states:
+            return 0
+        try:
+            self._state_store(states)
+        except Exception as e:
+            logger.error(f'保存任务调度状态失败: {e}')
+            with self.lock:
+                self._dirty.update(state['task_id'] for state in states)
+            return 0
+        return len(states)
+    
+    def _schedule(self, task):
+        """把任务的下次执行时间放入堆中（调用方持有锁），成为新的堆顶时唤醒调度线程"""
+        self._dirty.add(task.task_id)
+        task._heap_seq = None
+        if not task.is_enabled or task.next_execution is None:
+            return
+        entry = (task.next_execution, next(self._seq), task.task_id)
+        task._heap_seq = entry[1]
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self.cond.notify()
+    
+    def _is_current(self, entry):
+        """堆条目是否仍然有效"""
+        task = self.tasks.get(entry[2])
+        return task is not None and getattr(task, '_heap_seq', None) == entry[1]
     
     def add_task(self, task):
         """添加任务"""
         with self.lock:
             self.tasks[task.task_id] = task
+            self._schedule(task)
             logger.info(f'添加定时任务: {task.task_id} - {task.schedule_time}')
     
     def remove_task(self, task_id):
@@ -156,6 +456,9 @@ class Scheduler:
         with self.lock:
             if task_id in self.tasks:
                 del self.tasks[task_id]
+                self._dirty.discard(task_id)
+                # 堆中的条目在弹出时丢弃；唤醒调度线程重新计算等待时间
+                self.cond.notify()
                 logger.info(f'移除定时任务: {task_id}')
                 return True
         return False
@@ -169,21 +472,58 @@ class Scheduler:
         with self.lock:
             return list(self.tasks.values())
     
+    # 修改后需要重新计算下次执行时间的字段
+    _SCHEDULE_FIELDS = {'schedule_time', 'repeat_type', 'is_enabled', 'cron_expr', 'jitter_minutes'}
+    
     def update_task(self, task_id, **kwargs):
-        """更新任务属性"""
+        """更新任务属性（调度相关字段变化时重新计算下次执行时间）"""
         with self.lock:
             task = self.tasks.get(task_id)
             if task:
                 for key, value in kwargs.items():
                     if hasattr(task, key):
                         setattr(task, key, value)
+                if self._SCHEDULE_FIELDS & kwargs.keys():
+                    task.reschedule(schedule_changed=bool({'schedule_time', 'repeat_type'} & kwargs.keys()))
+                    self._schedule(task)
                 logger.info(f'更新定时任务: {task_id}')
                 return True
         return False
     
-    def register_callback(self, task_type, callback):
-        """注册任务执行回调"""
+    def register_callback(self, task_type, callback, max_workers=None, overlap=None):
+        """
+        注册任务执行回调
+        
+        Args:
+            task_type: 任务类型
+            callback: 回调函数 callback(task)，可以返回 Future 表示异步执行
+            max_workers: 该类型的并发执行数（可选，默认 SCHEDULER_WORKERS）
+            overlap: 重叠策略 skip / queue / cancel（可选，默认 SCHEDULER_OVERLAP_POLICY）
+        """
+        previous = self.executors.get(task_type)
         self.callbacks[task_type] = callback
+        self.executors[task_type] = TaskTypeExecutor(task_type, callback, max_workers, overlap)
+        if previous is not None:
+            previous.shutdown(wait=False)
+    
+    def get_statistics(self):
+        """
+        获取调度器统计
+        
+        Returns:
+            dict: {'tasks', 'scheduled', 'executors': {task_type: {...}}}
+        """
+        with self.lock:
+            tasks = len(self.tasks)
+            scheduled = sum(1 for entry in self._heap if self._is_current(entry))
+        return {
+            'tasks': tasks,
+            'scheduled': scheduled,
+            'executors': {
+                task_type: executor.get_statistics()
+                for task_type, executor in self.executors.items()
+            }
+        }
     
     def start(self):
         """启动调度器"""
@@ -198,45 +538,86 @@ class Scheduler:
     
     def stop(self):
         """停止调度器"""
-        self.running = False
+        with self.lock:
+            self.running = False
+            self.cond.notify()
         if self.thread:
             self.thread.join(timeout=5)
+        self.flush_state()
+        for executor in self.executors.values():
+            executor.shutdown(wait=False)
         logger.info('定时任务调度器已停止')
     
     def _run(self):
-        """调度器运行循环"""
+        """调度器运行循环：睡到堆顶任务的执行时间，执行到期任务"""
         while self.running:
             try:
-                self._check_and_execute_tasks()
-                time.sleep(self.check_interval)
+                due = self._wait_for_due_tasks()
+                for task in due:
+                    self._run_task(task)
+                # 本批任务的下次执行时间一次写入
+                self.flush_state()
             except Exception as e:
                 logger.error(f'调度器异常: {e}')
-                time.sleep(self.check_interval)
+                time.sleep(1)
+    
+    def _pop_due(self, now):
+        """弹出所有已到期的任务（调用方持有锁）"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if self._is_current(entry):
+                task = self.tasks[entry[2]]
+                task._heap_seq = None
+                due.append(task)
+        return due
+    
+    def _wait_for_due_tasks(self):
+        """等待直到有任务到期（或调度器停止），返回到期任务"""
+        with self.cond:
+            while self.running:
+                now = datetime.now()
+                due = self._pop_due(now)
+                if due:
+                    return due
+                
+                # 丢弃堆顶的过期条目，避免为已删除的任务醒来
+                while self._heap and not self._is_current(self._heap[0]):
+                    heapq.heappop(self._heap)
+                
+                timeout = self.check_interval
+                if self._heap:
+                    timeout = min(timeout, (self._heap[0][0] - now).total_seconds())
+                self.cond.wait(max(timeout, 0))
+            return []
+    
+    def _run_task(self, task):
+        """把到期任务交给执行器（不等待执行结束）并安排下一次执行"""
+        task.mark_executed()
+        try:
+            self._execute_task(task)
+        except Exception as e:
+            logger.error(f'提交任务 {task.task_id} 失败: {e}')
+            task.mark_error(e)
+        with self.lock:
+            if self.tasks.get(task.task_id) is task:
+                self._schedule(task)
     
     def _check_and_execute_tasks(self):
-        """检查并执行任务"""
+        """立即执行所有已到期的任务（不等待）"""
         with self.lock:
-            tasks_to_execute = [
-                task for task in self.tasks.values()
-                if task.should_execute()
-            ]
+            tasks_to_execute = self._pop_due(datetime.now())
         
         for task in tasks_to_execute:
-            try:
-                self._execute_task(task)
-                task.mark_executed()
-            except Exception as e:
-                logger.error(f'执行任务 {task.task_id} 失败: {e}')
-                task.mark_error(e)
+            self._run_task(task)
+        self.flush_state()
     
     def _execute_task(self, task):
-        """执行任务"""
-        logger.info(f'执行定时任务: {task.task_id} ({task.task_type})')
-        
-        # 获取回调函数
-        callback = self.callbacks.get(task.task_type)
-        if callback:
-            callback(task)
+        """提交任务到对应类型的执行器"""
+        executor = self.executors.get(task.task_type)
+        runs, task.missed_runs = 1 + task.missed_runs, 0
+        if executor:
+            executor.dispatch(task, runs)
         else:
             logger.warning(f'未找到任务类型的回调: {task.task_type}')
 
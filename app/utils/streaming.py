@@ -0,0 +1,98 @@
+"""
+流式响应工具 - 将逐行迭代的查询结果分块输出为 JSON 或 NDJSON
+"""
+import json
+from flask import Response, request, stream_with_context
+
+# 每个输出块包含的行数，避免逐行 yield 带来过多的小块
+STREAM_CHUNK_ROWS = 200
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def _chunked(pieces):
+    """把若干小片段合并成较大的块输出"""
+    buffer = []
+    for piece in pieces:
+        buffer.append(piece)
+        if len(buffer) >= STREAM_CHUNK_ROWS:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def iter_json_object(rows, key, **fields):
+    """
+    流式生成 JSON 对象：{**fields, key: [rows...]}
+
+    Args:
+        rows: 行迭代器
+        key (str): 数组字段名
+        **fields: 数组前输出的其他字段
+
+    Yields:
+        str: JSON 片段
+    """
+    head = _dumps(fields)[:-1]
+    yield (head + ', ' if fields else '{') + _dumps(key) + ': ['
+
+    def items():
+        first = True
+        for row in rows:
+            yield _dumps(row) if first else ',' + _dumps(row)
+            first = False
+
+    yield from _chunked(items())
+    yield ']}'
+
+
+def iter_ndjson(rows):
+    """
+    流式生成 NDJSON（每行一个 JSON 对象）
+
+    Args:
+        rows: 行迭代器
+
+    Yields:
+        str: NDJSON 片段
+    """
+    yield from _chunked(_dumps(row) + '\n' for row in rows)
+
+
+def get_stream_mode():
+    """
+    从请求中解析流式输出模式
+
+    ?stream=ndjson 或 Accept: application/x-ndjson 返回 'ndjson'，
+    ?stream=json / ?stream=1 返回 'json'，否则返回 None（不使用流式输出）
+    """
+    mode = (request.args.get('stream') or '').lower()
+    if mode == 'ndjson' or 'application/x-ndjson' in request.headers.get('Accept', ''):
+        return 'ndjson'
+    if mode in ('json', '1', 'true'):
+        return 'json'
+    return None
+
+
+def stream_rows(rows, mode, key='data', **fields):
+    """
+    构建流式响应
+
+    Args:
+        rows: 行迭代器（通常来自 iter_query）
+        mode (str): 'json' 或 'ndjson'
+        key (str): JSON 模式下数组字段名
+        **fields: JSON 模式下数组前输出的其他字段
+
+    Returns:
+        Response: 分块传输的响应
+    """
+    if mode == 'ndjson':
+        return Response(stream_with_context(iter_ndjson(rows)), mimetype='application/x-ndjson')
+    return Response(
+        stream_with_context(iter_json_object(rows, key, **fields)),
+        mimetype='application/json'
+    )
@@ -13,19 +13,32 @@ Modified by: DXIPTV Server Project
 4. 保存到数据库而不是输出 m3u 文件
 """
 
+import asyncio
 import json
-import re
-import requests
+import threading
+import time
+import aiohttp
 import hashlib
+from collections import namedtuple
 from random import randint
-from bs4 import BeautifulSoup
 from urllib.parse import urlunparse, urlparse
+from yarl import URL
 from Crypto.Cipher import DES3
 from Crypto.Util.Padding import pad, unpad
 
 from app.utils import get_logger
+from app.utils.async_loop import run_coroutine
+from app.utils.channel_dedupe import dedupe_channels, get_variant_rules, parse_variant_priority
+from app.utils.channel_filter import compile_channel_filters
+from app.utils.channel_parser import ChannelListParser, iter_channels
+from app.utils.http_resilience import CircuitOpenError, call_async, check_status
+from app.utils.http_transport import (
+    create_connector, create_trace_config, default_headers, get_shared_connector
+)
+from config import get_config
 
 logger = get_logger('tellyget_core')
+config = get_config()
 
 
 class Cipher:
@@ -65,14 +78,147 @@ class Authenticator:
         return self.cipher.encrypt(plain_text)
 
 
-class IPTVAuth:
-    """IPTV 认证类"""
+class IPTVChannelFetcher:
+    """频道列表页面的解析与过滤（AsyncIPTVClient 使用）"""
+
+    @staticmethod
+    def parse_channels(content, filter_sd=True, channel_filters=None, encoding='utf-8'):
+        """
+        解析频道列表页面
+        
+        直接在响应字节上单遍扫描（见 channel_parser），不构建 HTML 树。
+        
+        Args:
+            content: getchannellistHWCTC.jsp 页面内容（bytes / str）
+            filter_sd: 是否过滤标清频道（默认 True）
+            channel_filters: 频道名称过滤器列表（正则表达式）
+            encoding: 页面编码（content 为 bytes 时使用）
+            
+        Returns:
+            list: 频道列表
+        """
+        return IPTVChannelFetcher.filter_channels(
+            iter_channels(content, encoding), filter_sd, channel_filters
+        )
+
+    @staticmethod
+    def variant_rules():
+        """按 CHANNEL_VARIANT_PRIORITY 配置的清晰度规则"""
+        return get_variant_rules(parse_variant_priority(config.CHANNEL_VARIANT_PRIORITY))
+
+    @staticmethod
+    def filter_channels(channels, filter_sd=True, channel_filters=None, excluded=None, variant_groups=None):
+        """
+        对解析出的频道应用名称过滤器和标清过滤
+        
+        名称过滤器预先编译成一个表达式（见 channel_filter），每个频道只匹配一次；
+        标清过滤按归一化名称去重，每组保留清晰度最高的版本（见 channel_dedupe）。
+        
+        Args:
+            channels: 原始频道的可迭代对象
+            filter_sd: 是否过滤标清频道（默认 True）
+            channel_filters: 频道名称过滤器（正则表达式列表 / ChannelFilter）
+            excluded: 可选列表，被名称过滤器排除的频道以
+                {'channel_id', 'channel_name', 'rule'} 追加到其中
+            variant_groups: 可选列表，去重时有频道被去掉的分组以
+                {'name', 'winner', 'variant', 'dropped'} 追加到其中
+            
+        Returns:
+            list: 频道列表
+        """
+        result = []
+        found_count = 0
+        filtered_count = 0
+        name_filter = compile_channel_filters(channel_filters)
+        
+        for channel in channels:
+            found_count += 1
+            # 应用过滤器
+            rule = name_filter.match(channel.get('ChannelName', '')) if name_filter else None
+            if rule is not None:
+                filtered_count += 1
+                if excluded is not None:
+                    excluded.append({
+                        'channel_id': channel.get('ChannelID', ''),
+                        'channel_name': channel.get('ChannelName', ''),
+                        'rule': rule
+                    })
+                continue
+            result.append(channel)
+        
+        logger.info(f'发现 {found_count} 个频道，过滤了 {filtered_count} 个频道')
+        
+        # 过滤标清频道
+        if filter_sd:
+            original_count = len(result)
+            result = dedupe_channels(result, IPTVChannelFetcher.variant_rules(), variant_groups)
+            logger.info(f'移除了 {original_count - len(result)} 个低清晰度 / 重复频道')
+        
+        logger.info(f'最终获取 {len(result)} 个频道')
+        return result
+
+
+# 已认证的 EPG 会话：base_url / 令牌 / Cookie 及过期时间（time.monotonic）
+EPGSession = namedtuple('EPGSession', ['base_url', 'token', 'cookies', 'expires_at'])
+
+_session_cache = {}  # (authurl, user, mac, 密码摘要) -> EPGSession
+_session_cache_lock = threading.Lock()
+_session_cache_stats = {'hits': 0, 'misses': 0, 'expired': 0, 'reauths': 0}
+
+
+def _count_session_cache(key):
+    with _session_cache_lock:
+        _session_cache_stats[key] += 1
+
+
+def get_session_cache_stats():
+    """
+    获取 EPG 会话缓存统计
+
+    Returns:
+        dict: size / hits / misses / expired / reauths
+    """
+    with _session_cache_lock:
+        return {'size': len(_session_cache), **_session_cache_stats}
+
+
+def clear_session_cache(user=None):
+    """
+    清除缓存的 EPG 会话
+
+    Args:
+        user: IPTV 账号（可选，不传则清空全部）
+    """
+    with _session_cache_lock:
+        if user is None:
+            _session_cache.clear()
+        else:
+            for key in [key for key in _session_cache if key[1] == user]:
+                del _session_cache[key]
+
+
+class AsyncIPTVClient:
+    """
+    异步 IPTV 客户端
+    
+    认证协议：重定向获取 base_url -> 获取 EncryToken -> 登录（DES3 authinfo）-> 获取频道列表页面，
+    页面由 IPTVChannelFetcher 解析和过滤。基于 aiohttp，所有请求都有超时，
+    可以在同一个事件循环中并发驱动大量账户。
+    
+    认证成功后 base_url、令牌和 Cookie 按账户缓存 EPG_SESSION_TTL 秒，
+    有效期内再次获取只需请求一次频道列表；会话失效（401/403 或返回的不是频道列表）
+    时自动重新认证一次。
+    """
     
     DEFAULT_AUTHURL = 'http://eds.iptv.gd.cn:8082/EDS/jsp/AuthenticationURL'
+    USER_AGENT = 'Mozilla/5.0 (X11; U; Linux i686; en-US) AppleWebKit/534.0 (KHTML, like Gecko)'
+    CHANNEL_LIST_PATH = '/EPG/jsp/getchannellistHWCTC.jsp'
+    CHUNK_SIZE = 64 * 1024
     
-    def __init__(self, user, passwd, mac, imei='', address='', authurl=None):
+    def __init__(self, user, passwd, mac, imei='', address='', authurl=None, timeout=None,
+                 session_ttl=None, connector=None):
         """
-        初始化认证器
+        初始化客户端
         
         Args:
             user: IPTV 账号（去掉 @iptv.gd）
@@ -81,6 +227,9 @@ class IPTVAuth:
             imei: IMEI（可选）
             address: IP 地址（可选）
             authurl: 认证 URL（可选）
+            timeout: 单个请求的超时秒数（可选，默认 API_TIMEOUT）
+            session_ttl: 会话缓存秒数（可选，默认 EPG_SESSION_TTL，0 表示不缓存）
+            connector: 共享的 aiohttp.TCPConnector（可选，在后台事件循环中默认使用全局连接池）
         """
         self.user = user
         self.passwd = passwd
@@ -88,60 +237,111 @@ class IPTVAuth:
         self.imei = imei or ''
         self.address = address or ''
         self.authurl = authurl or self.DEFAULT_AUTHURL
+        self.timeout = timeout or config.API_TIMEOUT
+        self.session_ttl = config.EPG_SESSION_TTL if session_ttl is None else session_ttl
+        self.connector = connector
         self.session = None
         self.base_url = ''
-
-    def authenticate(self):
+        self.token = None
+        self.page_digest = None
+        self.excluded_channels = []
+        self.variant_groups = []
+        self._digest_seed = b''
+    
+    async def __aenter__(self):
+        await self.open()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def open(self):
+        """创建 HTTP 会话（每个客户端独立的 Cookie，TCP 连接来自共享连接池）"""
+        if self.session is None or self.session.closed:
+            connector = self.connector or get_shared_connector()
+            self.session = aiohttp.ClientSession(
+                headers=default_headers(self.USER_AGENT),
+                connector=connector,
+                # 共享的连接池不随会话关闭
+                connector_owner=connector is None,
+                trace_configs=[create_trace_config()],
+                # EPG 地址通常是 IP，默认的 CookieJar 不接受 IP 主机的 Cookie
+                cookie_jar=aiohttp.CookieJar(unsafe=True),
+                timeout=aiohttp.ClientTimeout(
+                    total=self.timeout,
+                    connect=min(config.EPG_CONNECT_TIMEOUT, self.timeout),
+                    sock_read=self.timeout
+                )
+            )
+    
+    async def close(self):
+        """关闭 HTTP 会话"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+    
+    async def authenticate(self):
         """执行认证流程"""
         try:
             logger.info(f'开始认证 IPTV 账户: {self.user}')
-            
-            # 创建会话
-            self.session = requests.Session()
-            self.session.headers = {
-                'User-Agent': 'Mozilla/5.0 (X11; U; Linux i686; en-US) AppleWebKit/534.0 (KHTML, like Gecko)',
-            }
+            await self.open()
             
             # 获取 base_url
-            self.base_url = self._get_base_url()
+            self.base_url = await self._get_base_url()
             logger.info(f'Base URL: {self.base_url}')
             
             # 登录
-            self._login()
+            await self._login()
             
             logger.info('认证成功')
             return True
             
+        except CircuitOpenError:
+            raise
         except Exception as e:
-            logger.error(f'认证失败: {e}')
+            logger.error(f'认证失败: {e!r}')
             return False
-
-    def _get_base_url(self):
+    
+    async def _get(self, step, url, params, read, idempotent=True, **kwargs):
+        """带超时、重试和熔断的 GET 请求，read(response) 在响应关闭前读取结果"""
+        async def request():
+            async with self.session.get(url, params=params, **kwargs) as response:
+                check_status(response.status, url)
+                return await read(response)
+        return await call_async(step, url, request, idempotent=idempotent)
+    
+    async def _get_base_url(self):
         """获取 base URL"""
         params = {
             'UserID': self.user,
             'Action': 'Login'
         }
-        response = self.session.get(self.authurl, params=params, allow_redirects=False)
-        url = response.headers.get('Location')
+        
+        async def read(response):
+            return response.headers.get('Location')
+        
+        url = await self._get('base_url', self.authurl, params, read, allow_redirects=False)
         return urlunparse(urlparse(url)._replace(path='', query=''))
-
-    def _get_token(self):
+    
+    async def _get_token(self):
         """获取令牌"""
         params = {
             'response_type': 'EncryToken',
             'client_id': 'smcphone',
             'userid': self.user,
         }
-        response = self.session.get(f'{self.base_url}/EPG/oauth/v2/authorize', params=params)
-        j = json.loads(response.text)
-        return j['EncryToken']
-
-    def _login(self):
+        
+        async def read(response):
+            return await response.text()
+        
+        text = await self._get('token', f'{self.base_url}/EPG/oauth/v2/authorize', params, read)
+        return json.loads(text)['EncryToken']
+    
+    async def _login(self):
         """执行登录"""
-        token = self._get_token()
+        self.token = await self._get_token()
         authenticator = Authenticator(self.passwd).build(
-            token, self.user, self.imei, self.address, self.mac
+            self.token, self.user, self.imei, self.address, self.mac
         )
         
         params = {
@@ -155,127 +355,219 @@ class IPTVAuth:
             'authinfo': authenticator,
             'grant_type': 'EncryToken',
         }
-        self.session.get(self.base_url + '/EPG/oauth/v2/token', params=params)
-
-
-class IPTVChannelFetcher:
-    """IPTV 频道获取器"""
+        
+        async def read(response):
+            return await response.read()
+        
+        # 登录会创建新的服务端会话，不自动重试
+        await self._get('login', self.base_url + '/EPG/oauth/v2/token', params, read, idempotent=False)
+    
+    def _cache_key(self):
+        return (self.authurl, self.user, self.mac, hashlib.md5(self.passwd.encode()).hexdigest())
+    
+    def _restore_session(self):
+        """从缓存恢复已认证的会话，返回是否恢复成功"""
+        if not self.session_ttl:
+            return False
+        key = self._cache_key()
+        with _session_cache_lock:
+            cached = _session_cache.get(key)
+            if cached is not None and cached.expires_at <= time.monotonic():
+                del _session_cache[key]
+                _session_cache_stats['expired'] += 1
+                cached = None
+            _session_cache_stats['hits' if cached else 'misses'] += 1
+        if cached is None:
+            return False
+        
+        self.base_url = cached.base_url
+        self.token = cached.token
+        self.session.cookie_jar.update_cookies(cached.cookies, URL(cached.base_url))
+        logger.info(f'复用账户 {self.user} 的 EPG 会话')
+        return True
+    
+    def _store_session(self):
+        """缓存当前已认证的会话"""
+        if not self.session_ttl:
+            return
+        base = URL(self.base_url)
+        cookies = self.session.cookie_jar.filter_cookies(base)
+        with _session_cache_lock:
+            _session_cache[self._cache_key()] = EPGSession(
+                base_url=self.base_url,
+                token=self.token,
+                cookies=cookies,
+                expires_at=time.monotonic() + self.session_ttl
+            )
     
-    def __init__(self, auth):
+    def _forget_session(self):
+        with _session_cache_lock:
+            _session_cache.pop(self._cache_key(), None)
+    
+    async def get_channel_list(self, known_digest=None):
         """
-        初始化
+        获取频道列表页面，边下载边解析，同时计算页面摘要
+        
+        传入 known_digest 时先缓存页面、下载完成后比较摘要，与上次相同则不解析。
         
         Args:
-            auth: IPTVAuth 实例
+            known_digest: 上次获取的页面摘要（可选）
+        
+        Returns:
+            tuple: (HTTP 状态码, 原始频道列表, 页面摘要)，页面未变化时频道列表为 None
         """
-        self.auth = auth
-        self.session = auth.session
-        self.base_url = auth.base_url
-
-    def get_channels(self, filter_sd=True, channel_filters=None):
+        url = self.base_url + self.CHANNEL_LIST_PATH
+        return await call_async('channel_list', url, lambda: self._read_channel_list(url, known_digest))
+    
+    async def _read_channel_list(self, url, known_digest):
+        """请求并读取频道列表页面（单次尝试）"""
+        async with self.session.post(url) as response:
+            check_status(response.status, url)
+            parser = ChannelListParser(response.charset or 'utf-8')
+            digest = hashlib.sha1(self._digest_seed)
+            channels = []
+            chunks = []
+            async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+                digest.update(chunk)
+                if known_digest:
+                    chunks.append(chunk)
+                else:
+                    channels.extend(parser.feed(chunk))
+            page_digest = digest.hexdigest()
+            
+            if known_digest:
+                if response.status == 200 and page_digest == known_digest:
+                    return response.status, None, page_digest
+                channels.extend(parser.feed(b''.join(chunks)))
+            channels.extend(parser.close())
+            return response.status, channels, page_digest
+    
+    @staticmethod
+    def _is_session_expired(status, channels):
+        """会话是否已失效（401/403，或返回的页面中没有任何频道）"""
+        return status in (401, 403) or channels == []
+    
+    async def fetch_channels(self, filter_sd=True, channel_filters=None, known_digest=None, progress=None):
         """
-        获取频道列表
+        认证并获取频道列表（完成后关闭会话）
+        
+        页面摘要包含过滤参数，保存在 self.page_digest 中；与 known_digest 相同说明
+        页面和过滤参数都没有变化，此时不解析、不过滤，返回 (True, None)。
+        被名称过滤器排除的频道及命中的规则保存在 self.excluded_channels 中，
+        标清过滤时每组保留的频道保存在 self.variant_groups 中。
         
         Args:
-            filter_sd: 是否过滤标清频道（默认 True）
-            channel_filters: 频道名称过滤器列表（正则表达式）
+            filter_sd: 是否过滤标清频道
+            channel_filters: 频道名称过滤器（正则表达式列表 / JSON 数组 / 逗号分隔的字符串）
+            known_digest: 上次获取的页面摘要（可选）
+            progress: 进度回调 progress(stage)（可选），stage 为 authenticating / downloading / parsing
             
         Returns:
-            list: 频道列表，每个频道包含：
-                - ChannelID: 频道 ID
-                - ChannelName: 频道名称
-                - ChannelURL: 频道 URL
-                - ... 其他字段
+            tuple: (success, channels)，同 TellyGetCore.fetch_channels
         """
+        report = progress or (lambda stage: None)
+        self.page_digest = None
+        self.excluded_channels = []
+        self.variant_groups = []
         try:
-            logger.info('开始获取频道列表...')
-            
-            # 请求频道列表页面
-            response = self.session.post(
-                self.base_url + '/EPG/jsp/getchannellistHWCTC.jsp'
-            )
-            
-            # 解析 HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-            scripts = soup.find_all('script', string=re.compile('ChannelID="[^"]+"'))
-            
-            logger.info(f'发现 {len(scripts)} 个频道')
-            
-            channels = []
-            filtered_count = 0
-            
-            # 解析每个频道
-            for script in scripts:
-                match = re.search(
-                    r'Authentication.CTCSetConfig\(\'Channel\',\'(.+?)\'\)',
-                    script.string,
-                    re.MULTILINE
-                )
-                
-                if not match:
-                    continue
-                
-                channel_params = match.group(1)
-                channel = {}
+            name_filter = compile_channel_filters(channel_filters)
+            self._digest_seed = json.dumps(
+                [bool(filter_sd), name_filter.rules, IPTVChannelFetcher.variant_rules().priority],
+                ensure_ascii=False
+            ).encode('utf-8')
+            async with self:
+                # 优先复用缓存的会话，否则完整认证
+                reused = self._restore_session()
+                if not reused:
+                    report('authenticating')
+                    if not await self.authenticate():
+                        return False, "认证失败"
                 
-                # 解析频道参数
-                for channel_param in channel_params.split('",'):
-                    if '="' in channel_param:
-                        key, value = channel_param.split('="', 1)
-                        channel[key] = value
+                # 获取频道
+                logger.info('开始获取频道列表...')
+                report('downloading')
+                status, raw_channels, page_digest = await self.get_channel_list(known_digest)
                 
-                # 应用过滤器
-                if channel_filters and self._match_filters(channel, channel_filters):
-                    filtered_count += 1
-                    continue
+                if reused and self._is_session_expired(status, raw_channels):
+                    # 缓存的会话已失效，重新认证一次
+                    logger.info(f'账户 {self.user} 的 EPG 会话已失效，重新认证')
+                    _count_session_cache('reauths')
+                    self._forget_session()
+                    self.session.cookie_jar.clear()
+                    report('authenticating')
+                    if not await self.authenticate():
+                        return False, "认证失败"
+                    status, raw_channels, page_digest = await self.get_channel_list(known_digest)
                 
-                channels.append(channel)
+                if self._is_session_expired(status, raw_channels):
+                    self._forget_session()
+                else:
+                    self._store_session()
             
-            logger.info(f'过滤了 {filtered_count} 个频道')
+            if raw_channels is None:
+                logger.info(f'账户 {self.user} 的频道列表页面未变化')
+                self.page_digest = page_digest
+                return True, None
             
-            # 过滤标清频道
-            if filter_sd:
-                removed_count = self._remove_sd_channels(channels)
-                logger.info(f'移除了 {removed_count} 个标清候选频道')
+            report('parsing')
+            channels = IPTVChannelFetcher.filter_channels(
+                raw_channels, filter_sd, name_filter, self.excluded_channels, self.variant_groups
+            )
             
-            logger.info(f'最终获取 {len(channels)} 个频道')
-            return channels
+            if not channels:
+                return False, "未获取到频道"
+            
+            self.page_digest = page_digest
+            return True, channels
             
         except Exception as e:
             import traceback
             error_trace = traceback.format_exc()
             error_msg = str(e) if str(e) else f"{type(e).__name__}: 无详细信息"
-            logger.error(f'获取频道失败: {error_msg}\n{error_trace}')
-            raise  # 抛出异常让上层处理
-
-    def _match_filters(self, channel, filters):
-        """检查频道是否匹配过滤器"""
-        channel_name = channel.get('ChannelName', '')
-        for filter_pattern in filters:
-            if re.search(filter_pattern, channel_name):
-                return True
-        return False
-
-    def _remove_sd_channels(self, channels):
-        """移除标清频道（如果有对应的高清版本）"""
-        original_count = len(channels)
-        
-        # 找出所有高清频道名
-        hd_names = {ch.get('ChannelName', '') for ch in channels if '高清' in ch.get('ChannelName', '')}
-        
-        # 移除有高清版本的标清频道
-        channels[:] = [
-            ch for ch in channels
-            if not (ch.get('ChannelName', '') + '高清' in hd_names)
-        ]
+            logger.error(f'获取频道异常: {error_msg}\n{error_trace}')
+            return False, error_msg
+
+
+async def fetch_channels_many(clients, filter_sd=True, channel_filters=None, concurrency=None):
+    """
+    在当前事件循环中并发获取多个账户的频道
+    
+    Args:
+        clients: AsyncIPTVClient 列表
+        filter_sd: 是否过滤标清频道
+        channel_filters: 频道名称过滤器（正则表达式列表）
+        concurrency: 最大并发账户数（可选，默认不限制）
         
-        return original_count - len(channels)
+    Returns:
+        list: 与 clients 顺序一致的 (success, channels) 列表
+    """
+    semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+    
+    # 不在后台事件循环中时，本批账户共用一个临时连接池
+    connector = None if get_shared_connector() else create_connector()
+    for client in clients:
+        client.connector = client.connector or connector
+    
+    async def fetch_one(client):
+        if semaphore is None:
+            return await client.fetch_channels(filter_sd, channel_filters)
+        async with semaphore:
+            return await client.fetch_channels(filter_sd, channel_filters)
+    
+    try:
+        return await asyncio.gather(*(fetch_one(client) for client in clients))
+    finally:
+        if connector is not None:
+            await connector.close()
 
 
 class TellyGetCore:
     """
     TellyGet 核心功能封装
     提供简单的接口用于获取 IPTV 频道信息
+    
+    同步接口，实际请求由 AsyncIPTVClient 在后台事件循环中执行，
+    多个线程同时调用时共享同一个事件循环并发进行。
     """
     
     def __init__(self, user, passwd, mac, **kwargs):
@@ -286,46 +578,41 @@ class TellyGetCore:
             user: IPTV 账号
             passwd: IPTV 密码
             mac: 机顶盒 MAC 地址
-            **kwargs: 其他可选参数（imei, address, authurl）
+            **kwargs: 其他可选参数（imei, address, authurl, timeout, session_ttl）
         """
-        self.auth = IPTVAuth(user, passwd, mac, **kwargs)
-        self.fetcher = None
+        self.client = AsyncIPTVClient(user, passwd, mac, **kwargs)
 
-    def fetch_channels(self, filter_sd=True, channel_filters=None):
+    @property
+    def page_digest(self):
+        """最近一次成功获取的频道列表页面摘要（含过滤参数）"""
+        return self.client.page_digest
+
+    @property
+    def excluded_channels(self):
+        """最近一次获取中被名称过滤器排除的频道（含命中的规则）"""
+        return self.client.excluded_channels
+
+    @property
+    def variant_groups(self):
+        """最近一次获取中标清过滤去重的分组（含保留的频道）"""
+        return self.client.variant_groups
+
+    def fetch_channels(self, filter_sd=True, channel_filters=None, known_digest=None, progress=None):
         """
         获取频道列表
         
         Args:
             filter_sd: 是否过滤标清频道
             channel_filters: 频道名称过滤器（正则表达式列表）
+            known_digest: 上次获取的页面摘要（可选，相同时不解析）
+            progress: 进度回调 progress(stage)（可选，在后台事件循环线程中调用）
             
         Returns:
             tuple: (success, channels)
                 - success: 是否成功
-                - channels: 频道列表或错误信息
+                - channels: 频道列表或错误信息；页面与 known_digest 相同时为 None
         """
-        try:
-            # 认证
-            if not self.auth.authenticate():
-                return False, "认证失败"
-            
-            # 创建fetcher
-            self.fetcher = IPTVChannelFetcher(self.auth)
-            
-            # 获取频道
-            channels = self.fetcher.get_channels(filter_sd, channel_filters)
-            
-            if not channels:
-                return False, "未获取到频道"
-            
-            return True, channels
-            
-        except Exception as e:
-            import traceback
-            error_trace = traceback.format_exc()
-            error_msg = str(e) if str(e) else f"{type(e).__name__}: 无详细信息"
-            logger.error(f'获取频道异常: {error_msg}\n{error_trace}')
-            return False, error_msg
+        return run_coroutine(self.client.fetch_channels(filter_sd, channel_filters, known_digest, progress))
 
     @staticmethod
     def parse_channel_info(channel):
@@ -24,6 +24,17 @@ class Config:
     # 数据库配置
     DATABASE_PATH = os.path.join(DATA_DIR, 'iptv.db')
     print(f"DATA_DIR: {DATA_DIR}")  # 调试输出
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))  # 读连接池常驻连接数（写连接固定 1 个）
+    DB_POOL_TIMEOUT = 5  # 池满时等待空闲连接的秒数，超时后创建临时连接
+    DB_WRITE_TIMEOUT = 30  # 等待写连接的秒数（写连接只有 1 个，不创建临时连接），超时抛出异常
+    
+    # SQLite 存储调优（创建连接时应用）
+    DB_JOURNAL_MODE = 'WAL'  # WAL 模式下读不阻塞写、写不阻塞读
+    DB_SYNCHRONOUS = 'NORMAL'  # WAL 下 NORMAL 足够安全，且避免每次提交都 fsync
+    DB_CACHE_SIZE = -16000  # 页缓存大小，负数单位为 KiB（约 16MB）
+    DB_MMAP_SIZE = 64 * 1024 * 1024  # 内存映射读取的最大字节数
+    DB_TEMP_STORE = 'MEMORY'  # 临时表和排序使用内存
+    DB_BUSY_TIMEOUT = 5000  # 遇到锁时的等待时间（毫秒）
     
     # JWT 配置
     JWT_SECRET = os.environ.get('JWT_SECRET', 'iptv-system-secret-key-2025')
@@ -38,6 +49,38 @@ class Config:
     API_BASE_URL = '/api'
     API_TIMEOUT = 30
     
+    # EPG 请求容错配置（读取超时使用 API_TIMEOUT）
+    EPG_CONNECT_TIMEOUT = float(os.environ.get('EPG_CONNECT_TIMEOUT', 5))  # 连接超时秒数
+    EPG_RETRY_ATTEMPTS = int(os.environ.get('EPG_RETRY_ATTEMPTS', 2))  # 幂等步骤的最大重试次数
+    EPG_RETRY_BACKOFF = float(os.environ.get('EPG_RETRY_BACKOFF', 0.5))  # 首次重试前的等待秒数（之后翻倍并加抖动）
+    EPG_BREAKER_THRESHOLD = int(os.environ.get('EPG_BREAKER_THRESHOLD', 5))  # 同一主机连续失败多少次后熔断
+    EPG_BREAKER_RESET = float(os.environ.get('EPG_BREAKER_RESET', 60))  # 熔断持续秒数，之后放行一次试探请求
+    
+    # EPG 连接池配置（所有账户共享 TCP 长连接，Cookie 仍按账户隔离）
+    EPG_POOL_SIZE = int(os.environ.get('EPG_POOL_SIZE', 100))  # 连接池总连接数
+    EPG_POOL_PER_HOST = int(os.environ.get('EPG_POOL_PER_HOST', 8))  # 每个 EPG 主机的最大连接数
+    EPG_KEEPALIVE_TIMEOUT = float(os.environ.get('EPG_KEEPALIVE_TIMEOUT', 30))  # 空闲连接保持秒数
+    EPG_ACCEPT_GZIP = os.environ.get('EPG_ACCEPT_GZIP', '1') == '1'  # 是否请求 gzip 压缩的响应
+    
+    # 频道获取并发配置
+    FETCH_MAX_WORKERS = int(os.environ.get('FETCH_MAX_WORKERS', 4))  # 同时进行的账户获取数（所有账户共用同一个 EPG 主机，即对该主机的并发上限）
+    FETCH_JOB_HISTORY = int(os.environ.get('FETCH_JOB_HISTORY', 200))  # 保留供查询的已结束获取作业数
+    FETCH_JOB_STREAM_TIMEOUT = int(os.environ.get('FETCH_JOB_STREAM_TIMEOUT', 300))  # 流式订阅作业进度的最长时间（秒）
+    EPG_SESSION_TTL = int(os.environ.get('EPG_SESSION_TTL', 1200))  # 已认证 EPG 会话的缓存秒数，0 表示不缓存
+    
+    # 定时任务执行配置（每种任务类型一个线程池）
+    SCHEDULER_WORKERS = int(os.environ.get('SCHEDULER_WORKERS', 4))  # 每种任务类型同时执行回调的线程数（回调返回 Future 时提交后即释放线程）
+    SCHEDULER_OVERLAP_POLICY = os.environ.get('SCHEDULER_OVERLAP_POLICY', 'skip')  # 上次未结束时: skip / queue / cancel
+    SCHEDULER_CATCHUP_POLICY = os.environ.get('SCHEDULER_CATCHUP_POLICY', 'once')  # 重启后错过的执行: once 补跑一次 / all 逐次补跑 / skip 跳过
+    
+    # 过滤标清时同一频道多个清晰度版本的保留优先级（从高到低）
+    CHANNEL_VARIANT_PRIORITY = os.environ.get('CHANNEL_VARIANT_PRIORITY', '4K,超清,高清,标清')
+    
+    # 播放列表导出配置
+    PLAYLIST_CACHE_SIZE = int(os.environ.get('PLAYLIST_CACHE_SIZE', 64))  # 缓存的播放列表个数上限（LRU）
+    # M3U 回看地址模板（追加到直播地址后），频道支持时移（TimeShift=1）时输出
+    PLAYLIST_CATCHUP_SOURCE = '?playseek=${(b)yyyyMMddHHmmss}-${(e)yyyyMMddHHmmss}'
+    
     # 安全配置
     PASSWORD_MIN_LENGTH = 6
     PASSWORD_MAX_LENGTH = 128
@@ -59,6 +102,9 @@ class ProductionConfig(Config):
     """生产环境配置"""
     DEBUG = False
     TESTING = False
+    DB_CACHE_SIZE = -64000
+    DB_MMAP_SIZE = 256 * 1024 * 1024
+    DB_BUSY_TIMEOUT = 10000
 
 
 class TestingConfig(Config):
@@ -66,6 +112,7 @@ class TestingConfig(Config):
     DEBUG = True
     TESTING = True
     DATABASE_PATH = os.path.join(DATA_DIR, 'test_iptv.db')
+    DB_MMAP_SIZE = 0
 
 
 # 配置选择
@@ -617,15 +617,22 @@ async function deleteSource(id) {
   }
 }
 
-// 加载频道列表
-async function loadChannels() {
+// 频道列表分页状态
+const CHANNEL_PAGE_SIZE = 100;
+let channelNextCursor = null;
+
+// 加载频道列表（append 为 true 时加载下一页并追加）
+async function loadChannels(append = false) {
   const accountId = document.getElementById('account-filter')?.value || '';
   const category = document.getElementById('category-filter')?.value || '';
   
-  let url = `${API_BASE_URL}/channels`;
-  const params = [];
-  if (accountId) params.push(`account_id=${accountId}`);
-  if (params.length > 0) url += '?' + params.join('&');
+  const params = new URLSearchParams();
+  params.append('limit', CHANNEL_PAGE_SIZE);
+  if (accountId) params.append('account_id', accountId);
+  if (category) params.append('category', category);
+  if (append && channelNextCursor) params.append('after', channelNextCursor);
+  
+  const url = `${API_BASE_URL}/channels?${params.toString()}`;
   
   try {
     const response = await fetch(url, {
@@ -633,16 +640,25 @@ async function loadChannels() {
     });
     const data = await response.json();
     
-    const tbody = document.getElementById('channels-table-body');
-    tbody.innerHTML = '';
+    if (!response.ok) {
+      if (response.status === 401) {
+        logout();
+        return;
+      }
+      showAlert(data.error || '加载频道列表失败', 'danger');
+      return;
+    }
     
-    // 前端过滤分类
-    let channels = data.data;
-    if (category) {
-      channels = channels.filter(ch => ch.category === category);
+    const tbody = document.getElementById('channels-table-body');
+    if (!append) {
+      tbody.innerHTML = '';
     }
     
-    if (channels.length === 0) {
+    const channels = data.data;
+    channelNextCursor = data.has_more ? data.next_cursor : null;
+    updateChannelsLoadMore();
+    
+    if (!append && channels.length === 0) {
       tbody.innerHTML = '<tr><td colspan="8" class="text-center text-muted">暂无数据</td></tr>';
       return;
     }
@@ -676,10 +692,25 @@ async function loadChannels() {
   }
 }
 
+// 根据是否还有下一页显示或隐藏"加载更多"按钮
+function updateChannelsLoadMore() {
+  const loadMoreBtn = document.getElementById('channels-load-more');
+  if (loadMoreBtn) {
+    loadMoreBtn.style.display = channelNextCursor ? '' : 'none';
+  }
+}
+
+// 加载下一页频道
+function loadMoreChannels() {
+  if (channelNextCursor) {
+    loadChannels(true);
+  }
+}
+
 // 为频道筛选器加载分类列表
 async function loadCategoriesForChannelFilter() {
   try {
-    const response = await fetch(`${API_BASE_URL}/channels`, {
+    const response = await fetch(`${API_BASE_URL}/channels/categories`, {
       headers: getAuthHeaders()
     });
     
@@ -694,19 +725,14 @@ async function loadCategoriesForChannelFilter() {
     
     const data = await response.json();
     
-    // 从频道数据中提取所有唯一的分类
-    const categories = new Set();
-    data.data.forEach(channel => {
-      if (channel.category) {
-        categories.add(channel.category);
-      }
-    });
+    // 服务端已去重并排序
+    const categories = data.data.map(item => item.category);
     
     // 更新分类筛选下拉框
     const categoryFilter = document.getElementById('category-filter');
     if (categoryFilter) {
       categoryFilter.innerHTML = '<option value="">所有分类</option>';
-      Array.from(categories).sort().forEach(category => {
+      categories.forEach(category => {
         const option = document.createElement('option');
         option.value = category;
         option.textContent = category;
@@ -1717,11 +1743,21 @@ function getRepeatTypeName(repeatType) {
     'once': '仅一次',
     'daily': '每天',
     'weekly': '每周',
-    'monthly': '每月'
+    'monthly': '每月',
+    'cron': 'Cron'
   };
   return repeatMap[repeatType] || repeatType;
 }
 
+// 切换重复类型时启用对应的输入框（cron 类型使用 cron 表达式代替执行时间）
+function updateRepeatTypeFields() {
+  const isCron = document.getElementById('repeatType').value === 'cron';
+  document.getElementById('scheduleTime').required = !isCron;
+  document.getElementById('scheduleTime').disabled = isCron;
+  document.getElementById('cronExpr').required = isCron;
+  document.getElementById('cronExpr').disabled = !isCron;
+}
+
 async function loadScheduleTasks() {
   try {
     // 先加载账户列表到下拉框和映射
@@ -1767,7 +1803,7 @@ async function loadScheduleTasks() {
         <td>${task.id}</td>
         <td>${accountName}</td>
         <td>${taskTypeName}</td>
-        <td>${task.schedule_time || '-'}</td>
+        <td>${(task.repeat_type === 'cron' ? task.cron_expr : task.schedule_time) || '-'}${task.jitter_minutes ? ` <small class="text-muted">(+${task.jitter_minutes}分钟内)</small>` : ''}</td>
         <td>${repeatTypeName}</td>
         <td><span class="badge ${task.is_enabled ? 'bg-success' : 'bg-secondary'}">${task.is_enabled ? '启用' : '禁用'}</span></td>
         <td>
@@ -1789,6 +1825,23 @@ async function loadScheduleTasks() {
   }
 }
 
+// 频道过滤规则：表单中每行一条，提交为 JSON 数组（正则中的逗号如 {1,2} 不会被拆开）
+function parseChannelFilterLines(text) {
+  return text.split('\n').map(line => line.trim()).filter(line => line);
+}
+
+// 已保存的规则（JSON 数组文本）转换为每行一条
+function formatChannelFilterLines(value) {
+  if (!value) return '';
+  try {
+    const rules = JSON.parse(value);
+    if (Array.isArray(rules)) return rules.join('\n');
+  } catch (e) {
+    // 旧数据不是 JSON，原样显示
+  }
+  return value;
+}
+
 async function submitScheduleForm(event) {
   event.preventDefault();
   
@@ -1796,7 +1849,9 @@ async function submitScheduleForm(event) {
   const taskType = document.getElementById('taskType').value;
   const scheduleTime = document.getElementById('scheduleTime').value;
   const repeatType = document.getElementById('repeatType').value;
-  const channelFilters = document.getElementById('channelFilters').value;
+  const cronExpr = document.getElementById('cronExpr').value;
+  const jitterMinutes = parseInt(document.getElementById('jitterMinutes').value) || 0;
+  const channelFilters = parseChannelFilterLines(document.getElementById('channelFilters').value);
   const filterSd = document.getElementById('filterSd').checked;
   const editTaskId = document.getElementById('editTaskId').value;
   
@@ -1818,6 +1873,8 @@ async function submitScheduleForm(event) {
           task_type: taskType,
           schedule_time: scheduleTime,
           repeat_type: repeatType,
+          cron_expr: cronExpr,
+          jitter_minutes: jitterMinutes,
           channel_filters: channelFilters,
           filter_sd: filterSd
         })
@@ -1835,10 +1892,11 @@ async function submitScheduleForm(event) {
         document.getElementById('scheduleResetBtn').style.display = 'none';
         document.getElementById('scheduleCancelBtn').style.display = 'none';
         document.getElementById('scheduleForm').reset();
+        updateRepeatTypeFields();
         loadScheduleTasks();
       } else {
         const error = await response.json();
-        showAlert(error.error || '更新失败', 'danger');
+        showAlert(error.error || error.message || '更新失败', 'danger');
       }
     } else {
       // 创建新任务
@@ -1850,6 +1908,8 @@ async function submitScheduleForm(event) {
           task_type: taskType,
           schedule_time: scheduleTime,
           repeat_type: repeatType,
+          cron_expr: cronExpr,
+          jitter_minutes: jitterMinutes,
           channel_filters: channelFilters,
           filter_sd: filterSd
         })
@@ -1858,10 +1918,11 @@ async function submitScheduleForm(event) {
       if (response.ok) {
         showAlert('任务创建成功', 'success');
         document.getElementById('scheduleForm').reset();
+        updateRepeatTypeFields();
         loadScheduleTasks();
       } else {
         const error = await response.json();
-        showAlert(error.error || '创建失败', 'danger');
+        showAlert(error.error || error.message || '创建失败', 'danger');
       }
     }
   } catch (error) {
@@ -1878,12 +1939,15 @@ function resetScheduleForm() {
     document.getElementById('taskType').value = orig.taskType;
     document.getElementById('scheduleTime').value = orig.scheduleTime;
     document.getElementById('repeatType').value = orig.repeatType;
+    document.getElementById('cronExpr').value = orig.cronExpr || '';
+    document.getElementById('jitterMinutes').value = orig.jitterMinutes || 0;
     document.getElementById('channelFilters').value = orig.channelFilters || '';
     document.getElementById('filterSd').checked = orig.filterSd === 1 || orig.filterSd === true;
   } else {
     // 清空表单
     document.getElementById('scheduleForm').reset();
   }
+  updateRepeatTypeFields();
 }
 
 function cancelScheduleEdit() {
@@ -1899,6 +1963,7 @@ function cancelScheduleEdit() {
   document.getElementById('scheduleCancelBtn').style.display = 'none';
   
   document.getElementById('scheduleForm').reset();
+  updateRepeatTypeFields();
 }
 
 async function toggleScheduleTask(taskId, currentStatus) {
@@ -1943,7 +2008,9 @@ async function editScheduleTask(taskId) {
       taskType: task.task_type,
       scheduleTime: task.schedule_time,
       repeatType: task.repeat_type,
-      channelFilters: task.channel_filters,
+      cronExpr: task.repeat_type === 'cron' ? task.cron_expr : '',
+      jitterMinutes: task.jitter_minutes,
+      channelFilters: formatChannelFilterLines(task.channel_filters),
       filterSd: task.filter_sd
     };
     
@@ -1952,8 +2019,11 @@ async function editScheduleTask(taskId) {
     document.getElementById('taskType').value = task.task_type;
     document.getElementById('scheduleTime').value = task.schedule_time;
     document.getElementById('repeatType').value = task.repeat_type;
-    document.getElementById('channelFilters').value = task.channel_filters || '';
+    document.getElementById('cronExpr').value = task.repeat_type === 'cron' ? (task.cron_expr || '') : '';
+    document.getElementById('jitterMinutes').value = task.jitter_minutes || 0;
+    document.getElementById('channelFilters').value = formatChannelFilterLines(task.channel_filters);
     document.getElementById('filterSd').checked = task.filter_sd === 1;
+    updateRepeatTypeFields();
     document.getElementById('editTaskId').value = taskId;
     
     // 修改UI文本
@@ -1993,6 +2063,25 @@ async function deleteScheduleTask(taskId) {
   }
 }
 
+// 轮询频道获取作业直到结束，onProgress 接收每次的作业状态
+async function pollFetchJob(jobId, onProgress, interval = 1000) {
+  while (true) {
+    const response = await fetch(`${API_BASE_URL}/iptv/jobs/${jobId}`, {
+      headers: getAuthHeaders()
+    });
+    const data = await response.json();
+    if (!response.ok) {
+      throw new Error(data.message || data.error || '查询作业失败');
+    }
+    const job = data.job;
+    if (onProgress) onProgress(job);
+    if (job.status === 'success' || job.status === 'failed') {
+      return job;
+    }
+    await new Promise(resolve => setTimeout(resolve, interval));
+  }
+}
+
 // 立即执行定时任务
 async function executeScheduleTaskNow(taskId) {
   // 创建执行中提示
@@ -2009,13 +2098,23 @@ async function executeScheduleTaskNow(taskId) {
     
     const data = await response.json();
     
-    if (response.ok) {
-      showAlert('任务执行成功', 'success');
-      // 短暂延迟后刷新任务列表
-      setTimeout(() => loadScheduleTasks(), 1000);
-    } else {
+    if (!response.ok) {
       showAlert(data.error || data.message || '任务执行失败', 'danger');
+      return;
+    }
+    
+    // 提交后轮询作业进度
+    const job = await pollFetchJob(data.job_id, (job) => {
+      btn.innerHTML = `<i class="bi bi-hourglass-split"></i> ${job.message}`;
+    });
+    
+    if (job.status === 'success') {
+      showAlert(job.message || '任务执行成功', 'success');
+    } else {
+      showAlert(job.message || '任务执行失败', 'danger');
     }
+    // 短暂延迟后刷新任务列表（执行结果在作业结束后写入）
+    setTimeout(() => loadScheduleTasks(), 1000);
   } catch (error) {
     console.error('执行任务失败:', error);
     showAlert('执行失败: ' + error.message, 'danger');
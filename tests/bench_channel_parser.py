@@ -0,0 +1,50 @@
+"""
+频道列表解析基准测试：单遍字节解析器 vs 原 BeautifulSoup 实现
+
+用法:
+    python tests/bench_channel_parser.py [频道数 ...]
+"""
+import os
+import sys
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.tellyget_core import IPTVChannelFetcher
+from bs4_channel_parser import parse_and_filter_bs4
+from test_channel_parser import build_large_page, load_fixture
+
+
+def bench(func, repeat):
+    """返回多次执行中的最短耗时（毫秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10, 300, 2000]
+
+    print(f"{'频道数':>8} {'页面大小':>10} {'bs4(ms)':>10} {'字节解析(ms)':>14} {'加速比':>8}")
+    for size in sizes:
+        content = load_fixture() if size == 10 else build_large_page(size)
+        text = content.decode('utf-8')
+        repeat = 50 if size <= 300 else 10
+
+        assert IPTVChannelFetcher.parse_channels(content, True) == parse_and_filter_bs4(text, True)
+
+        # bs4 路径需要先得到解码后的文本（与 response.text 相同），计入耗时
+        bs4_ms = bench(lambda: parse_and_filter_bs4(content.decode('utf-8'), True), repeat)
+        fast_ms = bench(lambda: IPTVChannelFetcher.parse_channels(content, True), repeat)
+
+        print(f"{size:>8} {len(content) / 1024:>8.1f}KB {bs4_ms:>10.2f} {fast_ms:>14.2f} {bs4_ms / fast_ms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    import logging
+    logging.disable(logging.INFO)
+    main()
@@ -0,0 +1,46 @@
+"""
+基于 BeautifulSoup 的原频道列表解析实现
+
+仅作为 channel_parser 的对照实现（一致性测试与基准测试使用），只负责解析；
+名称过滤和标清去重由调用方交给 IPTVChannelFetcher.filter_channels，与生产路径一致。
+"""
+import re
+
+from bs4 import BeautifulSoup
+
+from app.utils.tellyget_core import IPTVChannelFetcher
+
+_CHANNEL_RE = re.compile(r'Authentication.CTCSetConfig\(\'Channel\',\'(.+?)\'\)', re.MULTILINE)
+
+
+def parse_channels_bs4(text):
+    """
+    解析频道列表页面
+
+    Args:
+        text: getchannellistHWCTC.jsp 页面内容（已解码的文本）
+
+    Returns:
+        list: 原始频道列表（未过滤）
+    """
+    soup = BeautifulSoup(text, 'html.parser')
+    scripts = soup.find_all('script', string=re.compile('ChannelID="[^"]+"'))
+
+    channels = []
+    for script in scripts:
+        match = _CHANNEL_RE.search(script.string)
+        if not match:
+            continue
+
+        channel = {}
+        for channel_param in match.group(1).split('",'):
+            if '="' in channel_param:
+                key, value = channel_param.split('="', 1)
+                channel[key] = value
+        channels.append(channel)
+    return channels
+
+
+def parse_and_filter_bs4(text, filter_sd=True, channel_filters=None):
+    """用原解析实现解析后，按生产代码的规则过滤（与 IPTVChannelFetcher.parse_channels 对照）"""
+    return IPTVChannelFetcher.filter_channels(parse_channels_bs4(text), filter_sd, channel_filters)
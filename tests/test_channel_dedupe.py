@@ -0,0 +1,80 @@
+"""
+测试频道清晰度去重
+"""
+import os
+import sys
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.channel_dedupe import VariantRules, dedupe_channels, parse_variant_priority
+
+
+def make_channels(*names):
+    return [{'ChannelID': str(i), 'ChannelName': name} for i, name in enumerate(names)]
+
+
+def names_of(channels):
+    return [channel['ChannelName'] for channel in channels]
+
+
+@pytest.mark.parametrize('name,expected', [
+    ('广东卫视', ('广东卫视', '标清')),
+    ('广东卫视高清', ('广东卫视', '高清')),
+    ('广东卫视超清', ('广东卫视', '超清')),
+    ('广东卫视4K', ('广东卫视', '4K')),
+    ('广东卫视4K超高清', ('广东卫视', '4K')),
+    ('CCTV-1 HD', ('CCTV-1', '高清')),
+    ('CCTV-1-hd', ('CCTV-1', '高清')),
+    ('CCTV-5+高清', ('CCTV-5+', '高清')),
+    ('高清', ('高清', '标清')),
+    ('1001', ('1001', '标清')),
+])
+def test_normalize(name, expected):
+    assert VariantRules().normalize(name) == expected
+
+
+def test_keeps_highest_variant_in_original_order():
+    channels = make_channels('广东卫视', 'CCTV-1', '广东卫视高清', 'CCTV-1-HD', '广东卫视4K', '珠江频道', 'CCTV-1超清')
+    groups = []
+
+    result = dedupe_channels(channels, groups=groups)
+
+    assert names_of(result) == ['广东卫视4K', '珠江频道', 'CCTV-1超清']
+    assert groups == [
+        {'name': '广东卫视', 'winner': '广东卫视4K', 'variant': '4K', 'dropped': ['广东卫视', '广东卫视高清']},
+        {'name': 'CCTV-1', 'winner': 'CCTV-1超清', 'variant': '超清', 'dropped': ['CCTV-1', 'CCTV-1-HD']},
+    ]
+
+
+def test_same_variant_duplicates_keep_first():
+    channels = make_channels('湖南卫视高清', '湖南卫视高清', '湖南卫视 HD')
+
+    result = dedupe_channels(channels)
+
+    assert [channel['ChannelID'] for channel in result] == ['0']
+
+
+def test_configurable_priority():
+    channels = make_channels('广东卫视高清', '广东卫视4K')
+    rules = VariantRules(parse_variant_priority('高清,4K,标清'))
+
+    assert names_of(dedupe_channels(channels, rules)) == ['广东卫视高清']
+    with pytest.raises(ValueError):
+        parse_variant_priority('高清,8K')
+
+
+def test_large_lineup():
+    names = []
+    for i in range(400):
+        names += [f'频道{i}', f'频道{i}高清', f'频道{i}4K']
+    channels = make_channels(*names)
+    groups = []
+
+    result = dedupe_channels(channels, groups=groups)
+
+    assert len(channels) == 1200
+    assert names_of(result) == [f'频道{i}4K' for i in range(400)]
+    assert len(groups) == 400
@@ -0,0 +1,87 @@
+"""
+测试频道名称过滤器的规则解析、编译与匹配
+"""
+import os
+import re
+import sys
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.channel_filter import ChannelFilterError, compile_channel_filters, parse_filter_rules
+from app.utils.tellyget_core import IPTVChannelFetcher
+
+NAMES = ['CCTV-1', 'CCTV-5+体育', '广东卫视高清', '1001', '购物频道', '广州综合', 'abc(1)']
+
+
+@pytest.mark.parametrize('value,expected', [
+    (None, ()),
+    ('', ()),
+    ([], ()),
+    (['^CCTV', ' 购物 ', ''], ('^CCTV', '购物')),
+    ('^CCTV, 购物,', ('^CCTV', '购物')),
+    ('["^CCTV", "a,b"]', ('^CCTV', 'a,b')),
+])
+def test_parse_filter_rules(value, expected):
+    assert parse_filter_rules(value) == expected
+
+
+def test_comma_in_json_rules_is_kept():
+    rules = compile_channel_filters([r'^CCTV\d{1,2}$']).rules
+    assert rules == (r'^CCTV\d{1,2}$',)
+    assert compile_channel_filters(r'["^CCTV\\d{1,2}$"]').rules == rules
+
+
+@pytest.mark.parametrize('value', [r'^CCTV\d{1,2}$', r'^\d{3,}$,购物', '购物,[,;]'])
+def test_ambiguous_comma_separated_rules_are_rejected(value):
+    with pytest.raises(ChannelFilterError):
+        parse_filter_rules(value)
+
+
+@pytest.mark.parametrize('value', ['[1, 2]', '["x"', {'a': 1}, ['(unclosed']])
+def test_invalid_rules_are_rejected(value):
+    with pytest.raises(ChannelFilterError):
+        compile_channel_filters(value)
+
+
+@pytest.mark.parametrize('rules', [
+    [r'^\d+$', '购物'],
+    ['CCTV', '^广州'],
+    [r'(\d)\1', 'CCTV'],          # 自带分组 / 反向引用，退回逐条匹配
+    ['CCTV', '(?i)abc'],          # 全局标志无法合并，退回逐条匹配
+    [r'\(1\)$', '卫视', r'^\d'],
+])
+def test_match_agrees_with_re_search(rules):
+    name_filter = compile_channel_filters(rules)
+
+    for name in NAMES:
+        expected = next((rule for rule in rules if re.search(rule, name)), None)
+        if name_filter._combined is None:
+            assert name_filter.match(name) == expected
+        else:
+            # 合并表达式报告最左侧命中的规则，命中与否与逐条匹配一致
+            rule = name_filter.match(name)
+            assert (rule is None) == (expected is None)
+            assert rule is None or re.search(rule, name)
+
+
+def test_compiled_filter_is_cached():
+    assert compile_channel_filters('CCTV,购物') is compile_channel_filters(['CCTV', '购物'])
+    assert compile_channel_filters('["CCTV", "购物"]').to_json() == '["CCTV", "购物"]'
+
+
+def test_filter_channels_reports_excluded_rule():
+    channels = [{'ChannelID': str(i), 'ChannelName': name} for i, name in enumerate(NAMES)]
+    excluded = []
+
+    result = IPTVChannelFetcher.filter_channels(channels, False, r'^\d+$,购物', excluded)
+
+    assert [channel['ChannelName'] for channel in result] == [
+        'CCTV-1', 'CCTV-5+体育', '广东卫视高清', '广州综合', 'abc(1)'
+    ]
+    assert excluded == [
+        {'channel_id': '3', 'channel_name': '1001', 'rule': r'^\d+$'},
+        {'channel_id': '4', 'channel_name': '购物频道', 'rule': '购物'},
+    ]
@@ -0,0 +1,129 @@
+"""
+测试频道匹配：模板索引的缓存与版本失效、按模板库批量更新已入库频道
+"""
+import os
+import sys
+import threading
+from datetime import datetime
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import database, execute_query, execute_update
+from app.models import init_database
+from app.models.channel_template import init_channel_template_table
+from app.services import channel_matcher
+from app.services.channel_matcher import ChannelMatcher, get_channel_matcher
+from app.services.channel_template_service import ChannelTemplateService
+from app.services.iptv_service import IPTVService
+
+
+@pytest.fixture
+def source_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(database.config, 'DATABASE_PATH', str(tmp_path / 'iptv.db'))
+    init_database()
+    init_channel_template_table()
+    execute_update("INSERT INTO sources (id, name) VALUES (1, '测试源')")
+    execute_update("INSERT INTO sources (id, name) VALUES (2, '其他源')")
+    execute_update("INSERT INTO channel_template (id, channel_id, name, group_title) VALUES (1, '1', 'CCTV-1', '央视')")
+    ChannelTemplateService.invalidate_index()
+    IPTVService._save_channels_to_db(1, [make_channel('1', 'CCTV-1高清'), make_channel('2', '广东卫视')])
+    IPTVService._save_channels_to_db(2, [make_channel('1', 'CCTV-1高清')])
+    yield 1
+    ChannelTemplateService.invalidate_index()
+
+
+def make_channel(channel_id, name):
+    return {
+        'ChannelID': channel_id, 'ChannelName': name, 'ChannelURL': f'igmp://239.0.0.{channel_id}',
+        'UserChannelID': channel_id, 'TimeShift': '0', 'ChannelSDP': '', 'ChannelLogoURL': '', 'Positon': ''
+    }
+
+
+def channel(source_id, channel_id):
+    return execute_query(
+        'SELECT channel_name, category, content_hash, updated_at FROM channels WHERE source_id = ? AND channel_id = ?',
+        (source_id, channel_id), fetch_one=True
+    )
+
+
+def test_index_is_loaded_once_until_invalidated(source_id):
+    matcher = ChannelMatcher()
+    assert matcher.match_many(['1', '2']) == {'1': matcher.match_channel('1'), '2': None}
+    assert matcher.match_channel('1')['name'] == 'CCTV-1'
+    assert matcher.get_statistics()['loads'] == 1
+
+    execute_update("UPDATE channel_template SET name = 'CCTV1 综合' WHERE id = 1")
+    # 未失效时继续使用内存中的索引
+    assert matcher.match_channel('1')['name'] == 'CCTV-1'
+
+    matcher.invalidate()
+    assert matcher.match_channel('1')['name'] == 'CCTV1 综合'
+    stats = matcher.get_statistics()
+    assert (stats['loads'], stats['lookups'], stats['hits']) == (2, 6, 5)
+
+
+def test_edit_during_build_triggers_another_load(source_id, monkeypatch):
+    matcher = ChannelMatcher()
+    load = channel_matcher.execute_query
+    editors = []
+
+    def load_then_edit(*args, **kwargs):
+        rows = load(*args, **kwargs)
+        if not editors:
+            # 构建索引期间另一个线程修改模板并使索引失效（失效需等本次构建结束）
+            execute_update("UPDATE channel_template SET group_title = '央视频道' WHERE id = 1")
+            editors.append(threading.Thread(target=matcher.invalidate))
+            editors[0].start()
+        return rows
+
+    monkeypatch.setattr(channel_matcher, 'execute_query', load_then_edit)
+    assert matcher.match_channel('1')['group_title'] == '央视'
+    editors[0].join(5)
+    assert matcher.match_channel('1')['group_title'] == '央视频道'
+    assert matcher.get_statistics()['loads'] == 2
+
+
+def test_template_service_changes_reach_the_shared_matcher(source_id):
+    assert ChannelTemplateService.match_channel_info('9') == {'name': None, 'group_title': '未分类'}
+
+    assert ChannelTemplateService.add_template('9', '湖南卫视', '卫视')['success']
+    assert ChannelTemplateService.match_channels_info(['9', '1']) == {
+        '9': {'name': '湖南卫视', 'group_title': '卫视'},
+        '1': {'name': 'CCTV-1', 'group_title': '央视'},
+    }
+
+    assert ChannelTemplateService.delete_template(1)['success']
+    assert ChannelTemplateService.match_channel_info('1') == {'name': None, 'group_title': '未分类'}
+
+
+@pytest.mark.parametrize('update_from', [True, False])
+def test_name_only_change_is_written(source_id, monkeypatch, update_from):
+    monkeypatch.setattr(channel_matcher, '_UPDATE_FROM_SUPPORTED', update_from)
+    # 只改标准名称，分类不变
+    execute_update("UPDATE channel_template SET name = 'CCTV1 综合' WHERE id = 1")
+    ChannelTemplateService.invalidate_index()
+    before = datetime.now().replace(microsecond=0)
+
+    assert get_channel_matcher().update_database_categories(source_id) == {'updated': 1, 'skipped': 1}
+
+    row = channel(source_id, '1')
+    assert (row['channel_name'], row['category'], row['content_hash']) == ('CCTV1 综合', '央视', None)
+    # 与其他写入一致，使用本地时间
+    assert datetime.strptime(row['updated_at'], '%Y-%m-%d %H:%M:%S') >= before
+    # 未匹配模板的频道和其他源的频道不受影响
+    assert channel(source_id, '2')['channel_name'] == '广东卫视'
+    assert channel(2, '1')['channel_name'] == 'CCTV-1'
+
+
+@pytest.mark.parametrize('update_from', [True, False])
+def test_up_to_date_channels_are_skipped(source_id, monkeypatch, update_from):
+    monkeypatch.setattr(channel_matcher, '_UPDATE_FROM_SUPPORTED', update_from)
+    assert get_channel_matcher().update_database_categories() == {'updated': 0, 'skipped': 3}
+
+    execute_update("UPDATE channel_template SET group_title = '央视频道' WHERE id = 1")
+    ChannelTemplateService.invalidate_index()
+    assert get_channel_matcher().update_database_categories() == {'updated': 2, 'skipped': 1}
+    assert get_channel_matcher().update_database_categories() == {'updated': 0, 'skipped': 3}
@@ -0,0 +1,96 @@
+"""
+测试频道列表游标分页：翻页完整性与游标绑定
+"""
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import database, execute_update
+from app.utils.auth import generate_token
+from app.models import init_database
+from app.models.channel_template import init_channel_template_table
+from app.routes import register_blueprints
+from app.services.channel_template_service import ChannelTemplateService
+from app.services.iptv_service import IPTVService
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(database.config, 'DATABASE_PATH', str(tmp_path / 'iptv.db'))
+    init_database()
+    init_channel_template_table()
+    ChannelTemplateService.invalidate_index()
+    execute_update("INSERT INTO sources (id, name) VALUES (1, '测试源')")
+    execute_update("INSERT INTO sources (id, name) VALUES (2, '其他源')")
+    IPTVService._save_channels_to_db(1, [make_channel(str(index), f'频道{index:02d}') for index in range(1, 8)])
+    IPTVService._save_channels_to_db(2, [make_channel(str(index), f'频道{index:02d}') for index in range(1, 4)])
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    register_blueprints(app)
+    yield app.test_client()
+    ChannelTemplateService.invalidate_index()
+
+
+def make_channel(channel_id, name):
+    return {
+        'ChannelID': channel_id, 'ChannelName': name, 'ChannelURL': f'igmp://239.0.0.{channel_id}',
+        'UserChannelID': channel_id, 'TimeShift': '0', 'ChannelSDP': '', 'ChannelLogoURL': '', 'Positon': ''
+    }
+
+
+def get(client, **params):
+    headers = {'Authorization': 'Bearer ' + generate_token(1, 'admin')}
+    return client.get('/api/channels', query_string=params, headers=headers)
+
+
+def collect_pages(client, **params):
+    ids, after, pages = [], None, 0
+    while True:
+        query = dict(params, limit=3, **({'after': after} if after else {}))
+        body = get(client, **query).get_json()
+        ids.extend(row['id'] for row in body['data'])
+        pages += 1
+        if not body['has_more']:
+            assert body['next_cursor'] is None
+            return ids, pages
+        after = body['next_cursor']
+
+
+@pytest.mark.parametrize('sort', ['-created_at', 'created_at', 'channel_name', '-channel_name', 'id', '-id'])
+def test_pages_cover_every_row_once(client, sort):
+    # 同一批入库的频道 created_at 相同，靠 id 作为第二排序键保证不重不漏
+    expected = [row['id'] for row in get(client, sort=sort).get_json()['data']]
+    ids, pages = collect_pages(client, sort=sort)
+
+    assert ids == expected
+    assert len(ids) == 10
+    assert pages == 4
+
+
+def test_pages_respect_filters(client):
+    ids, _ = collect_pages(client, source_id=1, sort='channel_name')
+    assert len(ids) == 7
+
+    ids, _ = collect_pages(client, name='频道0', source_id=2)
+    assert len(ids) == 3
+
+
+@pytest.mark.parametrize('changed', [{'sort': 'id'}, {'sort': 'channel_name'}, {'source_id': 2}, {'name': '频道'}])
+def test_cursor_from_another_query_is_rejected(client, changed):
+    cursor = get(client, sort='-channel_name', source_id=1, limit=3).get_json()['next_cursor']
+    assert get(client, sort='-channel_name', source_id=1, limit=3, after=cursor).status_code == 200
+
+    params = dict({'sort': '-channel_name', 'source_id': 1}, **changed)
+    response = get(client, limit=3, after=cursor, **params)
+    assert response.status_code == 400
+    assert '不匹配' in response.get_json()['error']
+
+
+def test_malformed_cursor_is_rejected(client):
+    response = get(client, limit=3, after='not-a-cursor')
+    assert response.status_code == 400
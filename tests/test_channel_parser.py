@@ -0,0 +1,151 @@
+"""
+测试频道列表解析器与原 BeautifulSoup 实现输出一致
+
+对照实现（bs4_channel_parser）只负责解析，过滤与去重同样交给 IPTVChannelFetcher.filter_channels，
+因此这里比较的是解析结果；标清去重的规则由 test_channel_dedupe 覆盖。
+"""
+import os
+import re
+import sys
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.channel_parser import ChannelListParser, iter_channels
+from app.utils.tellyget_core import IPTVChannelFetcher
+from bs4_channel_parser import parse_and_filter_bs4, parse_channels_bs4
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'getchannellistHWCTC.html')
+
+_CHANNEL_SCRIPT_RE = re.compile(r'<script type="text/javascript">\n\tAuthentication.CTCSetConfig\(\'Channel\'.*?</script>\n', re.S)
+
+
+def load_fixture():
+    with open(FIXTURE_PATH, 'rb') as f:
+        return f.read()
+
+
+def build_variant_page():
+    """样例页面的频道改名为带 4K / 超清 / HD 等清晰度后缀的变体"""
+    renames = {
+        '广东卫视': '广东卫视4K', 'CCTV-1': 'CCTV-1超清', '湖南卫视高清': '湖南卫视HD', '珠江频道': '湖南卫视',
+    }
+    page = load_fixture().decode('utf-8')
+    for old, new in renames.items():
+        page = page.replace(f'ChannelName="{old}"', f'ChannelName="{new}"')
+    return page.encode('utf-8')
+
+
+def build_large_page(count=2000):
+    """以样例页面中的频道为模板，生成包含 count 个频道的页面"""
+    page = load_fixture().decode('utf-8')
+    scripts = _CHANNEL_SCRIPT_RE.findall(page)
+    body = []
+    for i in range(count):
+        script = scripts[i % len(scripts)]
+        suffix = i // len(scripts)
+        if suffix:
+            script = re.sub(r'ChannelID="(\d+)"', lambda m: f'ChannelID="{m.group(1)}{suffix:04d}"', script)
+            script = re.sub(r'ChannelName="([^"]+)"', lambda m: f'ChannelName="{m.group(1)}{suffix}"', script)
+        body.append(script)
+    start = page.index(scripts[0])
+    end = page.index(scripts[-1]) + len(scripts[-1])
+    return (page[:start] + ''.join(body) + page[end:]).encode('utf-8')
+
+
+@pytest.mark.parametrize('filter_sd,channel_filters', [
+    (False, None),
+    (True, None),
+    (True, [r'^\d+$']),
+    (False, [r'CCTV', r'^广州']),
+])
+def test_parity_with_bs4_on_sample_page(filter_sd, channel_filters):
+    content = load_fixture()
+
+    expected = parse_and_filter_bs4(content.decode('utf-8'), filter_sd, channel_filters)
+    actual = IPTVChannelFetcher.parse_channels(content, filter_sd, channel_filters)
+
+    assert actual == expected
+    assert len(actual) > 0
+
+
+def test_variants_on_page_are_deduped():
+    content = build_variant_page()
+
+    expected = parse_and_filter_bs4(content.decode('utf-8'), True)
+    actual = IPTVChannelFetcher.parse_channels(content, True)
+
+    assert actual == expected
+    names = [channel['ChannelName'] for channel in actual]
+    # 每组只保留清晰度最高的版本
+    assert '广东卫视4K' in names and '广东卫视高清' not in names
+    assert 'CCTV-1超清' in names and 'CCTV-1高清' not in names
+    assert names.count('湖南卫视HD') == 1 and '湖南卫视' not in names
+
+
+def test_parity_with_bs4_on_large_page():
+    content = build_large_page()
+
+    expected = parse_and_filter_bs4(content.decode('utf-8'), True, [r'^\d+'])
+    actual = IPTVChannelFetcher.parse_channels(content, True, [r'^\d+'])
+
+    assert actual == expected
+    assert len(actual) > 1000
+
+
+def test_parity_with_non_utf8_page():
+    content = load_fixture().decode('utf-8').replace('charset=UTF-8', 'charset=GBK').encode('gbk')
+
+    expected = parse_and_filter_bs4(content.decode('gbk'), False)
+    actual = IPTVChannelFetcher.parse_channels(content, False, encoding='gbk')
+
+    assert actual == expected
+    assert actual[0]['ChannelName'] == '广东卫视高清'
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 13, 64, 1000])
+def test_chunked_input_matches_whole_page(chunk_size):
+    content = load_fixture()
+    chunks = [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
+
+    assert list(iter_channels(chunks)) == list(iter_channels(content))
+
+
+def test_parser_yields_incrementally():
+    content = load_fixture()
+    marker = content.index(b"CTCSetConfig('Channel'", content.index(b'ChannelID="6198"') - 200)
+
+    parser = ChannelListParser()
+    first = list(parser.feed(content[:marker + 20]))
+    rest = list(parser.feed(content[marker + 20:])) + list(parser.close())
+
+    assert [channel['ChannelID'] for channel in first] == ['6197']
+    assert len(first) + len(rest) == 10
+    assert parser.count == 10
+
+
+def test_ignores_non_channel_config():
+    content = (
+        b"<script>Authentication.CTCSetConfig('SetEpgMode','1');</script>"
+        b"<script>Authentication.CTCSetConfig('Channel','ChannelName=\"x\"');</script>"
+    )
+
+    assert list(iter_channels(content)) == []
+    assert parse_channels_bs4(content.decode()) == []
+
+
+def test_parity_on_malformed_calls():
+    content = (
+        "<script>Authentication_CTCSetConfig('Channel','ChannelID=\"1\",ChannelName=\"a\"');</script>\n"
+        "<script>xAuthenticatio.CTCSetConfig('Channel','ChannelID=\"2\",ChannelName=\"b\"');</script>\n"
+        "<script>Authentication.CTCSetConfig('Channel','ChannelID=\"3\",\nChannelName=\"c\"');</script>\n"
+        "<script>Authentication.CTCSetConfig('Channel','ChannelID=\"4\",ChannelName=\"d'e\"');</script>\n"
+    )
+
+    expected = parse_and_filter_bs4(content, False)
+    actual = IPTVChannelFetcher.parse_channels(content.encode('utf-8'), False)
+
+    assert actual == expected
+    assert [channel['ChannelID'] for channel in actual] == ['1', '4']
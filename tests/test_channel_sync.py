@@ -0,0 +1,77 @@
+"""
+测试频道差异同步：内容摘要与变更记录
+"""
+import os
+import sys
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import database, execute_query, execute_update
+from app.models import init_database
+from app.models.channel_template import init_channel_template_table
+from app.services.channel_matcher import get_channel_matcher
+from app.services.channel_template_service import ChannelTemplateService
+from app.services.iptv_service import IPTVService
+from app.services.playlist_service import PlaylistService
+
+
+@pytest.fixture
+def source_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(database.config, 'DATABASE_PATH', str(tmp_path / 'iptv.db'))
+    init_database()
+    init_channel_template_table()
+    execute_update("INSERT INTO sources (id, name) VALUES (1, '测试源')")
+    execute_update("INSERT INTO channel_template (id, channel_id, name, group_title) VALUES (1, '1', 'CCTV-1', '央视')")
+    ChannelTemplateService.invalidate_index()
+    yield 1
+    ChannelTemplateService.invalidate_index()
+
+
+def make_channel(channel_id, name):
+    return {
+        'ChannelID': channel_id, 'ChannelName': name, 'ChannelURL': f'igmp://239.0.0.{channel_id}',
+        'UserChannelID': channel_id, 'TimeShift': '0', 'ChannelSDP': '', 'ChannelLogoURL': '', 'Positon': ''
+    }
+
+
+def journal_count():
+    return execute_query('SELECT COUNT(*) AS count FROM channel_changes', fetch_one=True)['count']
+
+
+def test_unchanged_channels_are_not_rewritten(source_id):
+    channels = [make_channel('1', 'CCTV-1高清'), make_channel('2', '广东卫视')]
+    assert IPTVService._save_channels_to_db(source_id, channels)['added'] == 2
+
+    result = IPTVService._save_channels_to_db(source_id, channels)
+    assert result['unchanged'] == 2
+    assert journal_count() == 2
+
+
+def test_category_sync_does_not_leave_stale_hash(source_id):
+    channels = [make_channel('1', 'CCTV-1高清'), make_channel('2', '广东卫视')]
+    IPTVService._save_channels_to_db(source_id, channels)
+    before = journal_count()
+
+    assert ChannelTemplateService.update_template(1, group_title='央视频道')['success']
+    assert get_channel_matcher().update_database_categories(source_id)['updated'] == 1
+
+    result = IPTVService._save_channels_to_db(source_id, channels)
+    assert result['unchanged'] == 2
+    assert result['changed'] == 0
+    assert journal_count() == before
+
+
+def test_template_change_invalidates_cached_playlist(source_id):
+    IPTVService._save_channels_to_db(source_id, [make_channel('1', 'CCTV-1高清')])
+    before, _ = PlaylistService.get_artifact(source_id, fmt='m3u')
+    assert PlaylistService.get_artifact(source_id, fmt='m3u')[1]
+    assert b'tvg-name="CCTV-1"' in before.body
+
+    assert ChannelTemplateService.update_template(1, name='CCTV1 HD')['success']
+    after, cached = PlaylistService.get_artifact(source_id, fmt='m3u')
+    assert not cached
+    assert b'tvg-name="CCTV1 HD"' in after.body
+    assert after.etag != before.etag
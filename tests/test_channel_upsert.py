@@ -0,0 +1,93 @@
+"""
+测试频道批量 upsert：按 (source_id, channel_id) 原地更新与唯一索引迁移
+"""
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import database, execute_query, execute_update
+from app.models import init_database
+from app.models.channel_template import init_channel_template_table
+from app.services.channel_template_service import ChannelTemplateService
+from app.services.iptv_service import IPTVService
+
+
+@pytest.fixture
+def source_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(database.config, 'DATABASE_PATH', str(tmp_path / 'iptv.db'))
+    init_database()
+    init_channel_template_table()
+    execute_update("INSERT INTO sources (id, name) VALUES (1, '测试源')")
+    ChannelTemplateService.invalidate_index()
+    yield 1
+    ChannelTemplateService.invalidate_index()
+
+
+def make_channel(channel_id, name, url=None):
+    return {
+        'ChannelID': channel_id, 'ChannelName': name, 'ChannelURL': url or f'igmp://239.0.0.{channel_id}',
+        'UserChannelID': channel_id, 'TimeShift': '0', 'ChannelSDP': '', 'ChannelLogoURL': '', 'Positon': ''
+    }
+
+
+def rows():
+    return {
+        row['channel_id']: row
+        for row in execute_query('SELECT id, channel_id, channel_url, status, created_at FROM channels')
+    }
+
+
+def test_changed_channel_is_updated_in_place(source_id):
+    IPTVService._save_channels_to_db(source_id, [make_channel('1', 'CCTV-1'), make_channel('2', 'CCTV-2')])
+    # 用户停用的频道、原始创建时间在重新获取后应保留
+    execute_update("UPDATE channels SET status = 1, created_at = '2020-01-01 00:00:00' WHERE channel_id = '1'")
+    before = rows()
+
+    result = IPTVService._save_channels_to_db(source_id, [
+        make_channel('1', 'CCTV-1', 'igmp://239.0.1.1'),
+        make_channel('3', 'CCTV-3'),
+    ])
+    after = rows()
+
+    assert (result['added'], result['changed'], result['removed']) == (1, 1, 1)
+    assert set(after) == {'1', '3'}
+    assert after['1']['id'] == before['1']['id']
+    assert after['1']['channel_url'] == 'igmp://239.0.1.1'
+    assert (after['1']['status'], after['1']['created_at']) == (1, '2020-01-01 00:00:00')
+
+
+def test_duplicate_channel_in_one_batch_keeps_the_last(source_id):
+    result = IPTVService._save_channels_to_db(source_id, [
+        make_channel('1', 'CCTV-1', 'igmp://239.0.0.1'),
+        make_channel('1', 'CCTV-1', 'igmp://239.0.0.2'),
+    ])
+
+    assert result['added'] == 1
+    assert [row['channel_url'] for row in rows().values()] == ['igmp://239.0.0.2']
+
+
+def test_migration_removes_duplicates_before_unique_index(source_id):
+    # 模拟升级前的库：没有唯一索引，同一频道存在多行
+    execute_update('DROP INDEX idx_channels_source_channel')
+    for url in ('igmp://old', 'igmp://older', 'igmp://newest'):
+        execute_update(
+            "INSERT INTO channels (source_id, channel_id, channel_name, channel_url) VALUES (1, '1', 'CCTV-1', ?)",
+            (url,)
+        )
+    execute_update("INSERT INTO channels (source_id, channel_id, channel_name, channel_url) VALUES (1, '2', 'CCTV-2', 'igmp://2')")
+
+    init_database()
+
+    remaining = rows()
+    assert {key: row['channel_url'] for key, row in remaining.items()} == {'1': 'igmp://newest', '2': 'igmp://2'}
+    index = execute_query(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND name = 'idx_channels_source_channel'", fetch_one=True
+    )
+    assert 'UNIQUE' in index['sql']
+    with pytest.raises(sqlite3.IntegrityError):
+        execute_update("INSERT INTO channels (source_id, channel_id, channel_name, channel_url) VALUES (1, '2', 'x', 'y')")
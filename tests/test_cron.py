@@ -0,0 +1,92 @@
+"""
+测试下次执行时间计算（cron 表达式、旧重复类型、抖动窗口）
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.cron import (
+    CronError, jitter_offset, next_fire_time, parse_cron, validate_schedule
+)
+
+
+@pytest.mark.parametrize('expr, after, expected', [
+    ('*/15 * * * *', datetime(2024, 5, 10, 3, 7, 30), datetime(2024, 5, 10, 3, 15)),
+    ('0 */6 * * *', datetime(2024, 5, 10, 18, 0), datetime(2024, 5, 11, 0, 0)),
+    ('30 2 * * MON-FRI', datetime(2024, 5, 10, 3, 0), datetime(2024, 5, 13, 2, 30)),   # 周五之后是周一
+    ('0 3 L * *', datetime(2024, 2, 1, 0, 0), datetime(2024, 2, 29, 3, 0)),             # 闰年 2 月最后一天
+    ('0 3 31 * *', datetime(2024, 4, 1, 0, 0), datetime(2024, 5, 31, 3, 0)),            # 4 月没有 31 日
+    ('0 0 1 JAN *', datetime(2024, 5, 10, 0, 0), datetime(2025, 1, 1, 0, 0)),
+    ('0 12 13 * 5', datetime(2024, 5, 10, 13, 0), datetime(2024, 5, 13, 12, 0)),        # 日和星期取并集
+    ('0 0 * * 7', datetime(2024, 5, 10, 0, 0), datetime(2024, 5, 12, 0, 0)),            # 7 也是周日
+    ('@hourly', datetime(2024, 12, 31, 23, 30), datetime(2025, 1, 1, 0, 0)),
+])
+def test_next_after(expr, after, expected):
+    assert parse_cron(expr).next_after(after) == expected
+
+
+def test_next_after_is_strictly_later():
+    expression = parse_cron('0 3 * * *')
+    assert expression.next_after(datetime(2024, 5, 10, 3, 0)) == datetime(2024, 5, 11, 3, 0)
+
+
+def test_expression_that_never_fires():
+    assert parse_cron('0 0 30 2 *').next_after(datetime(2024, 1, 1)) is None
+    with pytest.raises(CronError):
+        validate_schedule('cron', '', '0 0 30 2 *')
+
+
+@pytest.mark.parametrize('expr', ['', '* * * *', '60 * * * *', '* * 0 * *', '*/0 * * * *', '5-1 * * * *', 'a * * * *'])
+def test_invalid_expressions(expr):
+    with pytest.raises(CronError):
+        parse_cron(expr)
+
+
+def test_weekly_keeps_weekday():
+    # 2024-05-10 是周五
+    after = datetime(2024, 5, 10, 4, 0)
+    first = next_fire_time('weekly', '03:00', after)
+    assert first == datetime(2024, 5, 11, 3, 0)
+    # 之后每次都在周六，即使中间有一次补跑晚了几天
+    assert next_fire_time('weekly', '03:00', datetime(2024, 5, 20, 9, 0), cron_expr='0 3 * * 6') == datetime(2024, 5, 25, 3, 0)
+
+
+def test_monthly_no_longer_clamps_to_28th():
+    expr = validate_schedule('cron', '', '0 3 L * *')[0]
+    assert next_fire_time('monthly', '03:00', datetime(2024, 4, 30, 4, 0), cron_expr=expr) == datetime(2024, 5, 31, 3, 0)
+    assert next_fire_time('monthly', '03:00', datetime(2024, 5, 10, 4, 0), cron_expr='0 3 10 * *') == datetime(2024, 6, 10, 3, 0)
+
+
+def test_once():
+    assert next_fire_time('once', '03:00', datetime(2024, 5, 10, 2, 0)) == datetime(2024, 5, 10, 3, 0)
+    assert next_fire_time('once', '03:00', datetime(2024, 5, 10, 4, 0)) is None
+
+
+def test_jitter_is_deterministic_and_within_window():
+    offsets = {jitter_offset(task_id, 30) for task_id in range(200)}
+    assert all(timedelta(0) <= offset < timedelta(minutes=30) for offset in offsets)
+    # 大量任务被分散到窗口内的不同时间
+    assert len(offsets) > 150
+    assert jitter_offset(42, 30) == jitter_offset(42, 30)
+    assert jitter_offset(42, 0) == timedelta(0)
+
+
+def test_jitter_shifts_every_occurrence():
+    jitter = timedelta(minutes=7, seconds=12)
+    after = datetime(2024, 5, 10, 3, 5)
+    # 03:00 + 7:12 还没到，本次仍在今天执行
+    assert next_fire_time('daily', '03:00', after, jitter=jitter) == datetime(2024, 5, 10, 3, 7, 12)
+    assert next_fire_time('daily', '03:00', datetime(2024, 5, 10, 3, 7, 12), jitter=jitter) == datetime(2024, 5, 11, 3, 7, 12)
+
+
+def test_validate_schedule():
+    assert validate_schedule('daily', '03:00', '0 * * * *', '15') == (None, 15)
+    assert validate_schedule('cron', '', ' */5 * * * * ') == ('*/5 * * * *', 0)
+    for args in [('hourly', '03:00'), ('daily', '25:00'), ('cron', '03:00', None), ('daily', '03:00', None, 2000)]:
+        with pytest.raises(CronError):
+            validate_schedule(*args)
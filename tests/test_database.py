@@ -0,0 +1,139 @@
+"""
+测试数据库连接：连接池（线程内重入、溢出连接、单写连接）与 WAL / PRAGMA 设置
+"""
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import database
+from app.utils.database import ConnectionPool, PoolTimeoutError
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / 'iptv.db')
+    monkeypatch.setattr(database.config, 'DATABASE_PATH', path)
+    return path
+
+
+def hold_in_thread(pool, started, release):
+    """在另一个线程中持有一个连接，直到 release 被设置"""
+    def run():
+        conn = pool.acquire()
+        started.set()
+        release.wait(5)
+        pool.release(conn)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert started.wait(5)
+    return thread
+
+
+def test_nested_acquire_in_same_thread_reuses_connection(db_path):
+    pool = ConnectionPool(db_path, size=1, timeout=0.1)
+    outer = pool.acquire()
+    inner = pool.acquire()
+    assert inner is outer
+
+    pool.release(inner)
+    assert pool.is_held_by_current_thread()
+    pool.release(outer)
+    assert not pool.is_held_by_current_thread()
+
+    stats = pool.stats()
+    assert (stats['created'], stats['idle'], stats['waits']) == (1, 1, 0)
+
+
+def test_full_pool_creates_temporary_overflow_connection(db_path):
+    pool = ConnectionPool(db_path, size=1, timeout=0.05)
+    started, release = threading.Event(), threading.Event()
+    thread = hold_in_thread(pool, started, release)
+    try:
+        conn = pool.acquire()
+        pool.release(conn)
+    finally:
+        release.set()
+        thread.join()
+
+    stats = pool.stats()
+    assert stats['overflows'] == 1
+    # 溢出连接用完即关闭，不留在池中
+    assert (stats['created'], stats['idle']) == (1, 1)
+
+
+def test_write_pool_never_overflows(db_path, monkeypatch):
+    monkeypatch.setattr(database.config, 'DB_WRITE_TIMEOUT', 0.05)
+    database._pools.clear()
+    pool = database.get_pool(readonly=False)
+    started, release = threading.Event(), threading.Event()
+    thread = hold_in_thread(pool, started, release)
+    try:
+        with pytest.raises(PoolTimeoutError):
+            pool.acquire()
+    finally:
+        release.set()
+        thread.join()
+
+    stats = pool.stats()
+    assert (stats['overflows'], stats['timeouts'], stats['created']) == (0, 1, 1)
+    # 写连接归还后可以正常获取
+    conn = pool.acquire()
+    pool.release(conn)
+    database._pools.clear()
+
+
+def test_readonly_context_reuses_held_write_connection(db_path):
+    with database.get_db_context() as db:
+        db.execute('CREATE TABLE t (v INTEGER)')
+        db.execute('INSERT INTO t VALUES (1)')
+        # 写事务尚未提交，只读查询应复用写连接读到本事务的修改
+        assert database.execute_query('SELECT COUNT(*) AS count FROM t', fetch_one=True)['count'] == 1
+        db.commit()
+
+
+def test_write_connection_applies_wal_and_tuning_pragmas(db_path):
+    conn = database._create_connection(db_path)
+    try:
+        pragma = lambda name: conn.execute(f'PRAGMA {name}').fetchone()[0]
+        assert pragma('journal_mode').upper() == database.config.DB_JOURNAL_MODE
+        # synchronous: 1 = NORMAL；temp_store: 2 = MEMORY
+        assert pragma('synchronous') == 1
+        assert pragma('temp_store') == 2
+        assert pragma('cache_size') == database.config.DB_CACHE_SIZE
+        assert pragma('busy_timeout') == database.config.DB_BUSY_TIMEOUT
+        assert pragma('query_only') == 0
+    finally:
+        conn.close()
+
+
+def test_read_connection_is_query_only_and_not_blocked_by_writer(db_path):
+    with database.get_db_context() as db:
+        db.execute('CREATE TABLE t (v INTEGER)')
+        db.execute('INSERT INTO t VALUES (1)')
+        db.commit()
+
+    reader = database._create_connection(db_path, readonly=True)
+    writer = database._create_connection(db_path)
+    count = lambda: reader.execute('SELECT COUNT(*) FROM t').fetchall()[0][0]
+    try:
+        assert reader.execute('PRAGMA query_only').fetchone()[0] == 1
+        with pytest.raises(sqlite3.OperationalError):
+            reader.execute('INSERT INTO t VALUES (2)')
+        reader.rollback()  # 结束 sqlite3 为 INSERT 隐式开启的事务
+
+        # WAL 模式下写事务未提交时，读连接仍能读到已提交的快照
+        writer.execute('BEGIN IMMEDIATE')
+        writer.execute('INSERT INTO t VALUES (3)')
+        assert count() == 1
+        writer.commit()
+        assert count() == 2
+    finally:
+        reader.close()
+        writer.close()
@@ -0,0 +1,176 @@
+"""
+测试频道获取作业：进度、按账户合并重复提交、流式订阅
+"""
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import fetch_jobs
+from app.services.fetch_jobs import FetchJobManager
+
+
+class FakeOrchestrator:
+    """按进度阶段逐步推进的获取调度器，release 之前停在保存阶段"""
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.release = threading.Event()
+        self.saving = threading.Event()
+        self.calls = []
+        self.filters = []
+
+    def submit(self, account_id, filter_sd=True, channel_filters=None, task_id=None, progress=None):
+        self.calls.append(account_id)
+        self.filters.append(channel_filters)
+        return self.executor.submit(self._run, account_id, progress)
+
+    def _run(self, account_id, progress):
+        progress('authenticating')
+        progress('downloading')
+        progress('parsing')
+        progress('saving', 0, 300)
+        progress('saving', 200, 300)
+        self.saving.set()
+        self.release.wait(5)
+        progress('saving', 300, 300)
+        if account_id < 0:
+            raise RuntimeError('boom')
+        return {'success': True, 'message': '成功同步 300 个频道', 'channel_count': 300}
+
+
+@pytest.fixture
+def orchestrator(monkeypatch):
+    fake = FakeOrchestrator()
+    monkeypatch.setattr(fetch_jobs, 'get_fetch_orchestrator', lambda: fake)
+    yield fake
+    fake.release.set()
+    fake.executor.shutdown()
+
+
+def test_progress_and_result(orchestrator):
+    manager = FetchJobManager()
+    job, created = manager.submit(1)
+    assert created
+
+    assert orchestrator.saving.wait(2)
+    snapshot = job.to_dict()
+    assert snapshot['status'] == 'running'
+    assert snapshot['stage'] == 'saving'
+    assert snapshot['progress'] == {'done': 200, 'total': 300}
+    assert snapshot['message'] == '正在保存 200/300'
+
+    orchestrator.release.set()
+    assert job.future.result(2)['channel_count'] == 300
+    assert job.to_dict()['status'] == 'success'
+    assert job.to_dict()['result']['message'] == '成功同步 300 个频道'
+
+
+def test_duplicate_submissions_are_coalesced(orchestrator):
+    manager = FetchJobManager()
+    first, created = manager.submit(1, channel_filters='["购物"]')
+    second, second_created = manager.submit(1, channel_filters=['购物'])
+    other, other_created = manager.submit(2)
+
+    assert created and other_created and not second_created
+    assert second is first
+    assert first.coalesced == 1
+    assert orchestrator.calls == [1, 2]
+
+    orchestrator.release.set()
+    first.future.result(2)
+    other.future.result(2)
+    # 作业结束后再次提交会新建作业
+    again, again_created = manager.submit(1)
+    assert again_created and again is not first
+    again.future.result(2)
+    assert manager.get_statistics()['coalesced'] == 1
+    assert [job.job_id for job in manager.list_jobs(account_id=1)] == [again.job_id, first.job_id]
+
+
+def test_exception_fails_job_and_frees_account(orchestrator):
+    manager = FetchJobManager()
+    orchestrator.release.set()
+    job, _ = manager.submit(-1)
+    result = job.future.result(2)
+
+    assert not result['success']
+    assert 'boom' in result['message']
+    assert job.to_dict()['status'] == 'failed'
+    assert manager.get_statistics()['active'] == 0
+
+
+def test_iter_updates_streams_until_finished(orchestrator):
+    manager = FetchJobManager()
+    job, _ = manager.submit(1)
+    assert orchestrator.saving.wait(2)
+
+    updates = []
+    reader = threading.Thread(target=lambda: updates.extend(manager.iter_updates(job, timeout=5)))
+    reader.start()
+    orchestrator.release.set()
+    reader.join(5)
+
+    assert not reader.is_alive()
+    assert updates[-1]['status'] == 'success'
+    assert updates[-1]['result']['channel_count'] == 300
+    assert 'result' not in updates[0]
+
+
+def test_history_keeps_recent_finished_jobs(orchestrator):
+    manager = FetchJobManager(history=2)
+    orchestrator.release.set()
+    jobs = []
+    for account_id in range(1, 5):
+        job, _ = manager.submit(account_id)
+        job.future.result(2)
+        jobs.append(job)
+
+    manager.submit(5)[0].future.result(2)
+    assert manager.get(jobs[0].job_id) is None
+    assert manager.get(jobs[-1].job_id) is not None
+
+
+def test_different_params_queue_after_active_job(orchestrator):
+    manager = FetchJobManager()
+    manual, _ = manager.submit(1)
+    assert orchestrator.saving.wait(2)
+    scheduled, created = manager.submit(1, channel_filters=['购物'], task_id=7, source='schedule')
+    # 与排队中的作业参数相同的提交合并到排队的作业
+    again, again_created = manager.submit(1, channel_filters='购物')
+
+    assert created and scheduled is not manual
+    assert not again_created and again is scheduled
+    assert scheduled.to_dict()['queued_after'] == manual.job_id
+    assert scheduled.status == 'queued'
+    assert orchestrator.calls == [1]
+    assert manager.get_statistics()['active'] == 2
+
+    orchestrator.release.set()
+    manual.future.result(2)
+    assert scheduled.future.result(2)['success']
+    assert orchestrator.filters == [None, ['购物']]
+    assert manager.get_statistics()['active'] == 0
+
+
+def test_coalesces_with_any_pending_job(orchestrator):
+    manager = FetchJobManager()
+    first, _ = manager.submit(1)
+    assert orchestrator.saving.wait(2)
+    second, _ = manager.submit(1, channel_filters=['购物'])
+    # 与运行中的第一个作业参数相同：合并，而不是在第二个作业之后再排一个
+    again, created = manager.submit(1)
+
+    assert not created and again is first
+    assert first.coalesced == 1
+    assert manager.get_statistics()['active'] == 2
+
+    orchestrator.release.set()
+    second.future.result(2)
+    assert orchestrator.calls == [1, 1]
+    assert orchestrator.filters == [None, ['购物']]
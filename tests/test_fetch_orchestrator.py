@@ -0,0 +1,106 @@
+"""
+测试频道获取调度器：并发上限与单写线程
+"""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import fetch_orchestrator
+from app.services.fetch_orchestrator import FetchOrchestrator
+
+
+class FakeService:
+    """记录获取并发数和保存线程的 IPTVService 替身"""
+
+    def __init__(self, fetch_delay=0.05):
+        self.fetch_delay = fetch_delay
+        self.lock = threading.Lock()
+        self.fetching = 0
+        self.max_fetching = 0
+        self.saving = 0
+        self.max_saving = 0
+        self.save_threads = set()
+
+    def fetch_remote_channels(self, account_id, filter_sd=True, channel_filters=None, progress=None):
+        with self.lock:
+            self.fetching += 1
+            self.max_fetching = max(self.max_fetching, self.fetching)
+        time.sleep(self.fetch_delay)
+        with self.lock:
+            self.fetching -= 1
+        if account_id < 0:
+            return {'success': False, 'message': '账户不存在', 'channel_count': 0}
+        return {
+            'success': True, 'account': {'id': account_id}, 'channels': [],
+            'page_digest': 'x', 'excluded': [], 'variant_groups': []
+        }
+
+    def save_fetched_channels(self, account, channels, page_digest=None, progress=None):
+        with self.lock:
+            self.saving += 1
+            self.max_saving = max(self.max_saving, self.saving)
+            self.save_threads.add(threading.current_thread().name)
+        time.sleep(0.01)
+        with self.lock:
+            self.saving -= 1
+        return {'success': True, 'message': f'账户 {account["id"]} 已保存', 'channel_count': 0}
+
+    @staticmethod
+    def merge_fetch_report(result, fetched):
+        result['excluded'] = fetched['excluded']
+        return result
+
+
+@pytest.fixture
+def service(monkeypatch):
+    fake = FakeService()
+    monkeypatch.setattr(fetch_orchestrator, 'IPTVService', fake)
+    return fake
+
+
+def test_concurrency_is_bounded_by_workers(service):
+    orchestrator = FetchOrchestrator(max_workers=3)
+    try:
+        futures = [orchestrator.submit(account_id) for account_id in range(1, 10)]
+        results = [future.result(5) for future in futures]
+    finally:
+        orchestrator.shutdown()
+
+    assert all(result['success'] for result in results)
+    assert service.max_fetching == 3
+    assert set(results[0]['timings']) == {'queue_wait_ms', 'fetch_ms', 'save_ms', 'run_ms'}
+    stats = orchestrator.get_statistics()
+    assert stats['max_workers'] == 3
+    assert (stats['submitted'], stats['completed'], stats['queued'], stats['running']) == (9, 9, 0, 0)
+
+
+def test_saves_run_on_a_single_writer_thread(service):
+    orchestrator = FetchOrchestrator(max_workers=4)
+    try:
+        for future in [orchestrator.submit(account_id) for account_id in range(1, 9)]:
+            future.result(5)
+    finally:
+        orchestrator.shutdown()
+
+    assert service.max_saving == 1
+    assert len(service.save_threads) == 1
+    assert service.save_threads.pop().startswith('fetch-db-writer')
+
+
+def test_failed_fetch_is_not_saved(service):
+    orchestrator = FetchOrchestrator(max_workers=1)
+    try:
+        result = orchestrator.run(-1)
+    finally:
+        orchestrator.shutdown()
+
+    assert not result['success']
+    assert 'save_ms' not in result['timings']
+    assert not service.save_threads
+    assert orchestrator.get_statistics()['failed'] == 1
@@ -0,0 +1,124 @@
+"""
+测试 EPG HTTP 容错层：重试、熔断与耗时统计
+"""
+import asyncio
+import os
+import sys
+
+import aiohttp
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import http_resilience
+from app.utils.http_resilience import (
+    CircuitBreaker, CircuitOpenError, UpstreamError, call_async,
+    get_circuit_breaker, get_http_statistics, reset_http_statistics, retry_delay
+)
+
+URL = 'http://epg.test:8080/EPG/jsp/getchannellistHWCTC.jsp'
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    """去掉重试等待，每个用例使用全新的熔断器和统计"""
+    monkeypatch.setattr(http_resilience, 'retry_delay', lambda attempt: 0)
+    reset_http_statistics()
+    yield
+    reset_http_statistics()
+
+
+class Flaky:
+    """前 failures 次调用抛出 error，之后返回 'ok'"""
+
+    def __init__(self, failures, error):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return 'ok'
+
+
+def call(step, url, func, **kwargs):
+    """在新的事件循环中以 call_async 执行同步的 func"""
+    async def request():
+        return func()
+    return asyncio.run(call_async(step, url, request, **kwargs))
+
+
+def test_retries_transient_errors():
+    func = Flaky(2, aiohttp.ClientConnectionError('reset'))
+
+    async def request():
+        return func()
+
+    assert asyncio.run(call_async('channel_list', URL, request, retries=2)) == 'ok'
+    assert func.calls == 3
+
+    stats = get_http_statistics()
+    assert stats['retries'] == 2
+    assert stats['latency']['channel_list']['count'] == 3
+    assert stats['latency']['channel_list']['errors'] == 2
+    assert stats['breakers']['epg.test:8080']['state'] == 'closed'
+
+
+def test_non_idempotent_step_is_not_retried():
+    func = Flaky(1, UpstreamError('HTTP 502'))
+
+    with pytest.raises(UpstreamError):
+        call('login', URL, func, idempotent=False)
+    assert func.calls == 1
+
+
+def test_other_errors_are_not_retried_or_counted():
+    func = Flaky(1, KeyError('EncryToken'))
+
+    with pytest.raises(KeyError):
+        call('token', URL, func, retries=3)
+    assert func.calls == 1
+    assert get_circuit_breaker('epg.test:8080').failures == 0
+
+
+def test_breaker_opens_and_recovers():
+    breaker = CircuitBreaker('epg.test', failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+
+    # reset_timeout 已过：放行一个试探请求，试探期间其他请求被拒绝
+    breaker.before_call()
+    assert breaker.state == 'half_open'
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    breaker.before_call()
+
+
+def test_open_breaker_fails_fast(monkeypatch):
+    monkeypatch.setattr(http_resilience.config, 'EPG_BREAKER_THRESHOLD', 3)
+    func = Flaky(100, aiohttp.ServerTimeoutError('read timeout'))
+
+    with pytest.raises(aiohttp.ServerTimeoutError):
+        call('channel_list', URL, func, retries=5)
+    assert func.calls == 3
+
+    with pytest.raises(CircuitOpenError):
+        call('channel_list', URL, func)
+    assert func.calls == 3
+    assert get_http_statistics()['breakers']['epg.test:8080']['rejected'] == 1
+
+
+def test_retry_delay_is_jittered_exponential():
+    delays = [retry_delay(attempt, base=1.0) for attempt in range(5)]
+
+    for attempt, delay in enumerate(delays[:4]):
+        assert 0.5 * 2 ** attempt <= delay <= 2 ** attempt
+    assert delays[4] <= 10.0
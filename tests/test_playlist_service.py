@@ -0,0 +1,129 @@
+"""
+测试播放列表缓存：格式共用、容量上限、失效与条件请求
+"""
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import database, execute_query, execute_update
+from app.utils.auth import generate_token
+from app.models import init_database
+from app.models.channel_template import init_channel_template_table
+from app.routes import register_blueprints
+from app.services import playlist_service
+from app.services.channel_template_service import ChannelTemplateService
+from app.services.iptv_service import IPTVService
+from app.services.playlist_service import PlaylistService
+
+
+@pytest.fixture
+def source_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(database.config, 'DATABASE_PATH', str(tmp_path / 'iptv.db'))
+    init_database()
+    init_channel_template_table()
+    execute_update("INSERT INTO sources (id, name) VALUES (1, '测试源')")
+    execute_update("INSERT INTO channel_template (id, channel_id, name, group_title) VALUES (1, '1', 'CCTV-1', '央视')")
+    ChannelTemplateService.invalidate_index()
+    PlaylistService.invalidate()
+    IPTVService._save_channels_to_db(1, [make_channel('1', 'CCTV-1高清'), make_channel('2', '广东卫视')])
+    yield 1
+    PlaylistService.invalidate()
+    ChannelTemplateService.invalidate_index()
+
+
+@pytest.fixture
+def client(source_id):
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    register_blueprints(app)
+    return app.test_client()
+
+
+def make_channel(channel_id, name):
+    return {
+        'ChannelID': channel_id, 'ChannelName': name, 'ChannelURL': f'igmp://239.0.0.{channel_id}',
+        'UserChannelID': channel_id, 'TimeShift': '0', 'ChannelSDP': '', 'ChannelLogoURL': '', 'Positon': ''
+    }
+
+
+def auth_headers(**extra):
+    return {'Authorization': 'Bearer ' + generate_token(1, 'admin'), **extra}
+
+
+def operation_log_count():
+    return execute_query(
+        "SELECT COUNT(*) AS count FROM logs WHERE action = 'channel_export'", fetch_one=True
+    )['count']
+
+
+def test_m3u8_shares_the_m3u_artifact(source_id):
+    m3u, cached = PlaylistService.get_artifact(source_id, fmt='m3u')
+    assert not cached
+    m3u8, cached = PlaylistService.get_artifact(source_id, fmt='m3u8')
+    assert cached
+    assert m3u8 is m3u
+    assert len(playlist_service._cache) == 1
+
+
+def test_unknown_category_is_not_cached(source_id):
+    for index in range(5):
+        artifact, cached = PlaylistService.get_artifact(source_id, category=f'不存在{index}', fmt='txt')
+        assert not cached
+        assert artifact.channel_count == 0
+    assert not playlist_service._cache
+
+    PlaylistService.get_artifact(source_id, category='央视', fmt='txt')
+    assert PlaylistService.get_artifact(source_id, category='央视', fmt='txt')[1]
+
+
+def test_cache_evicts_least_recently_used(source_id, monkeypatch):
+    monkeypatch.setattr(playlist_service.config, 'PLAYLIST_CACHE_SIZE', 2)
+    PlaylistService.get_artifact(source_id, fmt='txt')
+    PlaylistService.get_artifact(source_id, fmt='m3u')
+    # 访问 txt 使其成为最近使用，再生成 json 时淘汰 m3u
+    assert PlaylistService.get_artifact(source_id, fmt='txt')[1]
+    PlaylistService.get_artifact(source_id, fmt='json')
+
+    assert len(playlist_service._cache) == 2
+    assert PlaylistService.get_artifact(source_id, fmt='txt')[1]
+    assert not PlaylistService.get_artifact(source_id, fmt='m3u')[1]
+
+
+def test_invalidate_drops_only_that_source(source_id):
+    PlaylistService.get_artifact(source_id, fmt='txt')
+    execute_update("INSERT INTO sources (id, name) VALUES (2, '其他源')")
+    IPTVService._save_channels_to_db(2, [make_channel('3', '湖南卫视')])
+    PlaylistService.get_artifact(2, fmt='txt')
+    assert len(playlist_service._cache) == 2
+
+    PlaylistService.invalidate(source_id)
+    assert not PlaylistService.get_artifact(source_id, fmt='txt')[1]
+    assert PlaylistService.get_artifact(2, fmt='txt')[1]
+
+
+def test_export_supports_conditional_requests(client):
+    response = client.get('/api/iptv/channels/export?source_id=1&format=m3u', headers=auth_headers())
+    assert response.status_code == 200
+    assert response.data.startswith(b'#EXTM3U')
+    etag = response.headers['ETag']
+    assert operation_log_count() == 1
+
+    response = client.get(
+        '/api/iptv/channels/export?source_id=1&format=m3u8', headers=auth_headers(**{'If-None-Match': etag})
+    )
+    assert response.status_code == 304
+    assert operation_log_count() == 1
+
+    IPTVService._save_channels_to_db(1, [make_channel('1', 'CCTV-1高清')])
+    PlaylistService.invalidate(1)
+    response = client.get(
+        '/api/iptv/channels/export?source_id=1&format=m3u', headers=auth_headers(**{'If-None-Match': etag})
+    )
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert '广东卫视' not in response.get_data(as_text=True)
@@ -0,0 +1,253 @@
+"""
+测试定时任务调度器的唤醒与执行时机
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.scheduler import Scheduler, Task
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = Scheduler()
+    scheduler.fired = []
+    scheduler.fired_event = threading.Event()
+
+    def callback(task):
+        scheduler.fired.append((task.task_id, datetime.now()))
+        scheduler.fired_event.set()
+
+    scheduler.register_callback('fetch_channels', callback)
+    scheduler.start()
+    yield scheduler
+    scheduler.stop()
+
+
+def make_task(task_id, delay, repeat_type='daily'):
+    task = Task(task_id, 'fetch_channels', 1, '03:00', repeat_type=repeat_type)
+    task.next_execution = datetime.now() + timedelta(seconds=delay)
+    return task
+
+
+def test_fires_on_time_without_polling(scheduler):
+    task = make_task(1, 0.2)
+    due = task.next_execution
+    scheduler.add_task(task)
+
+    assert scheduler.fired_event.wait(2)
+    task_id, fired_at = scheduler.fired[0]
+    assert task_id == 1
+    assert timedelta(0) <= fired_at - due < timedelta(seconds=0.5)
+    # 每日任务执行后重新排入队列
+    assert task.next_execution > datetime.now()
+
+
+def test_new_head_wakes_sleeping_scheduler(scheduler):
+    scheduler.add_task(make_task(1, 3600))
+    time.sleep(0.1)  # 调度线程已经按一小时后的堆顶睡下
+
+    scheduler.add_task(make_task(2, 0.1))
+
+    assert scheduler.fired_event.wait(2)
+    assert [task_id for task_id, _ in scheduler.fired] == [2]
+
+
+def test_removed_and_disabled_tasks_do_not_fire(scheduler):
+    scheduler.add_task(make_task(1, 0.1))
+    scheduler.add_task(make_task(2, 0.1))
+    scheduler.add_task(make_task(3, 0.3))
+
+    scheduler.remove_task(1)
+    scheduler.update_task(2, is_enabled=False)
+
+    assert scheduler.fired_event.wait(2)
+    time.sleep(0.3)
+    assert [task_id for task_id, _ in scheduler.fired] == [3]
+
+
+def test_slow_task_does_not_delay_other_types(scheduler):
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow(task):
+        started.set()
+        release.wait(5)
+
+    scheduler.register_callback('slow', slow)
+    slow_task = Task('slow', 'slow', None, '03:00')
+    slow_task.next_execution = datetime.now()
+    scheduler.add_task(slow_task)
+    assert started.wait(2)
+
+    task = make_task(1, 0.1)
+    due = task.next_execution
+    scheduler.add_task(task)
+    try:
+        assert scheduler.fired_event.wait(2)
+        assert scheduler.fired[0][1] - due < timedelta(seconds=0.5)
+        assert scheduler.get_statistics()['executors']['slow']['running'] == 1
+    finally:
+        release.set()
+
+
+@pytest.mark.parametrize('overlap, expected_runs', [('skip', 1), ('queue', 2)])
+def test_overlap_policy(overlap, expected_runs):
+    scheduler = Scheduler()
+    runs = []
+    future = Future()
+
+    def callback(task):
+        runs.append(datetime.now())
+        # 返回未完成的 Future：在其完成前任务一直算作执行中
+        return future if len(runs) == 1 else None
+
+    scheduler.register_callback('fetch_channels', callback, max_workers=2, overlap=overlap)
+    executor = scheduler.executors['fetch_channels']
+    task = make_task(1, 0)
+
+    assert executor.dispatch(task) == 'submitted'
+    time.sleep(0.1)
+    assert executor.dispatch(task) == ('skipped' if overlap == 'skip' else 'queued')
+    assert executor.dispatch(task) == ('skipped' if overlap == 'skip' else 'queued')
+    assert len(runs) == 1
+
+    future.set_result({'success': True})
+    time.sleep(0.2)
+    stats = executor.get_statistics()
+    assert len(runs) == expected_runs
+    assert stats['completed'] == expected_runs
+    assert stats['in_flight'] == 0
+    assert stats['skipped'] == (2 if overlap == 'skip' else 0)
+    scheduler.stop()
+
+
+def test_returned_future_does_not_hold_a_worker():
+    scheduler = Scheduler()
+    futures = []
+
+    def callback(task):
+        futures.append(Future())
+        return futures[-1]
+
+    scheduler.register_callback('fetch_channels', callback, max_workers=1)
+    executor = scheduler.executors['fetch_channels']
+    for task_id in range(1, 4):
+        executor.dispatch(make_task(task_id, 0))
+    time.sleep(0.2)
+
+    # 一个线程即可提交全部任务，未完成的 Future 只占用执行中计数
+    stats = executor.get_statistics()
+    assert len(futures) == 3
+    assert (stats['running'], stats['queued'], stats['in_flight']) == (3, 0, 3)
+
+    futures[0].set_result({'success': True})
+    futures[1].set_exception(RuntimeError('boom'))
+    futures[2].set_result({'success': False})
+    stats = executor.get_statistics()
+    assert (stats['running'], stats['completed'], stats['failed'], stats['in_flight']) == (0, 2, 1, 0)
+    scheduler.stop()
+
+
+def test_cancel_policy_cancels_queued_previous_run():
+    scheduler = Scheduler()
+    release = threading.Event()
+    runs = []
+
+    def callback(task):
+        runs.append(task.task_id)
+        if task.task_id == 'busy':
+            release.wait(5)
+
+    scheduler.register_callback('fetch_channels', callback, max_workers=1, overlap='cancel')
+    executor = scheduler.executors['fetch_channels']
+    executor.dispatch(make_task('busy', 0))
+    time.sleep(0.1)
+
+    task = make_task(1, 0)
+    assert executor.dispatch(task) == 'submitted'
+    # 上一次还在线程池中排队：取消后执行本次
+    assert executor.dispatch(task) == 'cancelled_previous'
+    release.set()
+    time.sleep(0.2)
+
+    stats = executor.get_statistics()
+    assert runs == ['busy', 1]
+    assert (stats['cancelled'], stats['completed'], stats['queued'], stats['running']) == (1, 2, 0, 0)
+    scheduler.stop()
+
+
+def test_persisted_next_execution_is_restored():
+    last_run = datetime(2024, 1, 1, 3, 0)
+    next_run = datetime.now() + timedelta(hours=5)
+    task = Task(1, 'fetch_channels', 1, '03:00', repeat_type='daily',
+                next_execution=next_run.strftime('%Y-%m-%d %H:%M:%S'),
+                last_executed='2024-01-01 03:00:00')
+    assert task.next_execution == next_run.replace(microsecond=0)
+    assert task.last_executed == last_run
+
+    # 已执行过的一次性任务不会再次执行
+    done = Task(2, 'fetch_channels', 1, '23:59', repeat_type='once', last_executed=last_run)
+    assert done.next_execution is None
+
+
+@pytest.mark.parametrize('policy, expected_missed_runs, due', [
+    ('once', 0, True),
+    ('all', 2, True),
+    ('skip', 0, False),
+])
+def test_catch_up_policy(policy, expected_missed_runs, due):
+    now = datetime(2024, 5, 10, 3, 5)
+    task = Task(1, 'fetch_channels', 1, '03:00', repeat_type='daily',
+                next_execution=datetime(2024, 5, 8, 3, 0))
+
+    assert task.catch_up(policy, now) == 3
+    assert task.missed_runs == expected_missed_runs
+    if due:
+        assert task.next_execution <= now
+    else:
+        assert task.next_execution > now
+
+
+def test_restart_runs_missed_task_and_persists_state_in_bulk(scheduler):
+    saved = []
+    scheduler.set_state_store(saved.append)
+
+    task = Task(1, 'fetch_channels', 1, '03:00', repeat_type='daily',
+                next_execution=datetime.now() - timedelta(minutes=5))
+    task.catch_up('once')
+    later = make_task(2, 3600)
+    scheduler.add_task(later)
+    scheduler.add_task(task)
+
+    assert scheduler.fired_event.wait(2)
+    assert [task_id for task_id, _ in scheduler.fired] == [1]
+    time.sleep(0.1)
+    # 执行后的下次执行时间（明天 03:00）和上次执行时间一起写入
+    states = {state['task_id']: state for batch in saved for state in batch}
+    assert states[1]['next_execution'] == task.next_execution.strftime('%Y-%m-%d %H:%M:%S')
+    assert states[1]['last_executed'] is not None
+    assert task.next_execution > datetime.now()
+
+
+def test_weekly_task_is_anchored_and_reanchored_on_change(scheduler):
+    task = Task(1, 'fetch_channels', 1, '03:00', repeat_type='weekly',
+                next_execution=datetime(2024, 5, 11, 3, 0))   # 周六
+    assert task.cron_expr == '0 3 * * 6'
+
+    scheduler.add_task(task)
+    scheduler.update_task(1, schedule_time='04:30')
+    assert task.cron_expr.startswith('30 4 * * ')
+    assert task.next_execution > datetime.now()
+
+    scheduler.update_task(1, repeat_type='cron', cron_expr='0 */6 * * *')
+    assert task.cron_expr == '0 */6 * * *'
+    assert task.next_execution.hour % 6 == 0
@@ -0,0 +1,83 @@
+"""
+测试流式输出：JSON / NDJSON 分块响应与流式导出
+"""
+import json
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import database, execute_query, execute_update, streaming
+from app.utils.auth import generate_token
+from app.models import init_database
+from app.models.channel_template import init_channel_template_table
+from app.routes import register_blueprints
+from app.services.channel_template_service import ChannelTemplateService
+from app.services.iptv_service import IPTVService
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(database.config, 'DATABASE_PATH', str(tmp_path / 'iptv.db'))
+    # 每块 2 行，少量频道即可覆盖多块输出
+    monkeypatch.setattr(streaming, 'STREAM_CHUNK_ROWS', 2)
+    init_database()
+    init_channel_template_table()
+    ChannelTemplateService.invalidate_index()
+    execute_update("INSERT INTO sources (id, name) VALUES (1, '测试源')")
+    IPTVService._save_channels_to_db(1, [make_channel(str(index), f'频道{index}') for index in range(1, 6)])
+
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    register_blueprints(app)
+    yield app.test_client()
+    ChannelTemplateService.invalidate_index()
+
+
+def make_channel(channel_id, name):
+    return {
+        'ChannelID': channel_id, 'ChannelName': name, 'ChannelURL': f'igmp://239.0.0.{channel_id}',
+        'UserChannelID': channel_id, 'TimeShift': '0', 'ChannelSDP': '', 'ChannelLogoURL': '', 'Positon': ''
+    }
+
+
+def auth_headers(**extra):
+    return {'Authorization': 'Bearer ' + generate_token(1, 'admin'), **extra}
+
+
+def test_iter_json_object_is_valid_json():
+    pieces = list(streaming.iter_json_object(iter([{'a': 1}, {'a': '中文'}]), 'rows', success=True))
+    assert json.loads(''.join(pieces)) == {'success': True, 'rows': [{'a': 1}, {'a': '中文'}]}
+    assert json.loads(''.join(streaming.iter_json_object(iter([]), 'rows'))) == {'rows': []}
+
+
+def test_stream_json_matches_buffered_response(client):
+    buffered = client.get('/api/iptv/channels/1', headers=auth_headers()).get_json()
+    response = client.get('/api/iptv/channels/1?stream=json', headers=auth_headers())
+
+    assert response.is_streamed
+    assert response.mimetype == 'application/json'
+    assert json.loads(response.get_data(as_text=True)) == buffered
+    assert len(buffered['channels']) == 5
+
+
+def test_stream_ndjson_outputs_one_row_per_line(client):
+    response = client.get('/api/iptv/channels/1', headers=auth_headers(Accept='application/x-ndjson'))
+
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)['channel_name'] for line in lines] == [f'频道{index}' for index in range(1, 6)]
+
+
+def test_stream_export_does_not_write_operation_log(client):
+    for _ in range(3):
+        response = client.get('/api/iptv/channels/export?format=txt', headers=auth_headers())
+        assert response.status_code == 200
+        assert '频道5' in response.get_data(as_text=True)
+
+    count = execute_query("SELECT COUNT(*) AS count FROM logs WHERE action = 'channel_export'", fetch_one=True)
+    assert count['count'] == 0
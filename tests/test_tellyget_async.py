@@ -0,0 +1,264 @@
+"""
+测试异步 IPTV 客户端（基于本地 EPG 桩服务器，无需真实账号）
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.http_transport import get_transport_statistics
+from app.utils.tellyget_core import (
+    AsyncIPTVClient, Cipher, TellyGetCore, clear_session_cache, fetch_channels_many
+)
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'getchannellistHWCTC.html')
+PASSWORD = 'secret'
+
+
+class StubEPGHandler(BaseHTTPRequestHandler):
+    """模拟 EPG 的认证与频道列表接口（HTTP/1.1，支持长连接）"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _count(self, path):
+        with self.server.lock:
+            self.server.counts[path] += 1
+
+    def _reply(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self._count(url.path)
+
+        if url.path == '/EDS/jsp/AuthenticationURL':
+            host, port = self.server.server_address
+            location = f'http://{host}:{port}/EPG/jsp/AuthenticationURL?UserID={params["UserID"]}'
+            self._reply(302, headers={'Location': location})
+
+        elif url.path == '/EPG/oauth/v2/authorize':
+            token = f'token-{params["userid"]}'
+            self._reply(200, json.dumps({'EncryToken': token}).encode(), {'Content-Type': 'text/html'})
+
+        elif url.path == '/EPG/oauth/v2/token':
+            key = hashlib.md5(PASSWORD.encode()).hexdigest()[:24].upper()
+            try:
+                fields = Cipher(key).decrypt(params['authinfo']).split('$')
+                valid = fields[1] == f'token-{params["UserID"]}' and fields[2] == params['UserID']
+            except Exception:
+                valid = False
+            if valid:
+                session_id = uuid.uuid4().hex
+                with self.server.lock:
+                    self.server.sessions.add(session_id)
+                self._reply(200, b'{}', {'Set-Cookie': f'JSESSIONID={session_id}; Path=/'})
+            else:
+                self._reply(401)
+
+        else:
+            self._reply(404)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        self._count(path)
+        if path != '/EPG/jsp/getchannellistHWCTC.jsp':
+            self._reply(404)
+            return
+        cookie = self.headers.get('Cookie', '')
+        session_id = cookie.split('JSESSIONID=', 1)[1].split(';', 1)[0] if 'JSESSIONID=' in cookie else None
+        if session_id not in self.server.sessions:
+            self._reply(401)
+            return
+        with open(FIXTURE_PATH, 'rb') as f:
+            body = f.read()
+        self._reply(200, body, {'Content-Type': 'text/html; charset=UTF-8'})
+
+
+@pytest.fixture(scope='module')
+def epg_server():
+    """启动本地 EPG 桩服务器"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubEPGHandler)
+    server.daemon_threads = True
+    server.request_queue_size = 256
+    server.lock = threading.Lock()
+    server.counts = Counter()
+    server.sessions = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def authurl(epg_server):
+    """EPG 桩服务器的认证地址（每个用例开始前清空会话缓存和请求计数）"""
+    clear_session_cache()
+    epg_server.counts.clear()
+    host, port = epg_server.server_address
+    return f'http://{host}:{port}/EDS/jsp/AuthenticationURL'
+
+
+def test_sync_wrapper_fetches_channels(authurl):
+    """同步 TellyGetCore 接口通过异步客户端完成完整流程"""
+    core = TellyGetCore(user='075800000001', passwd=PASSWORD, mac='00:11:22:33:44:55', authurl=authurl)
+
+    success, channels = core.fetch_channels(filter_sd=True, channel_filters=[r'^\d+$'])
+
+    assert success, channels
+    names = [channel['ChannelName'] for channel in channels]
+    assert '广东卫视高清' in names
+    assert '广东卫视' not in names  # 有高清版本的标清频道被移除
+    assert 'CCTV-1' not in names
+    assert '1001' not in names  # 被名称过滤器过滤
+    assert len(channels) == 7
+
+    info = TellyGetCore.parse_channel_info(channels[0])
+    assert info['channel_id'] == '6197'
+    assert info['channel_url'].startswith('igmp://239.77.1.19:5146')
+
+
+def test_wrong_password_fails(authurl):
+    """密码错误时登录不会拿到会话，获取失败"""
+    core = TellyGetCore(user='075800000002', passwd='wrong', mac='00:11:22:33:44:55', authurl=authurl)
+
+    success, message = core.fetch_channels()
+
+    assert not success
+    assert message == '未获取到频道'
+
+
+def test_unreachable_server_fails():
+    """认证地址不可达时返回认证失败"""
+    client = AsyncIPTVClient('075800000003', PASSWORD, '00:11:22:33:44:55',
+                             authurl='http://127.0.0.1:1/EDS/jsp/AuthenticationURL', timeout=2)
+
+    success, message = asyncio.run(client.fetch_channels())
+
+    assert not success
+    assert message == '认证失败'
+
+
+def test_many_accounts_on_one_loop(authurl):
+    """同一个事件循环中并发完成多个账户的登录和获取"""
+    clients = [
+        AsyncIPTVClient(f'0758{i:08d}', PASSWORD, '00:11:22:33:44:55', authurl=authurl)
+        for i in range(100)
+    ]
+
+    results = asyncio.run(fetch_channels_many(clients, filter_sd=False, concurrency=50))
+
+    assert len(results) == 100
+    assert all(success for success, _ in results)
+    assert all(len(channels) == 10 for _, channels in results)
+
+
+def test_session_cache_skips_login(authurl, epg_server):
+    """有效期内再次获取只请求一次频道列表"""
+    kwargs = dict(user='075800000004', passwd=PASSWORD, mac='00:11:22:33:44:55', authurl=authurl)
+
+    assert TellyGetCore(**kwargs).fetch_channels()[0]
+    assert epg_server.counts['/EPG/oauth/v2/token'] == 1
+
+    epg_server.counts.clear()
+    success, channels = TellyGetCore(**kwargs).fetch_channels()
+
+    assert success and len(channels) == 8
+    assert dict(epg_server.counts) == {'/EPG/jsp/getchannellistHWCTC.jsp': 1}
+
+
+def test_session_cache_reauthenticates_when_rejected(authurl, epg_server):
+    """服务端会话失效（401）时自动重新认证"""
+    kwargs = dict(user='075800000005', passwd=PASSWORD, mac='00:11:22:33:44:55', authurl=authurl)
+    assert TellyGetCore(**kwargs).fetch_channels()[0]
+
+    with epg_server.lock:
+        epg_server.sessions.clear()
+    epg_server.counts.clear()
+    success, channels = TellyGetCore(**kwargs).fetch_channels()
+
+    assert success and len(channels) == 8
+    assert epg_server.counts['/EPG/oauth/v2/token'] == 1
+    assert epg_server.counts['/EPG/jsp/getchannellistHWCTC.jsp'] == 2
+
+
+def test_session_cache_expires(authurl, epg_server):
+    """超过 TTL 后不再复用会话"""
+    kwargs = dict(user='075800000006', passwd=PASSWORD, mac='00:11:22:33:44:55', authurl=authurl)
+    assert TellyGetCore(session_ttl=0.01, **kwargs).fetch_channels()[0]
+
+    time.sleep(0.05)
+    epg_server.counts.clear()
+    assert TellyGetCore(session_ttl=0.01, **kwargs).fetch_channels()[0]
+
+    assert epg_server.counts['/EPG/oauth/v2/token'] == 1
+    assert epg_server.counts['/EPG/jsp/getchannellistHWCTC.jsp'] == 1
+
+
+def test_unchanged_page_is_not_parsed(authurl, epg_server):
+    """页面摘要与上次相同时不解析，返回 None；过滤参数变化时摘要也变化"""
+    kwargs = dict(user='075800000007', passwd=PASSWORD, mac='00:11:22:33:44:55', authurl=authurl)
+    core = TellyGetCore(**kwargs)
+    success, channels = core.fetch_channels(filter_sd=True)
+    digest = core.page_digest
+    assert success and len(channels) == 8 and digest
+
+    core = TellyGetCore(**kwargs)
+    assert core.fetch_channels(filter_sd=True, known_digest=digest) == (True, None)
+    assert core.page_digest == digest
+
+    core = TellyGetCore(**kwargs)
+    success, channels = core.fetch_channels(filter_sd=False, known_digest=digest)
+    assert success and len(channels) == 10
+    assert core.page_digest != digest
+
+
+def test_accounts_share_connections(authurl):
+    """同一批账户复用连接池中的长连接，Cookie 仍按账户隔离"""
+    clients = [
+        AsyncIPTVClient(f'0759{i:08d}', PASSWORD, '00:11:22:33:44:55', authurl=authurl)
+        for i in range(20)
+    ]
+    before = get_transport_statistics()
+
+    results = asyncio.run(fetch_channels_many(clients, filter_sd=False, concurrency=1))
+
+    after = get_transport_statistics()
+    assert all(success for success, _ in results)
+    assert after['requests'] - before['requests'] == 80
+    assert after['connections_created'] - before['connections_created'] == 1
+
+
+def test_background_loop_reuses_connections(authurl):
+    """后台事件循环上的 TellyGetCore 共用全局连接池"""
+    kwargs = dict(passwd=PASSWORD, mac='00:11:22:33:44:55', authurl=authurl, session_ttl=0)
+    assert TellyGetCore(user='075800000008', **kwargs).fetch_channels()[0]
+    before = get_transport_statistics()
+
+    assert TellyGetCore(user='075800000009', **kwargs).fetch_channels()[0]
+
+    after = get_transport_statistics()
+    assert after['requests'] - before['requests'] == 4
+    assert after['connections_created'] == before['connections_created']